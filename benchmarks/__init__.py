@@ -0,0 +1,3 @@
+"""
+Performance benchmarks, run as modules, e.g. python -m benchmarks.fleet_step
+"""
@@ -0,0 +1,68 @@
+"""
+Benchmark for the vectorised fleet movement step
+
+Builds a synthetic fleet of round-trip routes around a depot and times
+FleetState.advance(), the kernel behind the map's movement tick.
+
+Usage: python -m benchmarks.fleet_step [vehicles] [waypoints] [ticks]
+"""
+import sys
+import time
+
+import numpy as np
+
+from core.fleet_state import FleetState, RoundTripRoute
+
+TARGET_MS = 5.0
+
+
+def build_fleet(vehicle_count, waypoints, seed=0):
+    """Fleet of round trips with random-walk outbound legs starting at one depot"""
+    rng = np.random.default_rng(seed)
+    depot = np.array([12.85, 74.92])
+    fleet = FleetState(capacity=vehicle_count)
+
+    for i in range(vehicle_count):
+        steps = rng.normal(0.0, 0.005, size=(waypoints, 2))
+        steps[0] = 0.0
+        outbound = depot + np.cumsum(steps, axis=0)
+        fleet.add(f"Vehicle {i + 1}", {
+            "type": "Drone",
+            "speed": rng.uniform(30, 60),
+            "weight": rng.uniform(1, 5),
+            "route": RoundTripRoute(outbound)
+        })
+
+    return fleet
+
+
+def main(argv):
+    vehicle_count = int(argv[1]) if len(argv) > 1 else 10000
+    waypoints = int(argv[2]) if len(argv) > 2 else 50
+    ticks = int(argv[3]) if len(argv) > 3 else 200
+
+    print(f"Building {vehicle_count} vehicles with {waypoints}-point outbound legs...")
+    fleet = build_fleet(vehicle_count, waypoints)
+
+    dt = 0.5 / 3600.0  # One 500 ms tick in hours
+    fleet.advance(dt)  # First call packs the route buffers
+
+    timings = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        fleet.advance(dt)
+        timings.append((time.perf_counter() - start) * 1000.0)
+
+    timings = np.array(timings)
+    median_ms = float(np.median(timings))
+    print(f"Step time over {ticks} ticks: median {median_ms:.3f} ms, "
+          f"p95 {np.percentile(timings, 95):.3f} ms, max {timings.max():.3f} ms")
+    print(f"Route buffers: {fleet.nbytes() / 1e6:.1f} MB")
+
+    status = "PASS" if median_ms < TARGET_MS else "FAIL"
+    print(f"{status}: target is under {TARGET_MS:.0f} ms per step")
+    return 0 if status == "PASS" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -19,7 +19,21 @@ from .app_config import (
     DELIVERY_DISTANCE_MIN,
     DELIVERY_DISTANCE_MAX,
     MAX_CUSTOMERS,
-    MIN_CUSTOMERS
+    MIN_CUSTOMERS,
+    ROUTE_CACHE_CONFIG,
+    ROUTE_BUILD_CONFIG,
+    ROUTING_CONFIG,
+    TRAFFIC_CONFIG,
+    ROUTE_SIMPLIFY_CONFIG,
+    SIMULATION_CONFIG,
+    MONTE_CARLO_CONFIG,
+    RECORDING_CONFIG,
+    SNAPSHOT_CONFIG,
+    ENERGY_CONFIG,
+    ASSIGNMENT_CONFIG,
+    MULTI_STOP_CONFIG,
+    MULTI_DEPOT_CONFIG,
+    ORDER_STREAM_CONFIG
 )
 
 __all__ = [
@@ -37,7 +51,21 @@ __all__ = [
     'DELIVERY_DISTANCE_MIN',
     'DELIVERY_DISTANCE_MAX',
     'MAX_CUSTOMERS',
-    'MIN_CUSTOMERS'
+    'MIN_CUSTOMERS',
+    'ROUTE_CACHE_CONFIG',
+    'ROUTE_BUILD_CONFIG',
+    'ROUTING_CONFIG',
+    'TRAFFIC_CONFIG',
+    'ROUTE_SIMPLIFY_CONFIG',
+    'SIMULATION_CONFIG',
+    'MONTE_CARLO_CONFIG',
+    'RECORDING_CONFIG',
+    'SNAPSHOT_CONFIG',
+    'ENERGY_CONFIG',
+    'ASSIGNMENT_CONFIG',
+    'MULTI_STOP_CONFIG',
+    'MULTI_DEPOT_CONFIG',
+    'ORDER_STREAM_CONFIG'
 ]
 
 __version__ = '1.0.0'
\ No newline at end of file
@@ -165,13 +165,14 @@ FLEET_CONSTRAINTS = {
     "max_total_vehicles": 200
 }
 
-# Legacy waves configuration (kept for backward compatibility)
+# Dispatch waves: how many vehicles of each type go out per wave (capped by the
+# fleet); the last entry repeats until every customer has been served
 DEFAULT_WAVES = [
     {"num_drones": 3, "num_electric_trucks": 10, "num_fuel_trucks": 2},
     {"num_drones": 2, "num_electric_trucks": 4, "num_fuel_trucks": 1},
 ]
 
-PAUSE_BETWEEN_WAVES = 3.0
+PAUSE_BETWEEN_WAVES = 3.0  # Simulated minutes a returned vehicle spends at the depot before its next wave
 
 # Vehicle speeds (km/h) - optimized for delivery operations
 VEHICLE_SPEEDS = {
@@ -190,14 +191,14 @@ VEHICLE_WEIGHTS = {
 # Vehicle operational characteristics
 VEHICLE_CHARACTERISTICS = {
     "Drone": {
-        "max_range_km": 100,        # Flight range before return
+        "max_range_km": 100,        # Flight range before return (ENERGY_CONFIG's battery model when enabled)
         "battery_life_hours": 2,    # Operating time
         "weather_dependent": True,   # Affected by weather
         "color": "#2196F3",         # Blue for drones
         "icon": "🚁"
     },
     "Electric Truck": {
-        "max_range_km": 300,        # Range on full charge
+        "max_range_km": 300,        # Range on full charge (ENERGY_CONFIG's battery model when enabled)
         "battery_life_hours": 8,    # Work shift duration
         "weather_dependent": False,  # All-weather operation
         "color": "#4CAF50",         # Green for electric
@@ -236,6 +237,167 @@ PERFORMANCE_CONFIG = {
     "max_concurrent_vehicles": 200  # System limit
 }
 
+# Persistent road route cache (SQLite) used by RouteManager.get_osrm_route
+ROUTE_CACHE_CONFIG = {
+    "enabled": True,
+    "path": "route_cache.sqlite3",  # Relative paths resolve against the working directory
+    "precision": 4,                 # Decimal places of lat/lon in cache keys (~11 m)
+    "max_entries": 5000,            # LRU eviction above this many routes
+    "ttl_hours": 24 * 7             # Road geometry is refreshed after a week
+}
+
+# Parallel route construction for fleet creation
+ROUTE_BUILD_CONFIG = {
+    "max_workers": 8,               # Concurrent route requests (bounded to be polite to OSRM)
+    "http_pool_size": 8,            # Keep-alive connections held by the shared HTTP session
+    "request_timeout": 10           # Seconds per OSRM request
+}
+
+# Truck routing backend: "osrm" (online), "local" (offline road graph) or
+# "auto" (local graph when the extract exists, OSRM otherwise)
+ROUTING_CONFIG = {
+    "backend": "auto",
+    "road_graph_path": "road_graph.npz",  # Built with: python -m core.road_graph region.osm road_graph.npz
+    "max_snap_m": 2000                    # Max distance from a point to the nearest road node
+}
+
+# Time-of-day traffic: truck speed as a multiple of its VEHICLE_SPEEDS speed, by road class and hour
+TRAFFIC_CONFIG = {
+    "enabled": True,
+    "profile_path": "traffic_profiles.bin",  # Built with: python -m core.traffic speeds.csv traffic_profiles.bin
+    "vehicle_types": ["Electric Truck", "Fuel Truck"],  # Vehicles slowed by traffic (drones fly over it)
+    "default_class": "primary",     # Class of route segments not on the road graph (OSRM or straight-line legs)
+    # Used when there is no profile file; one factor per hour of the day from midnight
+    "profiles": {
+        "motorway":  [1.50, 1.50, 1.50, 1.50, 1.45, 1.35, 1.20, 1.00, 0.80, 0.70, 0.75, 0.85,
+                      0.90, 0.90, 0.85, 0.85, 0.80, 0.70, 0.60, 0.65, 0.80, 1.00, 1.20, 1.40],
+        "primary":   [1.30, 1.30, 1.30, 1.30, 1.25, 1.15, 1.00, 0.80, 0.60, 0.50, 0.60, 0.70,
+                      0.75, 0.75, 0.70, 0.70, 0.65, 0.55, 0.45, 0.50, 0.65, 0.85, 1.05, 1.20],
+        "secondary": [1.15, 1.15, 1.15, 1.15, 1.10, 1.05, 0.95, 0.80, 0.65, 0.55, 0.65, 0.75,
+                      0.80, 0.80, 0.75, 0.75, 0.70, 0.60, 0.50, 0.55, 0.70, 0.85, 1.00, 1.10],
+        "local":     [1.00, 1.00, 1.00, 1.00, 1.00, 0.95, 0.90, 0.80, 0.70, 0.65, 0.70, 0.75,
+                      0.80, 0.80, 0.75, 0.75, 0.70, 0.65, 0.60, 0.60, 0.70, 0.80, 0.90, 1.00]
+    }
+}
+
+# Simulation clock (engine time is decoupled from the UI timers)
+SIMULATION_CONFIG = {
+    "speed_options": [1, 10, 100, "max"],  # Simulated seconds per wall second; "max" runs flat out
+    "default_speed": 1,
+    "step_interval_ms": 50,       # How often the engine advances
+    "max_step_seconds": 5.0,      # Fixed simulated step used in "max" mode
+    "max_mode_budget_ms": 30,     # Wall time spent stepping per timer tick in "max" mode
+    "mode": "event",              # "event" (jump between events; can dispatch in waves) or "step" (fixed ticks)
+    "day_start": "08:00:00"       # Wall-clock time of sim t = 0 (event logs and traffic hours)
+}
+
+# Monte Carlo batch runs (python -m core.sim --replicas N)
+MONTE_CARLO_CONFIG = {
+    "workers": None,     # Worker processes; None uses every CPU
+    "chunk_size": 50,    # Replicas per task sent to a worker
+    "step_seconds": 60.0, # Engine step in "step" mode; KPIs are exact regardless of step size
+    "mode": "event"       # Event-driven replicas skip ticking entirely
+}
+
+# Binary run recordings and replay
+RECORDING_CONFIG = {
+    "directory": "recordings",   # Where the GUI's Record button writes .simrec files
+    "frame_interval_s": 0.5,     # Simulated seconds between position frames (2 Hz)
+    "margin_km": 5.0             # Added to DELIVERY_DISTANCE_MAX around the depot for quantisation bounds
+}
+
+# Simulation checkpoints (Save/Load Snapshot)
+SNAPSHOT_CONFIG = {
+    "directory": "snapshots"     # Default folder offered by the snapshot file dialogs
+}
+
+# Battery model for drones and electric trucks (types not listed run on fuel and are not tracked)
+ENERGY_CONFIG = {
+    "enabled": True,
+    "low_soc": 0.2,                   # State of charge below which the fleet panel flags a vehicle
+    "vehicles": {
+        "Drone": {
+            "battery_kwh": 1.8,           # Usable pack energy
+            "kwh_per_km": 0.012,          # Empty, at its VEHICLE_SPEEDS cruise speed (also sets range: battery / draw)
+            "kwh_per_km_per_kg": 0.002,   # Extra draw per kg of payload
+            "speed_exponent": 2.0,        # Draw per km scales with (speed / cruise speed) ** exponent
+            "depot": "swap",              # Topped up at the depot by a battery swap...
+            "swap_minutes": 2.0,
+            "charge_kw": 1.0              # ...or by charging at this rate
+        },
+        "Electric Truck": {
+            "battery_kwh": 100.0,
+            "kwh_per_km": 0.25,
+            "kwh_per_km_per_kg": 0.0001,
+            "speed_exponent": 1.0,
+            "depot": "charge",
+            "swap_minutes": 10.0,
+            "charge_kw": 120.0
+        }
+    }
+}
+
+# One-delivery-per-vehicle assignment (single-stop runs)
+ASSIGNMENT_CONFIG = {
+    "objective": "makespan"      # "makespan" (shortest longest trip), "total" (least summed trip time) or "shuffle"
+}
+
+# Multi-stop truck routing (Clarke-Wright savings) for single runs
+MULTI_STOP_CONFIG = {
+    "enabled": True,             # Trucks run capacitated multi-stop tours instead of one customer each
+    "parcel_weight_kg": (1, 25), # Drawn per customer; loads are limited by each vehicle's VEHICLE_WEIGHTS payload
+    "improve_seconds": 1.0,      # Wall-clock budget for 2-opt/Or-opt/relocate/swap local search (0 = off)
+    "neighbours": 12,            # Nearest customers each customer tries moves towards
+    "report_interval_s": 0.2,    # Minimum gap between improved tours streamed to the map
+    "tandem": True,              # Drones ride the trucks and fly sorties between their stops
+    "launch_minutes": 1.0,       # Truck time to launch one drone
+    "recover_minutes": 1.0       # Truck time to recover one drone
+}
+
+# Live order intake: orders streamed in while the fleet is out join its routes by cheapest insertion
+ORDER_STREAM_CONFIG = {
+    "source": "generate",        # "generate[:rate[:count]]", "tcp:[host:]port" or a file of orders ("file:path" also works)
+    "generate_rate": 5.0,        # Orders per second from the built-in generator
+    "follow_file": True,         # Keep reading a file source as lines are appended (GUI; headless reads it once)
+    "poll_s": 0.1,               # How often idle sources check for new input
+    "batch_ms": 250,             # Orders that arrive within this window are inserted together
+    "default_kg": 2.0,           # Parcel weight of orders that do not give one
+    "vehicle_types": ["Electric Truck", "Fuel Truck"],  # Vehicles whose routes take new stops
+    "road_factor": 1.3,          # Road km per straight-line km when pricing truck detours
+    "wait_weight": 1.0,          # Weight of the customer's wait against the detour (0 = pure cheapest insertion)
+    "board_at_depot": False,     # True: parcels only join tours that have not left the depot yet
+    "max_backlog": 5000,         # Orders kept for retry when no route can take them; the oldest go first
+    "retry_s": 300.0             # Headless runs: simulated seconds between backlog retries once the stream ends
+}
+
+# Multi-depot runs: one simulation shard per hub, merged afterwards
+MULTI_DEPOT_CONFIG = {
+    "depots": [                  # Each hub's own fleet and the customers generated around it
+        {"name": "Delhi", "coords": [28.6139, 77.2090], "customers": 8,
+         "electric_trucks": 2, "fuel_trucks": 1, "drones": 3},
+        {"name": "Noida", "coords": [28.5355, 77.3910], "customers": 6,
+         "electric_trucks": 1, "fuel_trucks": 1, "drones": 2},
+        {"name": "Mumbai", "coords": [19.0760, 72.8777], "customers": 8,
+         "electric_trucks": 2, "fuel_trucks": 1, "drones": 3},
+        {"name": "Bengaluru", "coords": [12.9716, 77.5946], "customers": 6,
+         "electric_trucks": 1, "fuel_trucks": 1, "drones": 2}
+    ],
+    "cost": "duration",          # Customer goes to the hub with the cheapest leg: "duration" or "distance"
+    "workers": None,             # Shard processes; None uses one per hub up to the CPU count
+    "directory": "recordings/multi_depot"  # Where the GUI keeps the shard recordings it replays
+}
+
+# Route geometry simplification (tolerances in metres)
+ROUTE_SIMPLIFY_CONFIG = {
+    "road_tolerance_m": 5,       # Applied to OSRM/road geometry before it is stored
+    "zoom_levels": [             # (minimum map zoom, display tolerance), finest first
+        (13, 0),
+        (10, 30),
+        (7, 250),
+        (0, 1500)
+    ]
+}
+
 # Validation functions
 def validate_fleet_config(electric_trucks, fuel_trucks, drones):
     """Validate fleet configuration against constraints"""
@@ -299,6 +461,20 @@ __all__ = [
     'VEHICLE_SPEEDS',
     'VEHICLE_WEIGHTS',
     'VEHICLE_CHARACTERISTICS',
+    'ROUTE_CACHE_CONFIG',
+    'ROUTE_BUILD_CONFIG',
+    'ROUTING_CONFIG',
+    'TRAFFIC_CONFIG',
+    'ROUTE_SIMPLIFY_CONFIG',
+    'SIMULATION_CONFIG',
+    'MONTE_CARLO_CONFIG',
+    'RECORDING_CONFIG',
+    'SNAPSHOT_CONFIG',
+    'ENERGY_CONFIG',
+    'ASSIGNMENT_CONFIG',
+    'MULTI_STOP_CONFIG',
+    'MULTI_DEPOT_CONFIG',
+    'ORDER_STREAM_CONFIG',
     'validate_fleet_config',
     'validate_customer_count',
     'get_fleet_summary'
@@ -5,14 +5,20 @@ This module contains the core business logic, data structures,
 and API handling functionality.
 """
 
-from .data_manager import VehicleData, DeliveryPoint, DataSimulator
+from .data_manager import VehicleData, DeliveryPoint
 from .api_handler import RouteManager
+from .fleet_state import FleetState, ArrayRoute, RoundTripRoute, MultiStopRoute, ScheduledRoute, TimedRoute
 
 __all__ = [
     'VehicleData',
     'DeliveryPoint', 
-    'DataSimulator',
-    'RouteManager'
+    'RouteManager',
+    'FleetState',
+    'ArrayRoute',
+    'RoundTripRoute',
+    'MultiStopRoute',
+    'ScheduledRoute',
+    'TimedRoute'
 ]
 
 __version__ = '1.0.0'
\ No newline at end of file
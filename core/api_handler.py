@@ -178,20 +178,372 @@ DELIVERY_DISTANCE_MAX = 45  # km
 MAX_CUSTOMERS = 20
 MIN_CUSTOMERS = 1
 
-import math
+import os
+import sqlite3
+import threading
 import requests
 import json
 import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+
+import numpy as np
+
+from config.app_config import (ROUTE_CACHE_CONFIG, ROUTE_BUILD_CONFIG, ROUTING_CONFIG,
+                               ROUTE_SIMPLIFY_CONFIG, VEHICLE_SPEEDS, TRAFFIC_CONFIG)
+from core import geodesy, polyline, traffic
+from core.fleet_state import RoundTripRoute, MultiStopRoute, ScheduledRoute, TimedRoute
+from core.tandem import schedule
+from core.road_graph import RoadGraph
+
+class RouteCache:
+    """
+    Persistent SQLite cache for road routes
+    Keys are origin/destination snapped to a fixed number of decimal places,
+    entries expire after a TTL and the least recently used ones are evicted
+    once the cache grows beyond max_entries
+    """
+
+    def __init__(self, path=None, precision=None, max_entries=None, ttl_hours=None):
+        self.path = os.path.abspath(path or ROUTE_CACHE_CONFIG["path"])
+        self.precision = ROUTE_CACHE_CONFIG["precision"] if precision is None else precision
+        self.max_entries = ROUTE_CACHE_CONFIG["max_entries"] if max_entries is None else max_entries
+        ttl_hours = ROUTE_CACHE_CONFIG["ttl_hours"] if ttl_hours is None else ttl_hours
+        self.ttl_seconds = ttl_hours * 3600.0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # One shared connection guarded by a lock so route lookups may come from worker threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS routes ("
+            "key TEXT PRIMARY KEY, route TEXT NOT NULL, "
+            "created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS routes_last_access ON routes (last_access)")
+        self._conn.commit()
+
+    def make_key(self, start_lat, start_lon, end_lat, end_lon):
+        """Snap origin and destination to the configured precision"""
+        p = self.precision
+        return f"{start_lat:.{p}f},{start_lon:.{p}f};{end_lat:.{p}f},{end_lon:.{p}f}"
+
+    def get(self, start_lat, start_lon, end_lat, end_lon):
+        """Return the cached route as a list of [lat, lon] points, or None on a miss"""
+        key = self.make_key(start_lat, start_lon, end_lat, end_lon)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT route, created FROM routes WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            route_json, created = row
+            if self.ttl_seconds > 0 and now - created > self.ttl_seconds:
+                # Expired - drop it so the caller refreshes from the network
+                self._conn.execute("DELETE FROM routes WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE routes SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(route_json)
+
+    def put(self, start_lat, start_lon, end_lat, end_lon, route):
+        """Store a route and evict least recently used entries above max_entries"""
+        key = self.make_key(start_lat, start_lon, end_lat, end_lon)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO routes (key, route, created, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(route), now, now)
+            )
+
+            count = self._conn.execute("SELECT COUNT(*) FROM routes").fetchone()[0]
+            overflow = count - self.max_entries
+            if self.max_entries > 0 and overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM routes WHERE key IN "
+                    "(SELECT key FROM routes ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every cached route and reset the counters"""
+        with self._lock:
+            self._conn.execute("DELETE FROM routes")
+            self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM routes").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": size,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MatrixCache:
+    """
+    Incrementally grown all-pairs distance table
+    Every point seen gets a stable index; only entries never computed before are
+    requested from the distance source, so adding one customer costs one new
+    row and one new column
+    """
+
+    def __init__(self, precision=None):
+        self.precision = ROUTE_CACHE_CONFIG["precision"] if precision is None else precision
+        self.index = {}
+        self.points = []
+        self.distances = np.full((0, 0), np.nan)
+        self.computed_entries = 0
+        self._lock = threading.Lock()
+
+    def _key(self, point):
+        p = self.precision
+        return f"{point[0]:.{p}f},{point[1]:.{p}f}"
+
+    def _indices_for(self, points):
+        """Register points and return their matrix indices"""
+        indices = []
+        for point in points:
+            key = self._key(point)
+            idx = self.index.get(key)
+            if idx is None:
+                idx = len(self.points)
+                self.index[key] = idx
+                self.points.append([float(point[0]), float(point[1])])
+            indices.append(idx)
+
+        n = len(self.points)
+        if n > self.distances.shape[0]:
+            # Grow geometrically so repeated single additions stay cheap
+            size = max(n, 2 * self.distances.shape[0], 16)
+            grown = np.full((size, size), np.nan)
+            old = self.distances.shape[0]
+            grown[:old, :old] = self.distances
+            self.distances = grown
+
+        return np.array(indices, dtype=np.int64)
+
+    def lookup(self, origins, destinations, compute_block):
+        """
+        Return the origins x destinations distance block, filling gaps with
+        compute_block(block_origins, block_destinations) -> ndarray in km
+        """
+        with self._lock:
+            rows = self._indices_for(origins)
+            cols = self._indices_for(destinations)
+            unique_rows = np.unique(rows)
+            unique_cols = np.unique(cols)
+
+            # Pass 1: origins never seen before get a full row
+            block = self.distances[np.ix_(unique_rows, unique_cols)]
+            new_rows = unique_rows[np.isnan(block).all(axis=1)]
+            if len(new_rows):
+                self._fill(new_rows, unique_cols, compute_block)
+
+            # Pass 2: remaining gaps are new destinations for known origins
+            block = self.distances[np.ix_(unique_rows, unique_cols)]
+            missing = np.isnan(block)
+            if missing.any():
+                gap_rows = unique_rows[missing.any(axis=1)]
+                gap_cols = unique_cols[missing.any(axis=0)]
+                self._fill(gap_rows, gap_cols, compute_block)
+
+            return self.distances[np.ix_(rows, cols)].copy()
+
+    def _fill(self, rows, cols, compute_block):
+        block_origins = [self.points[i] for i in rows]
+        block_destinations = [self.points[j] for j in cols]
+        self.distances[np.ix_(rows, cols)] = compute_block(block_origins, block_destinations)
+        self.computed_entries += len(rows) * len(cols)
+
+    def clear(self):
+        with self._lock:
+            self.index = {}
+            self.points = []
+            self.distances = np.full((0, 0), np.nan)
+            self.computed_entries = 0
+
 
 class RouteManager:
     """Route planning using actual road networks with strict depot enforcement"""
 
+    # Incremental distance tables for straight-line (drone) and road (truck) travel
+    matrix_caches = {"air": MatrixCache(), "road": MatrixCache()}
+    # Road travel tables per set of traffic speed factors (one per time slot in use)
+    traffic_matrix_caches = {}
+
+    # Shared persistent route cache, created on first use
+    route_cache = None
+    route_cache_failed = False
+
+    # Shared keep-alive HTTP session, created on first use
+    http_session = None
+    _session_lock = threading.Lock()
+
+    @staticmethod
+    def get_http_session():
+        """Return the shared requests.Session with a connection pool sized for parallel builds"""
+        with RouteManager._session_lock:
+            if RouteManager.http_session is None:
+                pool_size = ROUTE_BUILD_CONFIG["http_pool_size"]
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                RouteManager.http_session = session
+        return RouteManager.http_session
+
+    @staticmethod
+    def get_route_cache():
+        """Return the shared RouteCache, or None when caching is disabled or unavailable"""
+        if not ROUTE_CACHE_CONFIG["enabled"] or RouteManager.route_cache_failed:
+            return None
+
+        if RouteManager.route_cache is None:
+            try:
+                RouteManager.route_cache = RouteCache()
+            except sqlite3.Error as e:
+                print(f"Route cache unavailable, continuing without it: {e}")
+                RouteManager.route_cache_failed = True
+                return None
+
+        return RouteManager.route_cache
+
+    # Offline road graph, loaded on first use
+    road_graph = None
+    road_graph_failed = False
+    _graph_lock = threading.Lock()
+
+    @staticmethod
+    def get_road_graph():
+        """Return the offline RoadGraph, or None when no extract is available"""
+        if ROUTING_CONFIG["backend"] == "osrm" or RouteManager.road_graph_failed:
+            return None
+
+        with RouteManager._graph_lock:
+            if RouteManager.road_graph is None:
+                path = ROUTING_CONFIG["road_graph_path"]
+                if not os.path.exists(path):
+                    if ROUTING_CONFIG["backend"] == "local":
+                        print(f"Road graph extract not found at {path}")
+                    RouteManager.road_graph_failed = True
+                    return None
+                try:
+                    start = time.time()
+                    RouteManager.road_graph = RoadGraph.load(path)
+                    print(f"Loaded road graph: {RouteManager.road_graph.node_count} nodes, "
+                          f"{RouteManager.road_graph.edge_count} edges in {time.time() - start:.2f}s")
+                except Exception as e:
+                    print(f"Failed to load road graph {path}: {e}")
+                    RouteManager.road_graph_failed = True
+                    return None
+
+        return RouteManager.road_graph
+
+    @staticmethod
+    def get_road_route(start_lat, start_lon, end_lat, end_lon, depart_s=None):
+        """
+        Get a truck route along real roads using the configured backend
+        The offline road graph is tried first (no network needed); OSRM is only
+        used when the graph is missing or cannot connect the two points.
+        With traffic profiles the graph picks the fastest route for the hour of
+        depart_s (simulated seconds, default t = 0) rather than the shortest.
+        """
+        backend = ROUTING_CONFIG["backend"]
+
+        graph = RouteManager.get_road_graph()
+        if graph is not None:
+            profiles = traffic.get_profiles()
+            class_factors = None if profiles is None else profiles.class_factors(depart_s or 0.0)
+            route = graph.route(start_lat, start_lon, end_lat, end_lon, ROUTING_CONFIG["max_snap_m"], class_factors)
+            if route:
+                # Points where the road class changes are kept, so the simplified route can still be classified
+                breaks = np.flatnonzero(np.diff(graph.segment_classes(route))) + 1
+                return polyline.simplify(route, ROUTE_SIMPLIFY_CONFIG["road_tolerance_m"], breaks)
+            print("Offline road graph has no path between these points")
+
+        if backend == "local":
+            return RouteManager.create_fallback_route(start_lat, start_lon, end_lat, end_lon)
+
+        return RouteManager.get_osrm_route(start_lat, start_lon, end_lat, end_lon)
+
+    @staticmethod
+    def segment_classes(coords):
+        """Road class of every segment of a path (core.traffic.ROAD_CLASSES index, UNCLASSIFIED off the graph)"""
+        graph = RouteManager.get_road_graph()
+        if graph is None:
+            return np.full(max(len(coords) - 1, 0), traffic.UNCLASSIFIED, dtype=np.intp)
+        return graph.segment_classes(coords)
+
+    @staticmethod
+    def traffic_hours(coords, speed, depart_s):
+        """Hours to every waypoint of a truck path driven from depart_s through traffic; None when traffic is off"""
+        profiles = traffic.get_profiles()
+        if profiles is None:
+            return None
+        coords = np.asarray(coords, dtype=np.float64)
+        return profiles.path_hours(geodesy.path_lengths(coords), RouteManager.segment_classes(coords), speed, depart_s)
+
+    @staticmethod
+    def timed_route(route, vehicle_type, speed, depart_s):
+        """
+        The route timed through traffic for a trip leaving at depart_s (a TimedRoute)
+        Returns route itself for vehicles traffic does not slow, when traffic is
+        off, and for tandem timetables, which are timed when they are built.
+        """
+        profiles = traffic.get_profiles()
+        if (profiles is None or vehicle_type not in TRAFFIC_CONFIG["vehicle_types"] or speed <= 0
+                or (isinstance(route, ScheduledRoute) and not isinstance(route, TimedRoute))):
+            return route
+        coords = np.asarray(route, dtype=np.float64)
+        return traffic.time_route(route, speed, depart_s, RouteManager.segment_classes(coords), profiles)
+
     @staticmethod
     def get_osrm_route(start_lat, start_lon, end_lat, end_lon):
         """
         Get actual road route using OSRM (Open Source Routing Machine)
         This is a FREE service that provides real road routing
+        Successful responses are kept in the persistent route cache, so repeated
+        depot/customer pairs never hit the network again
         """
+        cache = RouteManager.get_route_cache()
+        if cache is not None:
+            cached_route = cache.get(start_lat, start_lon, end_lat, end_lon)
+            if cached_route:
+                # ENFORCE: Snapped keys may differ slightly from the exact request
+                cached_route[0] = [start_lat, start_lon]
+                return cached_route
+
         try:
             # OSRM API expects longitude,latitude format
             start_coord = f"{start_lon},{start_lat}"
@@ -206,7 +558,8 @@ class RouteManager:
                 'steps': 'false'
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            session = RouteManager.get_http_session()
+            response = session.get(url, params=params, timeout=ROUTE_BUILD_CONFIG["request_timeout"])
             
             if response.status_code == 200:
                 data = response.json()
@@ -215,17 +568,19 @@ class RouteManager:
                     # Extract coordinates from the route
                     coordinates = data['routes'][0]['geometry']['coordinates']
                     
-                    # Convert from [lon, lat] to [lat, lon] and filter points
-                    route_points = []
-                    for i, coord in enumerate(coordinates):
-                        # Take every 3rd point to reduce density but keep detail
-                        if i % 3 == 0 or i == len(coordinates) - 1:
-                            route_points.append([coord[1], coord[0]])  # lat, lon
+                    # Convert from [lon, lat] to [lat, lon], then drop points that
+                    # deviate less than the tolerance from the simplified line
+                    route_points = [[coord[1], coord[0]] for coord in coordinates]
+                    route_points = polyline.simplify(route_points, ROUTE_SIMPLIFY_CONFIG["road_tolerance_m"])
                     
                     # ENFORCE: Ensure route starts exactly at the requested start point
                     if route_points:
                         route_points[0] = [start_lat, start_lon]
-                    
+
+                        # Only real road geometry is cached, never the fallback line
+                        if cache is not None:
+                            cache.put(start_lat, start_lon, end_lat, end_lon, route_points)
+
                     return route_points
             
             print(f"OSRM API failed with status: {response.status_code}")
@@ -252,21 +607,21 @@ class RouteManager:
         
         # Create intermediate points based on distance
         num_points = max(5, min(20, int(distance / 2)))  # 1 point every 2km approximately
-        
-        for i in range(1, num_points):
-            t = i / num_points
-            
-            # Linear interpolation
-            lat = start_lat + (end_lat - start_lat) * t
-            lon = start_lon + (end_lon - start_lon) * t
-            
-            # Add slight deviations to simulate road curves
-            deviation = 0.001 * (1 - abs(t - 0.5) * 2)  # More deviation in middle
-            lat += (hash(str(i)) % 1000 - 500) / 500000 * deviation  # Deterministic "random"
-            lon += (hash(str(i + 100)) % 1000 - 500) / 500000 * deviation
-            
-            route.append([lat, lon])
-        
+
+        # Interpolate all intermediate points along the great circle at once
+        steps = np.arange(1, num_points)
+        t = steps / num_points
+        lats, lons = geodesy.interpolate_great_circle(start_lat, start_lon, end_lat, end_lon, t)
+
+        # Add slight deviations to simulate road curves
+        deviation = 0.001 * (1 - np.abs(t - 0.5) * 2)  # More deviation in middle
+        # crc32 rather than hash(): str hashes are salted per process, which made
+        # seeded runs differ between the GUI, the CLI and pool workers
+        lats = lats + np.array([zlib.crc32(str(i).encode()) % 1000 - 500 for i in steps]) / 500000 * deviation  # Deterministic "random"
+        lons = lons + np.array([zlib.crc32(str(i + 100).encode()) % 1000 - 500 for i in steps]) / 500000 * deviation
+
+        route.extend(np.column_stack((lats, lons)).tolist())
+
         # ENFORCE: Always end exactly at the specified coordinates
         route.append([end_lat, end_lon])
         return route
@@ -285,26 +640,23 @@ class RouteManager:
         
         # For drones, create fewer waypoints for straighter flight
         num_points = max(2, min(8, int(distance / 5)))  # 1 point every 5km for smooth movement
-        
-        for i in range(1, num_points):
-            t = i / num_points
-            
-            # Simple linear interpolation for straight flight
-            lat = start_lat + (end_lat - start_lat) * t
-            lon = start_lon + (end_lon - start_lon) * t
-            
-            route.append([lat, lon])
-        
+
+        # Straight flight follows the great circle between the two points
+        t = np.arange(1, num_points) / num_points
+        lats, lons = geodesy.interpolate_great_circle(start_lat, start_lon, end_lat, end_lon, t)
+        route.extend(np.column_stack((lats, lons)).tolist())
+
         # ENFORCE: Always end exactly at the specified coordinates
         route.append([end_lat, end_lon])
         return route
 
     @staticmethod
-    def build_delivery_route(depot, delivery, use_drone=True):
+    def build_delivery_route(depot, delivery, use_drone=True, depart_s=None):
         """
         Build a route from depot to delivery and back using the same path
         Vehicle visits delivery point exactly once, then returns via same route
         ENFORCES that the route starts and ends exactly at the depot coordinates
+        Trucks are routed for the traffic at depart_s (simulated seconds, default t = 0)
         """
         # VALIDATE: Ensure depot coordinates are provided
         if not depot or len(depot) != 2:
@@ -329,8 +681,8 @@ class RouteManager:
         else:
             # TRUCKS: Use actual road networks
             print("Creating truck delivery route using real road network...")
-            outbound_route = RouteManager.get_osrm_route(
-                depot_lat, depot_lon, delivery_lat, delivery_lon
+            outbound_route = RouteManager.get_road_route(
+                depot_lat, depot_lon, delivery_lat, delivery_lon, depart_s
             )
             print(f"Truck outbound route completed with {len(outbound_route)} road waypoints")
         
@@ -343,13 +695,10 @@ class RouteManager:
             print("WARNING: API call failed, using emergency fallback route")
             outbound_route = [[depot_lat, depot_lon], [delivery_lat, delivery_lon]]
         
-        # CREATE RETURN ROUTE: Reverse the same path (excluding delivery point to avoid duplicate)
-        # This creates the exact same path but in reverse direction
-        return_route = outbound_route[:-1]  # Remove delivery point
-        return_route.reverse()  # Reverse the order to go back to depot
-        
-        # COMBINE: Outbound route + return route (same path, reversed)
-        complete_route = outbound_route + return_route
+        # CREATE RETURN ROUTE: The same path in reverse, stored as a reversed view of
+        # the outbound buffer (excluding the delivery point to avoid a duplicate)
+        complete_route = RoundTripRoute(outbound_route)
+        return_route = complete_route.return_leg
         
         print(f"Complete route: {len(outbound_route)} waypoints to delivery + {len(return_route)} waypoints back = {len(complete_route)} total")
         print(f"Route validation: Starts at {complete_route[0]}, visits delivery at waypoint {len(outbound_route)-1}, ends at {complete_route[-1]}")
@@ -361,14 +710,9 @@ class RouteManager:
                       abs(complete_route[-1][1] - depot_lon) < 0.0001)
         
         # Verify delivery point is visited exactly once
-        delivery_visits = 0
-        delivery_waypoint_index = -1
-        for i, waypoint in enumerate(complete_route):
-            if (abs(waypoint[0] - delivery_lat) < 0.0001 and 
-                abs(waypoint[1] - delivery_lon) < 0.0001):
-                delivery_visits += 1
-                if delivery_waypoint_index == -1:
-                    delivery_waypoint_index = i
+        at_delivery = np.all(np.abs(np.asarray(complete_route) - [delivery_lat, delivery_lon]) < 0.0001, axis=1)
+        delivery_visits = int(at_delivery.sum())
+        delivery_waypoint_index = int(np.argmax(at_delivery)) if delivery_visits else -1
         
         if not start_matches:
             print(f"WARNING: Route does not start exactly at depot!")
@@ -381,6 +725,156 @@ class RouteManager:
         
         return complete_route
 
+    @staticmethod
+    def build_multi_stop_route(depot, tours, use_drone=False, depart_s=None):
+        """
+        Build one path that runs every tour in turn: depot -> stops -> depot,
+        then the next tour. Legs come from the same road (or flight) routing
+        as single deliveries, so they share its cache. Road legs are routed for
+        the traffic at the trip's departure, depart_s (default t = 0).
+        """
+        if not depot or len(depot) != 2:
+            raise ValueError("Depot coordinates must be provided as [lat, lon]")
+        
+        stop_count = sum(len(tour) for tour in tours)
+        print(f"Building multi-stop route from depot {depot}: {len(tours)} tours, {stop_count} stops (drone: {use_drone})")
+        
+        coords = [list(depot)]
+        stop_index = []
+        for tour in tours:
+            for start, end in zip([depot] + list(tour), list(tour) + [depot]):
+                if use_drone:
+                    leg = RouteManager.create_drone_route(start[0], start[1], end[0], end[1])
+                else:
+                    leg = RouteManager.get_road_route(start[0], start[1], end[0], end[1], depart_s)
+                if not leg:
+                    leg = [list(start), list(end)]
+                # ENFORCE: every leg ends exactly on its stop
+                leg[-1] = [end[0], end[1]]
+                coords.extend(leg[1:])
+                stop_index.append(len(coords) - 1)
+            stop_index.pop()    # The last leg of a tour ends at the depot, not a stop
+        
+        route = MultiStopRoute(coords, stop_index)
+        print(f"Multi-stop route completed with {len(route)} waypoints, {route.total_km:.1f} km")
+        return route
+
+    @staticmethod
+    def build_tandem_routes(depot, plan, depart_s=None):
+        """
+        Scheduled routes for a truck and the drones riding on it
+        plan holds the truck's "speed", its "drones" as [name, speed] pairs,
+        "launch_hours"/"recover_hours" and its "tours", each with the truck's
+        "stops" and drone "sorties" as [launch node, customer, recover node,
+        drone name] (nodes index depot + stops + depot). The timetable is worked
+        out from the built legs, so trucks wait for late drones and drones
+        follow their truck's exact path between sorties. The truck leaves at
+        depart_s (default plan["depart_s"], else t = 0); each tour's road legs
+        are routed and timed for the traffic when that tour starts.
+        Returns {name: ScheduledRoute} for the truck (plan["truck"]) and every drone.
+        """
+        if not depot or len(depot) != 2:
+            raise ValueError("Depot coordinates must be provided as [lat, lon]")
+        
+        def leg(start, end, use_drone, leave_s=None):
+            if use_drone:
+                coords = RouteManager.create_drone_route(start[0], start[1], end[0], end[1])
+            else:
+                coords = RouteManager.get_road_route(start[0], start[1], end[0], end[1], leave_s)
+            if not coords:
+                coords = [list(start), list(end)]
+            # ENFORCE: every leg ends exactly on its stop
+            coords[-1] = [end[0], end[1]]
+            coords = np.asarray(coords, dtype=np.float64)
+            return coords, np.concatenate(([0.0], np.cumsum(geodesy.path_lengths(coords))))
+        
+        truck_speed = plan["speed"]
+        if depart_s is None:
+            depart_s = plan.get("depart_s", 0.0)
+        drone_speed = dict(plan["drones"])
+        truck_coords, truck_hours, truck_stops = [np.asarray([depot], dtype=np.float64)], [np.zeros(1)], []
+        truck_km = 0.0
+        flights = {name: [] for name in drone_speed}    # Drone -> (launch h, landing h, path, hours, stop waypoint)
+        clock = 0.0
+        
+        for tour in plan["tours"]:
+            nodes = [depot] + tour["stops"] + [depot]
+            tour_s = depart_s + clock * 3600.0
+            legs = [leg(start, end, False, tour_s) for start, end in zip(nodes[:-1], nodes[1:])]
+            # Hours into each truck leg, driven through traffic from the tour's start (waits for drones aside)
+            path = np.concatenate([legs[0][0][:1]] + [coords[1:] for coords, _ in legs])
+            hours = RouteManager.traffic_hours(path, truck_speed, tour_s)
+            if hours is None:
+                leg_hours = [km / truck_speed for _, km in legs]
+            else:
+                ends = np.cumsum([len(coords) - 1 for coords, _ in legs])
+                leg_hours = [hours[end - len(coords) + 1:end + 1] - hours[end - len(coords) + 1]
+                             for (coords, _), end in zip(legs, ends)]
+            sorties = []
+            for a, customer, b, name in tour["sorties"]:
+                out_coords, out_km = leg(nodes[a], customer, True)
+                back_coords, back_km = leg(customer, nodes[b], True)
+                sorties.append((a, b, name, out_coords, out_km, back_coords, back_km))
+            arrive, depart, launched, landed = schedule(
+                [hours[-1] for hours in leg_hours],
+                [(a, b) for a, b, *_ in sorties],
+                [(out_km[-1] / drone_speed[name], back_km[-1] / drone_speed[name])
+                 for _, _, name, _, out_km, _, back_km in sorties],
+                plan["launch_hours"], plan["recover_hours"]
+            )
+            
+            for p, (coords, km) in enumerate(legs):
+                if depart[p] > arrive[p]:
+                    truck_coords.append(coords[:1])
+                    truck_hours.append([clock + depart[p]])
+                truck_coords.append(coords[1:])
+                truck_hours.append(clock + depart[p] + leg_hours[p][1:])
+                truck_km += km[-1]
+                if p + 1 < len(nodes) - 1:
+                    truck_stops.append(sum(len(c) for c in truck_coords) - 1)
+            if depart[-1] > arrive[-1]:
+                # Back at the depot, the truck waits to recover the drones landing there
+                truck_coords.append(truck_coords[-1][-1:])
+                truck_hours.append([clock + depart[-1]])
+            
+            for (a, b, name, out_coords, out_km, back_coords, back_km), up, down in zip(sorties, launched, landed):
+                speed = drone_speed[name]
+                path = np.concatenate((out_coords, back_coords[1:], back_coords[-1:]))
+                hours = np.concatenate((up + out_km / speed, up + (out_km[-1] + back_km[1:]) / speed, [down]))
+                flights[name].append((clock + up, clock + down, path, clock + hours, len(out_coords) - 1,
+                                      out_km[-1] + back_km[-1]))
+            clock += depart[-1]
+        
+        truck_coords = np.concatenate(truck_coords)
+        truck_hours = np.concatenate(truck_hours)
+        routes = {plan["truck"]: ScheduledRoute(truck_coords, truck_hours * truck_speed, truck_stops, truck_km)}
+        
+        def ride(start, end):
+            # The truck's path between two times, endpoints interpolated
+            inside = (truck_hours > start) & (truck_hours < end)
+            ends = np.column_stack([np.interp([start, end], truck_hours, truck_coords[:, k]) for k in (0, 1)])
+            return np.concatenate((ends[:1], truck_coords[inside], ends[1:])), np.concatenate(([start], truck_hours[inside], [end]))
+        
+        for name, speed in plan["drones"]:
+            coords, hours, stops, km = [], [], [], 0.0
+            aboard = 0.0
+            for up, down, path, path_hours, customer, flown_km in sorted(flights[name], key=lambda f: f[0]):
+                riding, riding_hours = ride(aboard, up)
+                coords.extend([riding, path])
+                hours.extend([riding_hours, path_hours])
+                stops.append(sum(len(c) for c in coords) - len(path) + customer)
+                km += flown_km
+                aboard = down
+            riding, riding_hours = ride(aboard, clock)
+            coords.append(riding)
+            hours.append(riding_hours)
+            routes[name] = ScheduledRoute(np.concatenate(coords), np.concatenate(hours) * speed, stops, km)
+        
+        print(f"Tandem routes for {plan['truck']} and {len(plan['drones'])} drones: "
+              f"{sum(len(t['stops']) for t in plan['tours'])} truck stops, "
+              f"{sum(len(t['sorties']) for t in plan['tours'])} sorties, {clock:.2f} h")
+        return routes
+
     @staticmethod
     def build_roundtrip_route(depot, delivery, use_drone=True):
         """
@@ -390,6 +884,63 @@ class RouteManager:
         """
         return RouteManager.build_delivery_route(depot, delivery, use_drone)
 
+    @staticmethod
+    def build_routes_parallel(jobs, max_workers=None, on_route=None, should_stop=None, depart_s=None):
+        """
+        Build many delivery routes concurrently on a bounded thread pool
+        jobs is a list of (key, depot, delivery, use_drone) tuples, where delivery is
+        one [lat, lon], a list of tours for a multi-stop route or a tandem plan dict
+        (build_tandem_routes, which yields a route for the truck and each of its
+        drones); on_route(key, route) is called from the worker pool as each route
+        finishes, in completion order. Trucks are routed for the traffic at
+        depart_s, the simulated time the vehicles leave (default t = 0).
+        Returns a dict mapping key -> route for every job that completed
+        """
+        max_workers = max_workers or ROUTE_BUILD_CONFIG["max_workers"]
+        routes = {}
+
+        if not jobs:
+            return routes
+
+        # Warm the shared session before threads race to create it
+        RouteManager.get_http_session()
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+            futures = {
+                executor.submit(RouteManager.build_tandem_routes, depot, delivery, depart_s)
+                if isinstance(delivery, dict)
+                else executor.submit(
+                    RouteManager.build_multi_stop_route if isinstance(delivery[0], (list, tuple))
+                    else RouteManager.build_delivery_route,
+                    depot, delivery, use_drone, depart_s
+                ): key
+                for key, depot, delivery, use_drone in jobs
+            }
+
+            for future in as_completed(futures):
+                key = futures[future]
+
+                if should_stop is not None and should_stop():
+                    # Drop queued work; running requests finish on their own timeout
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+                try:
+                    route = future.result()
+                except Exception as e:
+                    print(f"Route build failed for {key}: {e}")
+                    continue
+
+                # A tandem job yields a group of routes keyed by vehicle
+                group = route if isinstance(route, dict) else {key: route}
+                for name, route in group.items():
+                    routes[name] = route
+                    if on_route is not None:
+                        on_route(name, route)
+
+        return routes
+
     @staticmethod
     def validate_delivery_compliance(route, depot_coords, delivery_coords):
         """
@@ -429,18 +980,158 @@ class RouteManager:
         else:
             return False, "Route validation failed"
 
+    @staticmethod
+    def matrix(origins, destinations, vehicle_type="Drone", depart_s=None):
+        """
+        Distance and duration matrices between every origin and destination
+        Drones use straight-line distance; trucks use the offline road graph or
+        the OSRM table service. Results are cached incrementally per profile.
+        Durations of vehicles slowed by traffic follow the fastest path at the
+        hour of depart_s (simulated seconds, default t = 0).
+        Returns (distance_km, duration_hours) as NumPy arrays of shape (len(origins), len(destinations))
+        """
+        if len(origins) == 0 or len(destinations) == 0:
+            empty = np.zeros((len(origins), len(destinations)))
+            return empty, empty.copy()
+
+        if vehicle_type == "Drone":
+            distance_km = RouteManager.matrix_caches["air"].lookup(
+                origins, destinations, RouteManager.haversine_matrix
+            )
+        else:
+            distance_km = RouteManager.matrix_caches["road"].lookup(
+                origins, destinations, RouteManager.road_distance_matrix
+            )
+
+        duration_hours = distance_km / VEHICLE_SPEEDS[vehicle_type]
+        profiles = traffic.get_profiles()
+        if profiles is not None and vehicle_type in TRAFFIC_CONFIG["vehicle_types"]:
+            class_factors = profiles.class_factors(depart_s or 0.0)
+            cache = RouteManager.traffic_matrix_caches.setdefault(class_factors.tobytes(), MatrixCache())
+            travel_km = cache.lookup(
+                origins, destinations,
+                lambda block_origins, block_destinations: RouteManager.road_travel_matrix(
+                    block_origins, block_destinations, class_factors)
+            )
+            duration_hours = travel_km / VEHICLE_SPEEDS[vehicle_type]
+        return distance_km, duration_hours
+
+    @staticmethod
+    def haversine_matrix(origins, destinations):
+        """Pairwise great-circle distances in km between two lists of [lat, lon]"""
+        return geodesy.pairwise_haversine(origins, destinations)
+
+    @staticmethod
+    def road_distance_matrix(origins, destinations):
+        """
+        Pairwise road distances in km using the configured truck routing backend
+        Pairs no backend can answer fall back to straight-line distance
+        """
+        distances = None
+
+        graph = RouteManager.get_road_graph()
+        if graph is not None:
+            max_snap = ROUTING_CONFIG["max_snap_m"]
+            dest_nodes = [graph.nearest_node(lat, lon, max_snap)[0] for lat, lon in destinations]
+            dest_nodes = [-1 if n is None else n for n in dest_nodes]
+            distances = np.full((len(origins), len(destinations)), np.inf)
+
+            for i, (lat, lon) in enumerate(origins):
+                source, _ = graph.nearest_node(lat, lon, max_snap)
+                if source is not None:
+                    distances[i] = graph.distances_from(source, dest_nodes) / 1000.0
+
+        elif ROUTING_CONFIG["backend"] != "local":
+            distances = RouteManager.get_osrm_table(origins, destinations)
+
+        straight = RouteManager.haversine_matrix(origins, destinations)
+        if distances is None:
+            return straight
+
+        unresolved = ~np.isfinite(distances)
+        if unresolved.any():
+            print(f"Road matrix: {int(unresolved.sum())} pairs without a road path, using straight-line distance")
+            distances[unresolved] = straight[unresolved]
+        return distances
+
+    @staticmethod
+    def road_travel_matrix(origins, destinations, class_factors):
+        """
+        Pairwise road travel for the given speed factors (SpeedProfiles.class_factors)
+        In km at nominal speed - length / factor along the fastest path - so hours
+        are km / speed. Pairs the road graph cannot answer take their road
+        distance at the default class's factor.
+        """
+        travel = np.full((len(origins), len(destinations)), np.inf)
+
+        graph = RouteManager.get_road_graph()
+        if graph is not None:
+            max_snap = ROUTING_CONFIG["max_snap_m"]
+            dest_nodes = [graph.nearest_node(lat, lon, max_snap)[0] for lat, lon in destinations]
+            dest_nodes = [-1 if n is None else n for n in dest_nodes]
+            for i, (lat, lon) in enumerate(origins):
+                source, _ = graph.nearest_node(lat, lon, max_snap)
+                if source is not None:
+                    travel[i] = graph.distances_from(source, dest_nodes, class_factors) / 1000.0
+
+        unresolved = ~np.isfinite(travel)
+        if unresolved.any():
+            distance_km = RouteManager.matrix_caches["road"].lookup(
+                origins, destinations, RouteManager.road_distance_matrix
+            )
+            travel[unresolved] = distance_km[unresolved] / class_factors[-1]
+        return travel
+
+    @staticmethod
+    def get_osrm_table(origins, destinations, max_coordinates=100):
+        """
+        Road distance matrix in km from the OSRM table service
+        Requests are chunked by origin rows to stay under the server's coordinate limit;
+        returns None if any request fails
+        """
+        distances = np.full((len(origins), len(destinations)), np.inf)
+        rows_per_request = max(1, max_coordinates - len(destinations))
+        session = RouteManager.get_http_session()
+
+        for start in range(0, len(origins), rows_per_request):
+            chunk = origins[start:start + rows_per_request]
+            coords = list(chunk) + list(destinations)
+            coord_str = ";".join(f"{lon},{lat}" for lat, lon in coords)
+            params = {
+                "sources": ";".join(str(i) for i in range(len(chunk))),
+                "destinations": ";".join(str(len(chunk) + j) for j in range(len(destinations))),
+                "annotations": "distance"
+            }
+
+            try:
+                response = session.get(
+                    f"http://router.project-osrm.org/table/v1/driving/{coord_str}",
+                    params=params, timeout=ROUTE_BUILD_CONFIG["request_timeout"]
+                )
+                if response.status_code != 200:
+                    print(f"OSRM table failed with status: {response.status_code}")
+                    return None
+                data = response.json()
+            except requests.exceptions.RequestException as e:
+                print(f"OSRM table request failed: {e}")
+                return None
+
+            block = np.array(
+                [[np.inf if d is None else d / 1000.0 for d in row] for row in data.get("distances", [])],
+                dtype=np.float64
+            )
+            if block.shape != (len(chunk), len(destinations)):
+                print("OSRM table returned an unexpected shape")
+                return None
+            distances[start:start + len(chunk)] = block
+
+        return distances
+
     @staticmethod
     def haversine(lat1, lon1, lat2, lon2):
         """
         Calculate the great-circle distance between two points on the Earth.
         Returns distance in kilometers.
+        Scalar wrapper around core.geodesy.haversine; pass arrays to that directly
         """
-        R = 6371.0  # Earth radius in km
-        phi1 = math.radians(lat1)
-        phi2 = math.radians(lat2)
-        dphi = math.radians(lat2 - lat1)
-        dlambda = math.radians(lon2 - lon1)
-
-        a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        return R * c
\ No newline at end of file
+        return float(geodesy.haversine(lat1, lon1, lat2, lon2))
\ No newline at end of file
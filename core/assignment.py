@@ -0,0 +1,148 @@
+"""
+Optimal vehicle-to-delivery assignment
+
+Every vehicle makes one trip, and a cost matrix holds what each vehicle
+would take to serve each delivery (np.inf where it cannot). "total"
+minimises the summed cost with the Hungarian algorithm (scipy's
+linear_sum_assignment). "makespan" minimises the longest trip instead: a
+binary search over the distinct costs finds the smallest threshold that
+still lets every vehicle (or every delivery, whichever is fewer) be matched,
+and the total cost is then minimised among assignments that respect it.
+
+Vehicles of one type have identical rows, and ties that massive make the
+general algorithms slow (seconds at 1000 x 1000). When the matrix has only a
+few distinct rows, each group of identical vehicles is treated as one
+supply: a threshold is checked with Hall's condition over the groups, and
+the assignment is the transportation problem over groups, whose LP optimum
+is integral. Both are exact and take milliseconds.
+"""
+import numpy as np
+from scipy.optimize import linear_sum_assignment, linprog
+from scipy.sparse import csr_matrix, eye, kron, vstack
+from scipy.sparse.csgraph import maximum_bipartite_matching
+
+OBJECTIVES = ("makespan", "total")
+MAX_GROUPS = 8      # Distinct rows up to which the grouped solver is used (Hall's condition checks 2^groups subsets)
+
+
+def _matching_size(allowed):
+    """Size of a maximum matching using only the allowed (row, column) pairs"""
+    if not allowed.any():
+        return 0
+    matched = maximum_bipartite_matching(csr_matrix(allowed), perm_type="column")
+    return int((matched >= 0).sum())
+
+
+def _grouped_matching_size(allowed, counts):
+    """
+    Maximum matching size when row g stands for counts[g] identical rows
+    By the deficiency form of Hall's theorem it is rows - max(|S| - |N(S)|),
+    and the worst S is always a union of whole groups.
+    """
+    groups = len(counts)
+    subsets = (np.arange(1 << groups)[:, None] >> np.arange(groups)[None, :]) & 1
+    neighbours = (subsets.astype(np.int64) @ allowed.astype(np.int64) > 0).sum(axis=1)
+    deficiency = subsets @ counts - neighbours
+    return int(counts.sum() - max(deficiency.max(), 0))
+
+
+def bottleneck_threshold(cost, counts=None):
+    """
+    Smallest c such that a maximum matching exists using only pairs costing <= c
+    With counts, row g of cost stands for counts[g] identical rows. Returns
+    np.inf when no pair is feasible.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if counts is None:
+        size = _matching_size
+        rows = cost.shape[0]
+    else:
+        counts = np.asarray(counts, dtype=np.int64)
+        size = lambda allowed: _grouped_matching_size(allowed, counts)
+        rows = int(counts.sum())
+    feasible = np.isfinite(cost)
+    target = size(feasible)
+    if target == 0:
+        return np.inf
+
+    values = np.unique(cost[feasible])
+    lo, hi = 0, len(values) - 1
+    # Every matched row (or column) needs at least its cheapest pair, which bounds the search from below
+    if target == min(rows, cost.shape[1]):
+        cheapest = np.where(feasible, cost, np.inf).min(axis=1 if rows <= cost.shape[1] else 0)
+        lo = int(np.searchsorted(values, cheapest[np.isfinite(cheapest)].max()))
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if size(cost <= values[mid]) == target:
+            hi = mid
+        else:
+            lo = mid + 1
+    return float(values[lo])
+
+
+def _assign_grouped(cost, allowed, counts):
+    """Cheapest maximum matching as a transportation LP: group g supplies counts[g], each column takes one"""
+    groups, columns = cost.shape
+    target = _grouped_matching_size(allowed, counts)
+    if target == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+    # Variables x[g, j], one per allowed pair (row-major)
+    pairs = np.flatnonzero(allowed.ravel())
+    per_group = kron(eye(groups), np.ones((1, columns)), format="csr")[:, pairs]
+    per_column = kron(np.ones((1, groups)), eye(columns), format="csr")[:, pairs]
+    result = linprog(
+        cost.ravel()[pairs],
+        A_ub=vstack([per_group, per_column]), b_ub=np.concatenate((counts, np.ones(columns))),
+        A_eq=np.ones((1, len(pairs))), b_eq=[target],
+        bounds=(0, 1), method="highs"
+    )
+    if not result.success:
+        raise RuntimeError(f"Grouped assignment failed: {result.message}")
+
+    # The constraint matrix is a network matrix, so the optimal vertex is integral
+    chosen = pairs[np.round(result.x) == 1]
+    return np.divmod(chosen, columns)
+
+
+def assign(cost, objective="makespan"):
+    """
+    (rows, columns) index arrays of the optimal pairs for a (vehicles, deliveries) cost matrix
+    At most min(vehicles, deliveries) pairs are returned; infeasible pairs never are.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown assignment objective {objective!r}; expected one of {OBJECTIVES}")
+    cost = np.asarray(cost, dtype=np.float64)
+    empty = np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    if cost.size == 0:
+        return empty
+
+    # Identical rows grouped by their bytes, which is much cheaper than sorting them
+    first_row = {}
+    group_of = np.array([first_row.setdefault(row.tobytes(), len(first_row)) for row in cost], dtype=np.intp)
+    distinct = cost[[np.argmax(group_of == g) for g in range(len(first_row))]]
+    counts = np.bincount(group_of)
+    grouped = len(distinct) <= MAX_GROUPS and len(distinct) < len(cost)
+
+    if grouped:
+        allowed = np.isfinite(distinct)
+        if objective == "makespan":
+            allowed &= distinct <= bottleneck_threshold(distinct, counts)
+        groups, cols = _assign_grouped(distinct, allowed, counts)
+        # Hand each group's columns to its vehicles in row order
+        members = [iter(np.flatnonzero(group_of == g).tolist()) for g in range(len(distinct))]
+        rows = np.array([next(members[g]) for g in groups], dtype=np.intp)
+        order = np.argsort(rows, kind="stable")
+        return rows[order], cols[order].astype(np.intp)
+
+    allowed = np.isfinite(cost)
+    if objective == "makespan":
+        allowed &= cost <= bottleneck_threshold(cost)
+    if not allowed.any():
+        return empty
+
+    # Forbidden pairs cost more than any feasible assignment, so they are only used when nothing else fits
+    forbidden = cost[allowed].max() * min(cost.shape) + 1.0
+    rows, cols = linear_sum_assignment(np.where(allowed, cost, forbidden))
+    keep = allowed[rows, cols]
+    return rows[keep], cols[keep]
@@ -1,22 +1,20 @@
 """
 Data structures and data management for vehicle tracking and delivery system
 """
-import time
-import random
 import numpy as np
 from collections import deque
 from datetime import datetime
-from PyQt5.QtCore import QThread, pyqtSignal
 
 class VehicleData:
     """Data structure for vehicle information"""
-    def __init__(self, vehicle_id, vehicle_type, lat, lon, status="Idle", speed=0):
+    def __init__(self, vehicle_id, vehicle_type, lat, lon, status="Idle", speed=0, soc=None):
         self.vehicle_id = vehicle_id
         self.vehicle_type = vehicle_type
         self.lat = lat
         self.lon = lon
         self.status = status
         self.speed = speed
+        self.soc = soc  # Battery state of charge (0-1); None or NaN for vehicles without one
         self.last_update = datetime.now()
 
 class DeliveryPoint:
@@ -28,24 +26,3 @@ class DeliveryPoint:
         self.lon = lon
         self.weight = weight
         self.distance = distance
-
-class DataSimulator(QThread):
-    """Simulates real-time vehicle and sensor data"""
-    vehicle_updated = pyqtSignal(VehicleData)
-    sound_data_updated = pyqtSignal(float, list)
-    
-    def __init__(self):
-        super().__init__()
-        self.running = True
-        
-    def run(self):
-        while self.running:
-            # Simulate drone sound data
-            sound_level = random.uniform(30, 60)  # dB levels
-            time_series = [random.uniform(-1, 1) for _ in range(50)]  # Audio waveform
-            self.sound_data_updated.emit(sound_level, time_series)
-            
-            time.sleep(1)  # Update every second
-    
-    def stop(self):
-        self.running = False
\ No newline at end of file
@@ -0,0 +1,74 @@
+"""
+Battery model for drones and electric trucks
+
+A vehicle's draw per km is its type's base rate scaled by how fast it goes
+relative to its VEHICLE_SPEEDS cruise speed, plus a payload term. Parcels go
+out full and come back empty (or are dropped one by one on a tour), so on
+average half the load is carried over a trip. battery_profile gives the draw
+at cruise speed when a vehicle is dispatched; FleetState prices every segment
+of its trip at the pace it is actually driven (traffic, waits) with path_kwh,
+and tracks every vehicle's charge and where it would run flat as arrays. The
+depot tops batteries up by swapping packs or by charging.
+"""
+import numpy as np
+
+from config.app_config import ENERGY_CONFIG, VEHICLE_SPEEDS
+
+LOAD_SHARE = 0.5    # Average share of its load a vehicle carries over a trip
+SWAP = "swap"
+RECHARGE = "recharge"
+
+
+def battery_profile(spec):
+    """
+    {"battery_kwh", "kwh_per_km"} for a vehicle spec (type, optional load_kg)
+    kwh_per_km is the draw at cruise speed. Zeros when its type has no battery
+    or ENERGY_CONFIG is disabled. Drones riding a truck take fresh packs from
+    it, so they are not tracked either.
+    """
+    params = ENERGY_CONFIG["vehicles"].get(spec["type"])
+    if not ENERGY_CONFIG["enabled"] or params is None or "carrier" in spec:
+        return {"battery_kwh": 0.0, "kwh_per_km": 0.0}
+
+    kwh_per_km = params["kwh_per_km"] + params["kwh_per_km_per_kg"] * spec.get("load_kg", 0.0) * LOAD_SHARE
+    return {"battery_kwh": float(params["battery_kwh"]), "kwh_per_km": float(kwh_per_km)}
+
+
+def path_kwh(vehicle_type, kwh_per_km, speed, road_km, pace=1.0):
+    """
+    kWh drawn up to every waypoint of a path
+    road_km is the distance driven to each waypoint, speed the vehicle's
+    nominal speed and pace the actual speed on each segment as a multiple of
+    it (1 everywhere unless traffic or a timetable says otherwise); kwh_per_km
+    is the vehicle's draw at cruise speed from battery_profile.
+    """
+    road_km = np.asarray(road_km, dtype=np.float64)
+    rate = np.full(len(road_km) - 1, float(kwh_per_km))
+    params = ENERGY_CONFIG["vehicles"].get(vehicle_type)
+    if params is not None:
+        # Only the base rate depends on speed; the payload term stays as it is
+        relative = np.asarray(pace, dtype=np.float64) * speed / VEHICLE_SPEEDS[vehicle_type]
+        rate += params["kwh_per_km"] * (relative ** params["speed_exponent"] - 1.0)
+    return np.concatenate(([0.0], np.cumsum(rate * np.diff(road_km))))
+
+
+def range_km(vehicle_type, load_kg=0.0):
+    """
+    Distance on one battery at cruise speed carrying load_kg out (broadcasts over load_kg)
+    None when ENERGY_CONFIG does not track the type's battery.
+    """
+    params = ENERGY_CONFIG["vehicles"].get(vehicle_type)
+    if not ENERGY_CONFIG["enabled"] or params is None:
+        return None
+    load_kg = np.asarray(load_kg, dtype=np.float64)
+    return params["battery_kwh"] / (params["kwh_per_km"] + params["kwh_per_km_per_kg"] * load_kg * LOAD_SHARE)
+
+
+def top_up(vehicle_type, used_kwh):
+    """(SWAP or RECHARGE, minutes) to refill a battery at the depot; (None, 0) for untracked types"""
+    params = ENERGY_CONFIG["vehicles"].get(vehicle_type)
+    if params is None or used_kwh <= 0:
+        return None, 0.0
+    if params["depot"] == "swap":
+        return SWAP, params["swap_minutes"]
+    return RECHARGE, used_kwh / params["charge_kw"] * 60.0
@@ -0,0 +1,45 @@
+"""
+Vehicle-delivery feasibility
+
+Which vehicle can serve which delivery, for a whole fleet at once: a pair is
+feasible when the parcel fits the vehicle's payload and the depot -> delivery
+-> depot trip is within the vehicle's range (the battery model's, for
+battery vehicles). Everything is one broadcast comparison over a
+(vehicles, deliveries) matrix, so planners can mask out impossible pairs
+before allocating anything and an infeasible pair never reaches route
+construction.
+"""
+import numpy as np
+
+from config.app_config import VEHICLE_CHARACTERISTICS, VEHICLE_SPEEDS
+from core import energy
+
+
+def vehicle_range_km(vehicle_type, load_kg=0.0):
+    """
+    Distance a vehicle covers on one charge or tank, capped by its operating time at cruise speed
+    Battery vehicles get the range of the ENERGY_CONFIG battery model for a
+    load_kg parcel (broadcasts over load_kg); the rest their rated max_range_km.
+    """
+    characteristics = VEHICLE_CHARACTERISTICS[vehicle_type]
+    range_km = energy.range_km(vehicle_type, load_kg)
+    if range_km is None:
+        range_km = characteristics["max_range_km"]
+    range_km = np.minimum(range_km, characteristics["battery_life_hours"] * VEHICLE_SPEEDS[vehicle_type])
+    return np.broadcast_to(range_km, np.shape(load_kg))
+
+
+def feasibility_mask(payload_kg, range_km, parcel_kg, trip_km):
+    """
+    (vehicles, deliveries) boolean mask of the pairs a vehicle can serve
+    payload_kg holds one value per vehicle, range_km one per vehicle or per
+    pair, parcel_kg one per delivery, and trip_km the (vehicles, deliveries) round-trip distances
+    (np.inf or NaN where there is no route, which is never feasible).
+    """
+    payload_kg = np.asarray(payload_kg, dtype=np.float64).reshape(-1, 1)
+    parcel_kg = np.asarray(parcel_kg, dtype=np.float64).reshape(1, -1)
+    range_km = np.asarray(range_km, dtype=np.float64)
+    if range_km.ndim < 2:
+        range_km = range_km.reshape(-1, 1)
+    trip_km = np.asarray(trip_km, dtype=np.float64).reshape(len(payload_kg), parcel_kg.shape[1])
+    return (parcel_kg <= payload_kg) & (trip_km <= range_km)
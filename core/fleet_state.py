@@ -0,0 +1,506 @@
+"""
+Array-backed route and fleet state
+
+Routes keep their coordinates in one contiguous float64 buffer and a round
+trip stores only its outbound leg; the return leg is a reversed view of the
+same memory. FleetState keeps per-vehicle values in parallel NumPy arrays
+(struct-of-arrays) while still answering fleet[name]["pos"] style lookups,
+so code written against the old dict-of-dicts keeps working.
+"""
+import numpy as np
+
+from core import energy
+from core.polyline import RouteIndex
+
+
+class ArrayRoute:
+    """Route held as one contiguous (n, 2) float64 array with list-style access"""
+
+    def __init__(self, coords):
+        self.coords = np.ascontiguousarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.index = RouteIndex(self.coords)
+
+    @property
+    def total_km(self):
+        return self.index.total_km
+
+    @property
+    def travel_km(self):
+        """Distance actually covered (differs from total_km for scheduled routes)"""
+        return self.total_km
+
+    @property
+    def nbytes(self):
+        return self.coords.nbytes + self.index.cumulative_km.nbytes
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+        return self.coords[item].tolist()
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        return self.coords if dtype is None else self.coords.astype(dtype)
+
+    def tolist(self):
+        return self.coords.tolist()
+
+    def position_at(self, distance_km):
+        """([lat, lon], segment index) of the point distance_km along the route"""
+        return self.index.position_at(distance_km)
+
+    @property
+    def depot_km(self):
+        """Distance along the route of every pass through the depot (the start, not the final arrival)"""
+        at_depot = np.all(np.abs(self.coords - self.coords[0]) < 1e-9, axis=1)
+        km = self.index.cumulative_km[at_depot]
+        return np.concatenate((km[:1], km[1:][km[1:] < self.index.total_km]))
+
+
+class RoundTripRoute(ArrayRoute):
+    """
+    Depot -> delivery -> depot along the same path
+    Only the outbound leg is stored; return_leg is a reversed view of it
+    """
+
+    def __init__(self, outbound):
+        super().__init__(outbound)
+        self.outbound = self.coords
+        self.return_leg = self.coords[-2::-1]  # Skips the delivery point, no copy
+
+    @property
+    def total_km(self):
+        return 2 * self.index.total_km
+
+    def __len__(self):
+        return 2 * len(self.outbound) - 1
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+
+        length = len(self)
+        if item < 0:
+            item += length
+        if not 0 <= item < length:
+            raise IndexError("route index out of range")
+
+        # Points past the delivery mirror back onto the outbound leg
+        last = len(self.outbound) - 1
+        return self.outbound[item if item <= last else 2 * last - item].tolist()
+
+    def __array__(self, dtype=None, copy=None):
+        return np.concatenate((self.outbound, self.return_leg)).astype(dtype or np.float64, copy=False)
+
+    def tolist(self):
+        return self.outbound.tolist() + self.return_leg.tolist()
+
+    def position_at(self, distance_km):
+        """([lat, lon], segment index on the full round trip) distance_km from the depot"""
+        outbound_km = self.index.total_km
+        if distance_km <= outbound_km:
+            return self.index.position_at(distance_km)
+
+        # Fold the return leg onto the outbound geometry
+        pos, segment = self.index.position_at(max(2 * outbound_km - distance_km, 0.0))
+        return pos, 2 * len(self.outbound) - 3 - segment
+
+    @property
+    def depot_km(self):
+        return np.zeros(1)
+
+
+
+class MultiStopRoute(ArrayRoute):
+    """
+    Chained depot -> stops -> depot tours stored as one path
+    stop_index holds the waypoint of every stop, in visiting order.
+    """
+
+    def __init__(self, coords, stop_index):
+        super().__init__(coords)
+        self.stop_index = np.asarray(stop_index, dtype=np.intp)
+
+    @property
+    def stop_km(self):
+        """Distance along the route at which each stop is reached"""
+        return self.index.cumulative_km[self.stop_index]
+
+
+class ScheduledRoute(MultiStopRoute):
+    """
+    Path followed to a timetable rather than at a steady pace
+    progress_km[i] is speed * hours until waypoint i is reached, so a vehicle
+    advancing at its nominal speed is at every waypoint on time: a waypoint
+    repeated with later progress is a wait, and a drone riding on a truck just
+    shares the truck's waypoints and times. travel_km is the distance covered
+    and road_km the distance along the path to every waypoint.
+    """
+
+    def __init__(self, coords, progress_km, stop_index, travel_km):
+        super().__init__(coords, stop_index)
+        self.index = RouteIndex(self.coords, progress_km)
+        self._travel_km = float(travel_km)
+        self.road_km = RouteIndex(self.coords).cumulative_km
+
+    @property
+    def travel_km(self):
+        return self._travel_km
+
+
+class TimedRoute(ScheduledRoute):
+    """
+    Road route timed through time-of-day traffic for a trip leaving at depart_s
+    Progress is speed * hours as on any scheduled route (core.traffic.time_route);
+    depart_s is kept so a rerouted trip can be timed again from the same start.
+    """
+
+    def __init__(self, coords, progress_km, stop_index, travel_km, depart_s):
+        super().__init__(coords, progress_km, stop_index, travel_km)
+        self.depart_s = float(depart_s)
+
+
+def route_kwh(route, vehicle_type, speed, kwh_per_km):
+    """
+    (progress km, kWh drawn) at waypoints of a route, each segment priced at the pace it is driven
+    A scheduled route's progress runs at the nominal speed, so road km per km
+    of progress is how much faster or slower the vehicle really goes
+    (traffic), and waiting or riding draws nothing. Other routes are driven at
+    the nominal speed throughout.
+    """
+    if isinstance(route, ScheduledRoute):
+        progress, road = route.index.cumulative_km, route.road_km
+        step = np.diff(progress)
+        pace = np.divide(np.diff(road), step, out=np.zeros(len(step)), where=step > 0)
+    else:
+        progress = road = np.array([0.0, route.total_km])
+        pace = 1.0
+    return progress, energy.path_kwh(vehicle_type, kwh_per_km, speed, road, pace)
+
+
+class VehicleView:
+    """Dict-style facade over one vehicle's slot in a FleetState"""
+
+    def __init__(self, fleet, slot):
+        self.fleet = fleet
+        self.slot = slot
+
+    def __getitem__(self, key):
+        fleet, slot = self.fleet, self.slot
+        if key == "type":
+            return fleet.types[slot]
+        if key == "route":
+            return fleet.routes[slot]
+        if key == "pos":
+            return fleet.pos[slot].tolist()
+        if key == "route_index":
+            return int(fleet.route_index[slot])
+        if key in FleetState.SCALAR_FIELDS:
+            return float(getattr(fleet, key)[slot])
+        if key == "energy_kwh":
+            return float(fleet.energy_kwh([slot])[0])
+        if key == "soc":
+            return float(fleet.state_of_charge([slot])[0])
+        if key == "stranded":
+            return bool(fleet.stranded_mask()[slot])
+        return fleet.extras[slot][key]
+
+    def __setitem__(self, key, value):
+        fleet, slot = self.fleet, self.slot
+        if key == "type":
+            fleet.types[slot] = value
+        elif key == "route":
+            fleet.set_route(slot, value)
+        elif key == "pos":
+            fleet.pos[slot] = value
+        elif key == "route_index":
+            fleet.route_index[slot] = value
+        elif key in FleetState.SCALAR_FIELDS:
+            getattr(fleet, key)[slot] = value
+            if key in FleetState.ENERGY_FIELDS:
+                fleet.update_energy(slot)
+        else:
+            fleet.extras[slot][key] = value
+
+    def __contains__(self, key):
+        return key in FleetState.CORE_FIELDS or key in self.fleet.extras[self.slot]
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return list(FleetState.CORE_FIELDS) + list(self.fleet.extras[self.slot])
+
+
+class FleetState:
+    """
+    Struct-of-arrays state for the whole fleet
+    Behaves like a dict of vehicle name -> vehicle dict; values are VehicleView facades
+    """
+    ENERGY_FIELDS = ("battery_kwh", "kwh_per_km")
+    SCALAR_FIELDS = ("speed", "weight", "distance_km") + ENERGY_FIELDS
+    CORE_FIELDS = ("type", "route", "pos", "route_index") + SCALAR_FIELDS
+
+    def __init__(self, capacity=16):
+        self.names = []
+        self.slots = {}
+        self.types = []
+        self.routes = []
+        self.extras = []
+        self.packed = False
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.speed = np.zeros(capacity)
+        self.weight = np.zeros(capacity)
+        self.distance_km = np.zeros(capacity)
+        self.total_km = np.zeros(capacity)
+        self.route_index = np.zeros(capacity, dtype=np.intp)
+        self.route_length = np.zeros(capacity, dtype=np.intp)
+        self.pos = np.zeros((capacity, 2))
+        # Battery model: pack size (0 = no battery), kWh per km travelled, kWh per km of route
+        # progress (differs on scheduled routes) and where the pack runs flat (inf = never)
+        self.battery_kwh = np.zeros(capacity)
+        self.kwh_per_km = np.zeros(capacity)
+        self.drain_kwh = np.zeros(capacity)
+        self.strand_km = np.full(capacity, np.inf)
+
+    def _arrays(self):
+        return (self.speed, self.weight, self.distance_km, self.total_km, self.route_index, self.route_length,
+                self.pos, self.battery_kwh, self.kwh_per_km, self.drain_kwh, self.strand_km)
+
+    def _grow(self):
+        count = len(self.names)
+        old = self._arrays()
+        self._allocate(max(2 * self.capacity, 16))
+        new = self._arrays()
+        for src, dst in zip(old, new):
+            dst[:count] = src[:count]
+
+    def set_route(self, slot, route):
+        if not isinstance(route, ArrayRoute):
+            route = ArrayRoute(route)
+        self.routes[slot] = route
+        self.packed = False
+        self.total_km[slot] = route.total_km
+        self.route_length[slot] = len(route)
+        self.update_energy(slot)
+
+    def update_energy(self, slot):
+        """
+        Recompute a vehicle's draw and where its battery runs flat on its route
+        drain_kwh is the route's average per km of progress (route_kwh). Every
+        pass through the depot tops the battery up, so each depot-to-depot trip
+        has to fit in one pack; the first that does not strands the vehicle
+        that far along it.
+        """
+        route = self.routes[slot]
+        total = self.total_km[slot]
+        self.drain_kwh[slot] = 0.0
+        self.strand_km[slot] = np.inf
+        if self.kwh_per_km[slot] <= 0 or total <= 0:
+            return
+
+        progress, kwh = route_kwh(route, self.types[slot], self.speed[slot], self.kwh_per_km[slot])
+        self.drain_kwh[slot] = kwh[-1] / total
+        if self.battery_kwh[slot] <= 0:
+            return
+
+        trip_kwh = np.interp(np.append(route.depot_km, total), progress, kwh)
+        short = np.flatnonzero(np.diff(trip_kwh) > self.battery_kwh[slot])
+        if len(short):
+            self.strand_km[slot] = np.interp(trip_kwh[short[0]] + self.battery_kwh[slot], kwh, progress)
+
+    def add(self, name, vehicle):
+        """Add (or replace) a vehicle from a dict with at least type, speed, weight and route"""
+        slot = self.slots.get(name)
+        if slot is None:
+            if len(self.names) == self.capacity:
+                self._grow()
+            slot = len(self.names)
+            self.slots[name] = slot
+            self.names.append(name)
+            self.types.append(None)
+            self.routes.append(None)
+            self.extras.append({})
+
+        self.types[slot] = vehicle["type"]
+        self.set_route(slot, vehicle["route"])
+        route = self.routes[slot]
+        self.speed[slot] = vehicle["speed"]
+        self.weight[slot] = vehicle["weight"]
+        self.battery_kwh[slot] = vehicle.get("battery_kwh", 0.0)
+        self.kwh_per_km[slot] = vehicle.get("kwh_per_km", 0.0)
+        self.update_energy(slot)
+        self.distance_km[slot] = vehicle.get("distance_km", 0.0)
+        self.route_index[slot] = vehicle.get("route_index", 0)
+        pos = vehicle.get("pos")
+        self.pos[slot] = route.coords[0] if pos is None else pos
+        self.extras[slot] = {key: value for key, value in vehicle.items()
+                             if key not in self.CORE_FIELDS}
+        return VehicleView(self, slot)
+
+    def __setitem__(self, name, vehicle):
+        self.add(name, vehicle)
+
+    def __getitem__(self, name):
+        return VehicleView(self, self.slots[name])
+
+    def __contains__(self, name):
+        return name in self.slots
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(list(self.names))
+
+    def __bool__(self):
+        return bool(self.names)
+
+    def get(self, name, default=None):
+        return self[name] if name in self.slots else default
+
+    def keys(self):
+        return list(self.names)
+
+    def values(self):
+        return [VehicleView(self, slot) for slot in range(len(self.names))]
+
+    def items(self):
+        return [(name, VehicleView(self, slot)) for slot, name in enumerate(self.names)]
+
+    def clear(self):
+        self.names = []
+        self.slots = {}
+        self.types = []
+        self.routes = []
+        self.extras = []
+        self.packed = False
+        self._allocate(self.capacity)
+
+    def active_mask(self):
+        """Vehicles that have not yet reached the end of their route (or run their battery flat)"""
+        count = len(self.names)
+        return (self.route_index[:count] < self.route_length[:count] - 1) & ~self.stranded_mask()
+
+    def stranded_mask(self):
+        """Vehicles stopped on their route with a flat battery"""
+        count = len(self.names)
+        strand = self.strand_km[:count]
+        return (strand < self.total_km[:count]) & (self.distance_km[:count] >= strand)
+
+    def energy_kwh(self, slots=None):
+        """Charge left in each vehicle's battery (all or the given slots); NaN for vehicles without one"""
+        if not self.packed:
+            self._pack()
+        slots = np.arange(len(self.names)) if slots is None else np.asarray(slots, dtype=np.intp)
+        distance = self.distance_km[slots]
+        # The battery was last topped up at the latest depot pass behind the vehicle
+        key = np.minimum(distance, self.leg_km[slots]) + self.key_base[slots]
+        last = self.packed_depot_key[np.searchsorted(self.packed_depot_key, key, side="right") - 1]
+        since_km = distance - (last - self.key_base[slots])
+        battery = self.battery_kwh[slots]
+        energy = np.maximum(battery - self.drain_kwh[slots] * since_km, 0.0)
+        return np.where(battery > 0, energy, np.nan)
+
+    def state_of_charge(self, slots=None):
+        """energy_kwh() as a fraction of each battery; NaN for vehicles without one"""
+        slots = np.arange(len(self.names)) if slots is None else np.asarray(slots, dtype=np.intp)
+        battery = self.battery_kwh[slots]
+        return np.divide(self.energy_kwh(slots), battery, out=np.full(len(slots), np.nan), where=battery > 0)
+
+    def reset(self):
+        """Put every vehicle back at the start of its route"""
+        count = len(self.names)
+        self.distance_km[:count] = 0.0
+        self.route_index[:count] = 0
+        for slot, route in enumerate(self.routes):
+            self.pos[slot] = route.coords[0]
+
+    def _pack(self):
+        """
+        Concatenate every route into one buffer for the vectorised step
+        Each route's cumulative distances are shifted by a per-route base so the
+        packed key array is increasing overall and one searchsorted call can
+        locate every vehicle on its own route at once
+        """
+        routes = self.routes
+        self.route_points = np.array([len(route.coords) for route in routes], dtype=np.intp)
+        self.route_offset = np.zeros(len(routes), dtype=np.intp)
+        self.route_offset[1:] = np.cumsum(self.route_points)[:-1]
+        self.leg_km = np.array([route.index.total_km for route in routes])
+        self.round_trip = np.array([isinstance(route, RoundTripRoute) for route in routes], dtype=bool)
+
+        # A 1 km gap keeps the last point of one route below the first of the next
+        self.key_base = np.zeros(len(routes))
+        self.key_base[1:] = np.cumsum(self.leg_km + 1.0)[:-1]
+
+        self.packed_coords = np.concatenate([route.coords for route in routes])
+        self.packed_key = np.concatenate([route.index.cumulative_km for route in routes])
+        self.packed_key += np.repeat(self.key_base, self.route_points)
+        depots = [route.depot_km for route in routes]
+        self.packed_depot_key = np.concatenate(depots) if depots else np.zeros(0)
+        self.packed_depot_key += np.repeat(self.key_base, [len(km) for km in depots])
+        self.packed = True
+
+    def advance(self, dt_hours):
+        """
+        Move every active vehicle speed * dt along its route in a few array operations
+        Leftover distance carries across waypoints. Returns the slots that moved.
+        """
+        active = np.flatnonzero(self.active_mask())
+        if len(active) == 0:
+            return active
+
+        self.seek(active, self.distance_km[active] + self.speed[active] * dt_hours)
+        return active
+
+    def seek(self, slots, distance_km):
+        """Place the given vehicles distance_km along their routes (clamped to each route)"""
+        if not self.packed:
+            self._pack()
+
+        total = self.total_km[slots]
+        # A vehicle whose battery runs flat stops there
+        distance = np.minimum(np.clip(distance_km, 0.0, total), self.strand_km[slots])
+        self.distance_km[slots] = distance
+
+        # Round trips fold the return leg back onto the stored outbound geometry
+        leg = self.leg_km[slots]
+        returning = self.round_trip[slots] & (distance > leg)
+        along = np.maximum(np.where(returning, 2 * leg - distance, distance), 0.0)
+        key = along + self.key_base[slots]
+
+        offset = self.route_offset[slots]
+        points = self.route_points[slots]
+        segment = np.searchsorted(self.packed_key, key, side="right") - 1
+        np.clip(segment, offset, offset + np.maximum(points - 2, 0), out=segment)
+        following = np.where(points > 1, segment + 1, segment)  # Single-point routes stay put
+
+        start_key = self.packed_key[segment]
+        length = self.packed_key[following] - start_key
+        fraction = np.divide(key - start_key, length, out=np.zeros_like(key), where=length > 0)
+
+        start = self.packed_coords[segment]
+        self.pos[slots] = start + (self.packed_coords[following] - start) * fraction[:, None]
+
+        local = segment - offset
+        route_index = np.where(returning, 2 * points - 3 - local, local)
+        finished = distance >= total
+        route_index[finished] = self.route_length[slots][finished] - 1
+        self.route_index[slots] = route_index
+
+    def positions(self):
+        """(n, 2) view of every vehicle's current [lat, lon]"""
+        return self.pos[:len(self.names)]
+
+    def nbytes(self):
+        """Approximate bytes held by route buffers"""
+        return sum(route.nbytes for route in self.routes)
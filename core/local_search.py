@@ -0,0 +1,305 @@
+"""
+Time-budgeted local search over capacitated multi-stop tours
+
+Improves a set of tours (e.g. from Clarke-Wright) with 2-opt, Or-opt and
+inter-tour relocate and swap moves. Each customer only tries moves towards
+its nearest neighbours, and every move is priced by the handful of edges it
+changes, so a move costs O(1) to evaluate however many customers there are.
+Once no move improves, part of the best solution is ruined and recreated by
+cheapest insertion and the search carries on, so the result keeps improving
+until the wall-clock budget runs out.
+"""
+import random
+import time
+from collections import deque
+
+import numpy as np
+
+EPSILON = 1e-9
+
+
+def neighbour_lists(distance, k):
+    """The k nearest customers of every customer (matrix indices, depot excluded), nearest first"""
+    customers = np.asarray(distance, dtype=np.float64)[1:, 1:].copy()
+    np.fill_diagonal(customers, np.inf)
+    k = min(k, len(customers) - 1)
+    if k <= 0:
+        return [[] for _ in range(len(customers) + 1)]
+    nearest = np.argpartition(customers, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(customers, nearest, axis=1).argsort(axis=1)
+    nearest = np.take_along_axis(nearest, order, axis=1) + 1
+    return [[]] + nearest.tolist()
+
+
+class LocalSearch:
+    """
+    Anytime improvement of tours given as lists of 0-based customer indices
+    distance is the (n + 1, n + 1) matrix with the depot at index 0. Internally
+    customers are matrix indices and a tour's ends connect to the depot.
+    """
+
+    def __init__(self, distance, demands, capacity, tours, neighbours=12, rng=None):
+        distance = np.asarray(distance, dtype=np.float64)
+        # Tours may run either way round, so moves are priced on the symmetric matrix
+        self.d = ((distance + distance.T) / 2.0).tolist()
+        self.demand = [0.0] + [float(q) for q in demands]
+        self.capacity = capacity
+        self.rng = rng or random.Random(0)
+        self.neighbours = neighbour_lists(distance, neighbours)
+
+        self.routes = [[c + 1 for c in tour] for tour in tours if tour]
+        self.route_of = [-1] * len(self.demand)
+        self.pos_of = [0] * len(self.demand)
+        for r in range(len(self.routes)):
+            self._index(r)
+        self.load = [sum(self.demand[c] for c in route) for route in self.routes]
+        self.cost = sum(self._route_km(route) for route in self.routes)
+        self.moves = 0
+
+    # Bookkeeping
+
+    def _index(self, r):
+        for position, c in enumerate(self.routes[r]):
+            self.route_of[c] = r
+            self.pos_of[c] = position
+
+    def _route_km(self, route):
+        d = self.d
+        stops = [0] + route + [0]
+        return sum(d[a][b] for a, b in zip(stops[:-1], stops[1:]))
+
+    def _prev(self, c):
+        position = self.pos_of[c]
+        return self.routes[self.route_of[c]][position - 1] if position > 0 else 0
+
+    def _next(self, c):
+        route = self.routes[self.route_of[c]]
+        position = self.pos_of[c] + 1
+        return route[position] if position < len(route) else 0
+
+    def tours(self):
+        """Current tours as lists of 0-based customer indices (empty tours dropped)"""
+        return [[c - 1 for c in route] for route in self.routes if route]
+
+    # Moves: each returns True after applying an improving move for customer a
+
+    def _two_opt(self, a):
+        """Reverse the stretch between a and a neighbour in the same tour"""
+        d = self.d
+        r = self.route_of[a]
+        na = self._next(a)
+        for b in self.neighbours[a]:
+            if self.route_of[b] != r or b == na:
+                continue
+            i, j = self.pos_of[a], self.pos_of[b]
+            if i < j:
+                # a -> b and na -> nb replace a -> na and b -> nb
+                nb = self._next(b)
+                delta = d[a][b] + d[na][nb] - d[a][na] - d[b][nb]
+                lo, hi = i + 1, j
+            else:
+                # pb -> pa and b -> a replace pb -> b and pa -> a
+                pa, pb = self._prev(a), self._prev(b)
+                delta = d[pb][pa] + d[b][a] - d[pb][b] - d[pa][a]
+                lo, hi = j, i - 1
+            if delta < -EPSILON:
+                route = self.routes[r]
+                route[lo:hi + 1] = route[lo:hi + 1][::-1]
+                self._index(r)
+                self.cost += delta
+                return True
+        return False
+
+    def _move_segment(self, a):
+        """Relocate (1 customer) or Or-opt (2-3 customers) starting at a, next to a neighbour, either way round"""
+        d = self.d
+        ra = self.route_of[a]
+        route_a = self.routes[ra]
+        start = self.pos_of[a]
+        for length in (1, 2, 3):
+            end = start + length - 1
+            if end >= len(route_a):
+                break
+            segment = route_a[start:end + 1]
+            first, last = segment[0], segment[-1]
+            p = route_a[start - 1] if start > 0 else 0
+            n = route_a[end + 1] if end + 1 < len(route_a) else 0
+            removed = d[p][first] + d[last][n] - d[p][n]
+            seg_load = sum(self.demand[c] for c in segment)
+
+            for b in self.neighbours[a]:
+                rb = self.route_of[b]
+                if b in segment or (rb != ra and self.load[rb] + seg_load > self.capacity + EPSILON):
+                    continue
+                # Insert between b and its successor, or between its predecessor and b
+                for x, y in ((b, self._next(b)), (self._prev(b), b)):
+                    if x in segment or y in segment or (x == p and y == n):
+                        continue
+                    forward = d[x][first] + d[last][y] - d[x][y]
+                    backward = d[x][last] + d[first][y] - d[x][y]
+                    added, reverse = (forward, False) if forward <= backward else (backward, True)
+                    delta = added - removed
+                    if delta < -EPSILON:
+                        self._apply_segment(ra, start, end, rb, x, y, reverse, seg_load)
+                        self.cost += delta
+                        return True
+        return False
+
+    def _apply_segment(self, ra, start, end, rb, x, y, reverse, seg_load):
+        segment = self.routes[ra][start:end + 1]
+        del self.routes[ra][start:end + 1]
+        if reverse:
+            segment.reverse()
+        route_b = self.routes[rb]
+        # Positions in rb may have shifted if it is the same tour
+        if x != 0:
+            at = route_b.index(x) + 1
+        else:
+            at = route_b.index(y) if y != 0 else 0
+        route_b[at:at] = segment
+        self.load[ra] -= seg_load
+        self.load[rb] += seg_load
+        self._index(ra)
+        if rb != ra:
+            self._index(rb)
+
+    def _swap(self, a):
+        """Exchange a with a neighbour in another tour"""
+        d = self.d
+        ra = self.route_of[a]
+        pa, na = self._prev(a), self._next(a)
+        for b in self.neighbours[a]:
+            rb = self.route_of[b]
+            if rb == ra:
+                continue
+            shift = self.demand[b] - self.demand[a]
+            if self.load[ra] + shift > self.capacity + EPSILON or self.load[rb] - shift > self.capacity + EPSILON:
+                continue
+            pb, nb = self._prev(b), self._next(b)
+            delta = (d[pa][b] + d[b][na] - d[pa][a] - d[a][na]
+                     + d[pb][a] + d[a][nb] - d[pb][b] - d[b][nb])
+            if delta < -EPSILON:
+                i, j = self.pos_of[a], self.pos_of[b]
+                self.routes[ra][i], self.routes[rb][j] = b, a
+                self.load[ra] += shift
+                self.load[rb] -= shift
+                self._index(ra)
+                self._index(rb)
+                self.cost += delta
+                return True
+        return False
+
+    # Search
+
+    def descend(self, deadline, active=None):
+        """
+        Apply improving moves until none is left or the deadline passes; returns False on timeout
+        Only customers in active (default: all) are tried; one that moves puts
+        itself and its neighbours back in the queue, so after a local change the
+        work stays local however many customers there are.
+        """
+        if active is None:
+            active = [c for route in self.routes for c in route]
+            self.rng.shuffle(active)
+        queue = deque(active)
+        queued = set(active)
+        count = 0
+        while queue:
+            count += 1
+            if count % 32 == 0 and time.perf_counter() > deadline:
+                return False
+            a = queue.popleft()
+            queued.discard(a)
+            if self._two_opt(a) or self._move_segment(a) or self._swap(a):
+                self.moves += 1
+                for c in [a] + self.neighbours[a]:
+                    if c not in queued:
+                        queued.add(c)
+                        queue.append(c)
+        return True
+
+    def _ruin_recreate(self, fraction):
+        """Pull out a random cluster of customers and put each back where it is cheapest"""
+        d = self.d
+        customers = [c for route in self.routes for c in route]
+        seed = self.rng.choice(customers)
+        count = max(2, int(len(customers) * fraction))
+        removed = [seed] + [c for c in self.neighbours[seed] if c != seed][:count - 1]
+
+        for c in removed:
+            r = self.route_of[c]
+            self.routes[r].remove(c)
+            self.load[r] -= self.demand[c]
+            self._index(r)
+        self.rng.shuffle(removed)
+
+        for c in removed:
+            best = None
+            for r, route in enumerate(self.routes):
+                if self.load[r] + self.demand[c] > self.capacity + EPSILON:
+                    continue
+                stops = [0] + route + [0]
+                for position in range(len(stops) - 1):
+                    x, y = stops[position], stops[position + 1]
+                    added = d[x][c] + d[c][y] - d[x][y]
+                    if best is None or added < best[0]:
+                        best = (added, r, position)
+            if best is None:
+                # No tour has room: open a new one
+                self.routes.append([])
+                self.load.append(0.0)
+                best = (0.0, len(self.routes) - 1, 0)
+            _, r, position = best
+            self.routes[r].insert(position, c)
+            self.load[r] += self.demand[c]
+            self._index(r)
+        self.cost = sum(self._route_km(route) for route in self.routes)
+        return removed
+
+    def _restore(self, routes):
+        self.routes = [list(route) for route in routes]
+        for r in range(len(self.routes)):
+            self._index(r)
+        self.load = [sum(self.demand[c] for c in route) for route in self.routes]
+        self.cost = sum(self._route_km(route) for route in self.routes)
+
+    def improve(self, budget_s, on_improvement=None, report_interval_s=0.1, ruin_fraction=0.05, should_stop=None):
+        """
+        Search until budget_s of wall-clock time has passed and return the best tours
+        on_improvement(tours, km) is called with each new best solution, at most
+        once per report_interval_s and always for the final one. should_stop()
+        returning True ends the search early with the best tours so far.
+        """
+        started = time.perf_counter()
+        deadline = started + budget_s
+        best_routes = [list(route) for route in self.routes]
+        best_cost = self.cost
+        reported_at = started
+        rounds = 0
+
+        active = None
+        while True:
+            finished = self.descend(deadline, active)
+            if self.cost < best_cost - EPSILON:
+                best_routes = [list(route) for route in self.routes if route]
+                best_cost = self.cost
+                now = time.perf_counter()
+                if on_improvement is not None and now - reported_at >= report_interval_s:
+                    reported_at = now
+                    on_improvement([[c - 1 for c in route] for route in best_routes], best_cost)
+            else:
+                self._restore(best_routes)
+            if not finished or time.perf_counter() > deadline or len(self.demand) < 4:
+                break
+            if should_stop is not None and should_stop():
+                break
+            removed = self._ruin_recreate(ruin_fraction)
+            active = list({c for r in removed for c in [r] + self.neighbours[r]})
+            rounds += 1
+
+        self._restore(best_routes)
+        self.rounds = rounds
+        self.seconds = time.perf_counter() - started
+        if on_improvement is not None:
+            on_improvement(self.tours(), self.cost)
+        return self.tours()
@@ -0,0 +1,168 @@
+"""
+Polyline simplification and multi-resolution route storage
+
+Douglas-Peucker with the tolerance expressed in metres, so a straight highway
+collapses to a handful of points while hairpins keep every corner that
+deviates by more than the tolerance. Coordinates are [lat, lon] lists.
+"""
+import numpy as np
+
+from core.geodesy import EARTH_RADIUS_KM, path_lengths
+
+METRES_PER_DEGREE = EARTH_RADIUS_KM * 1000.0 * np.pi / 180.0
+
+
+def _project_m(coords):
+    """Local equirectangular projection to metres, accurate over route-sized extents"""
+    mean_lat = np.radians(coords[:, 0].mean())
+    x = coords[:, 1] * METRES_PER_DEGREE * np.cos(mean_lat)
+    y = coords[:, 0] * METRES_PER_DEGREE
+    return x, y
+
+
+def _segment_distances_m(x, y, first, last):
+    """Distance in metres of points first+1..last-1 from the segment first-last"""
+    px = x[first + 1:last] - x[first]
+    py = y[first + 1:last] - y[first]
+    dx = x[last] - x[first]
+    dy = y[last] - y[first]
+    length_sq = dx * dx + dy * dy
+
+    if length_sq == 0.0:
+        return np.hypot(px, py)
+
+    # Clamp to the segment so loops back past an endpoint are still measured correctly
+    t = np.clip((px * dx + py * dy) / length_sq, 0.0, 1.0)
+    return np.hypot(px - t * dx, py - t * dy)
+
+
+def simplify_mask(coords, tolerance_m, breaks=None):
+    """
+    Boolean mask of the points Douglas-Peucker keeps for the given tolerance
+    Points at breaks are always kept, and each stretch between them is simplified on its own.
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    n = len(coords)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+
+    keep[0] = keep[-1] = True
+    if n < 3 or tolerance_m <= 0:
+        keep[:] = True
+        return keep
+
+    x, y = _project_m(coords)
+    if breaks is not None:
+        keep[np.asarray(breaks, dtype=np.intp)] = True
+    fixed = np.flatnonzero(keep)
+
+    # Iterative rather than recursive: OSRM geometries can have tens of thousands of points
+    stack = list(zip(fixed[:-1].tolist(), fixed[1:].tolist()))
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        distances = _segment_distances_m(x, y, first, last)
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance_m:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    return keep
+
+
+def simplify(coords, tolerance_m, breaks=None):
+    """Douglas-Peucker simplification (points at breaks always kept); returns a new [[lat, lon], ...] list"""
+    if len(coords) < 3 or tolerance_m <= 0:
+        return [list(point) for point in coords]
+
+    keep = simplify_mask(coords, tolerance_m, breaks)
+    return [list(coords[i]) for i in np.flatnonzero(keep)]
+
+
+class MultiResolutionRoute:
+    """
+    A route stored at several tolerances so the map can draw a coarse line when
+    zoomed out and the full geometry when zoomed in
+    Levels are (minimum zoom, tolerance in metres) pairs, finest first
+    """
+
+    def __init__(self, coords, levels):
+        self.full = coords
+        self.levels = []
+
+        for min_zoom, tolerance_m in sorted(levels, key=lambda level: -level[0]):
+            if tolerance_m <= 0:
+                geometry = coords  # Share the full route, no copy
+            else:
+                geometry = simplify(coords, tolerance_m)
+            self.levels.append((min_zoom, tolerance_m, geometry))
+
+    def level_for_zoom(self, zoom):
+        """Index of the level used at the given map zoom"""
+        for index, (min_zoom, _, _) in enumerate(self.levels):
+            if zoom >= min_zoom:
+                return index
+        return len(self.levels) - 1
+
+    def for_zoom(self, zoom):
+        """Route geometry to draw at the given map zoom"""
+        if not self.levels:
+            return self.full
+        return self.levels[self.level_for_zoom(zoom)][2]
+
+    def point_counts(self):
+        """Number of points stored at each level, finest first"""
+        return [len(geometry) for _, _, geometry in self.levels]
+
+
+class RouteIndex:
+    """
+    Cumulative-distance index over a route
+    Segment lengths are measured once, so locating the point a given distance
+    along the route is a binary search plus a linear interpolation.
+    cumulative_km, when given, is used instead of the measured distances.
+    """
+
+    def __init__(self, coords, cumulative_km=None):
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        if cumulative_km is not None:
+            self.cumulative_km = np.asarray(cumulative_km, dtype=np.float64).reshape(-1)
+        else:
+            self.cumulative_km = np.zeros(len(self.coords), dtype=np.float64)
+            if len(self.coords) > 1:
+                np.cumsum(path_lengths(self.coords), out=self.cumulative_km[1:])
+        self.total_km = float(self.cumulative_km[-1]) if len(self.coords) else 0.0
+
+    def segment_at(self, distance_km):
+        """Index of the segment containing the given distance (clamped to the route)"""
+        last_segment = max(len(self.coords) - 2, 0)
+        index = np.searchsorted(self.cumulative_km, distance_km, side="right") - 1
+        return np.clip(index, 0, last_segment)
+
+    def positions_at(self, distances_km):
+        """[lat, lon] rows and segment indices for an array of distances along the route"""
+        distances_km = np.clip(np.asarray(distances_km, dtype=np.float64), 0.0, self.total_km)
+        if len(self.coords) < 2:
+            points = np.broadcast_to(self.coords[0], distances_km.shape + (2,))
+            return points.copy(), np.zeros(distances_km.shape, dtype=np.intp)
+
+        index = self.segment_at(distances_km)
+        start_km = self.cumulative_km[index]
+        length_km = self.cumulative_km[index + 1] - start_km
+
+        # Zero-length segments (duplicate points) resolve to their start point
+        fraction = np.divide(distances_km - start_km, length_km,
+                             out=np.zeros_like(distances_km), where=length_km > 0)
+        start = self.coords[index]
+        end = self.coords[index + 1]
+        return start + (end - start) * fraction[..., None], index
+
+    def position_at(self, distance_km):
+        """([lat, lon], segment index) of the point distance_km along the route"""
+        points, index = self.positions_at(distance_km)
+        return points.tolist(), int(index)
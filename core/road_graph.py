@@ -0,0 +1,450 @@
+"""
+Offline road network routing for trucks
+
+Loads a preprocessed OSM road extract into a compact CSR (compressed sparse row)
+graph and answers shortest-path queries with bidirectional A*, so truck routes
+follow real roads without any network access. Every edge keeps its road class,
+so a search can weigh edges by time-of-day speed factors (core.traffic).
+
+Build an extract once from an OpenStreetMap XML export:
+    python -m core.road_graph region.osm road_graph.npz
+"""
+import heapq
+import math
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from core.geodesy import haversine, EARTH_RADIUS_KM
+from core.traffic import HIGHWAY_CLASSES, UNCLASSIFIED
+
+EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000.0
+
+# OSM highway classes a delivery truck can use
+DRIVEABLE_HIGHWAYS = set(HIGHWAY_CLASSES)
+# Lowest set bit of a road class bitmask (-1 for none)
+LOWEST_CLASS = np.array([(mask & -mask).bit_length() - 1 for mask in range(256)], dtype=np.intp)
+
+
+class RoadGraph:
+    """Directed road graph stored as CSR arrays with a grid index for snapping"""
+
+    def __init__(self, lat, lon, indptr, indices, length_m, road_class=None, grid_cell_deg=0.01):
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+        self.lon = np.ascontiguousarray(lon, dtype=np.float64)
+        self.indptr = np.ascontiguousarray(indptr, dtype=np.int64)
+        self.indices = np.ascontiguousarray(indices, dtype=np.int32)
+        self.length_m = np.ascontiguousarray(length_m, dtype=np.float32)
+        # Index into core.traffic.ROAD_CLASSES per edge; extracts built without classes are UNCLASSIFIED
+        if road_class is None:
+            road_class = np.full(len(self.indices), UNCLASSIFIED)
+        self.road_class = np.ascontiguousarray(road_class, dtype=np.int8)
+
+        # Reverse adjacency for the backward half of the bidirectional search
+        self.rev_indptr, self.rev_indices, self.rev_length_m, self.rev_road_class = self._transpose()
+        self._weights = {}      # Class factors -> travel-weighted edge lengths, both directions
+        self._node_keys = None  # Sorted coordinate keys for segment_classes(), built on first use
+
+        self.grid_cell_deg = grid_cell_deg
+        self._build_grid()
+
+        # memoryviews give fast scalar access from the pure-Python search loop
+        self._lat = memoryview(self.lat)
+        self._lon = memoryview(self.lon)
+        self._fwd = (memoryview(self.indptr), memoryview(self.indices), memoryview(self.length_m))
+        self._bwd = (memoryview(self.rev_indptr), memoryview(self.rev_indices), memoryview(self.rev_length_m))
+
+    @property
+    def node_count(self):
+        return len(self.lat)
+
+    @property
+    def edge_count(self):
+        return len(self.indices)
+
+    @classmethod
+    def from_edges(cls, lat, lon, edge_u, edge_v, length_m=None, road_class=None, **kwargs):
+        """Build a graph from node coordinates and directed edge endpoints (optionally their road classes)"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        edge_u = np.asarray(edge_u, dtype=np.int64)
+        edge_v = np.asarray(edge_v, dtype=np.int64)
+
+        if length_m is None:
+            length_m = haversine(lat[edge_u], lon[edge_u], lat[edge_v], lon[edge_v]) * 1000.0
+
+        order = np.argsort(edge_u, kind="stable")
+        counts = np.bincount(edge_u, minlength=len(lat))
+        indptr = np.zeros(len(lat) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+
+        if road_class is not None:
+            road_class = np.asarray(road_class)[order]
+        return cls(lat, lon, indptr, edge_v[order], np.asarray(length_m)[order], road_class, **kwargs)
+
+    @classmethod
+    def load(cls, path):
+        """Load a graph saved with save()"""
+        with np.load(path) as data:
+            road_class = data["road_class"] if "road_class" in data.files else None
+            return cls(data["lat"], data["lon"], data["indptr"], data["indices"], data["length_m"], road_class)
+
+    def save(self, path):
+        """Save the CSR arrays as an uncompressed .npz extract"""
+        np.savez(path, lat=self.lat, lon=self.lon, indptr=self.indptr,
+                 indices=self.indices, length_m=self.length_m, road_class=self.road_class)
+
+    def _transpose(self):
+        sources = np.repeat(np.arange(self.node_count, dtype=np.int64), np.diff(self.indptr))
+        order = np.argsort(self.indices, kind="stable")
+        counts = np.bincount(self.indices, minlength=self.node_count)
+        rev_indptr = np.zeros(self.node_count + 1, dtype=np.int64)
+        np.cumsum(counts, out=rev_indptr[1:])
+        return rev_indptr, sources[order].astype(np.int32), self.length_m[order], self.road_class[order]
+
+    def _travel_weights(self, class_factors):
+        """
+        Edge lengths divided by their class's speed factor, forward and backward
+        class_factors is indexed by road class; its last entry prices UNCLASSIFIED
+        edges. Weights are cached per distinct set of factors (one per time slot).
+        """
+        key = class_factors.tobytes()
+        weights = self._weights.get(key)
+        if weights is None:
+            factors = class_factors.astype(np.float32)
+            forward = self.length_m / factors[self.road_class]
+            backward = self.rev_length_m / factors[self.rev_road_class]
+            weights = self._weights[key] = (memoryview(forward), memoryview(backward))
+        return weights
+
+    @staticmethod
+    def _coordinate_keys(lat, lon):
+        """Exact positions as one int64 each, on a 1e-7 degree grid"""
+        lat_key = np.rint(np.asarray(lat) * 1e7).astype(np.int64)
+        lon_key = np.rint(np.asarray(lon) * 1e7).astype(np.int64)
+        return lat_key * 2 ** 32 + lon_key
+
+    def segment_classes(self, coords):
+        """
+        Road class of every segment of a path (UNCLASSIFIED where it is off the graph)
+        Waypoints are matched to nodes by exact position and segments to edges by
+        their end nodes, all with sorted lookups, so routes from route() are
+        classified without keeping anything alongside them. A segment that skips
+        nodes (a simplified route, see RouteManager.get_road_route) takes a class
+        both its end nodes have edges of.
+        """
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        classes = np.full(max(len(coords) - 1, 0), UNCLASSIFIED, dtype=np.intp)
+        if self.node_count == 0 or len(classes) == 0:
+            return classes
+
+        if self._node_keys is None:
+            keys = self._coordinate_keys(self.lat, self.lon)
+            node_order = np.argsort(keys, kind="stable")
+            sources = np.repeat(np.arange(self.node_count, dtype=np.int64), np.diff(self.indptr))
+            edge_keys = sources * self.node_count + self.indices
+            edge_order = np.argsort(edge_keys, kind="stable")
+            # Bitmask of the classes of every node's edges, in and out
+            node_mask = np.zeros(self.node_count, dtype=np.uint8)
+            classified = self.road_class >= 0
+            bits = np.left_shift(1, self.road_class[classified].astype(np.uint8)).astype(np.uint8)
+            np.bitwise_or.at(node_mask, sources[classified], bits)
+            np.bitwise_or.at(node_mask, self.indices[classified], bits)
+            self._node_keys = (keys[node_order], node_order, edge_keys[edge_order], self.road_class[edge_order],
+                               node_mask)
+        node_keys, node_order, edge_keys, edge_class, node_mask = self._node_keys
+
+        keys = self._coordinate_keys(coords[:, 0], coords[:, 1])
+        at = np.minimum(np.searchsorted(node_keys, keys), len(node_keys) - 1)
+        nodes = np.where(node_keys[at] == keys, node_order[at], -1)
+
+        u, v = nodes[:-1], nodes[1:]
+        on_graph = np.flatnonzero((u >= 0) & (v >= 0))
+        wanted = u[on_graph] * self.node_count + v[on_graph]
+        at = np.minimum(np.searchsorted(edge_keys, wanted), len(edge_keys) - 1)
+        found = edge_keys[at] == wanted
+        classes[on_graph[found]] = edge_class[at[found]]
+        skipped = on_graph[~found]
+        classes[skipped] = LOWEST_CLASS[node_mask[u[skipped]] & node_mask[v[skipped]]]
+        return classes
+
+    def _build_grid(self):
+        """Bucket nodes into lat/lon cells so snapping only scans nearby nodes"""
+        cell_lat = np.floor(self.lat / self.grid_cell_deg).astype(np.int64)
+        cell_lon = np.floor(self.lon / self.grid_cell_deg).astype(np.int64)
+        keys = cell_lat * 1000003 + cell_lon
+
+        self._grid_order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self._grid_order]
+        unique_keys, starts, counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+        self._grid = {int(k): (int(s), int(s + c)) for k, s, c in zip(unique_keys, starts, counts)}
+
+    def nearest_node(self, lat, lon, max_distance_m=None):
+        """Return (node, distance_m) of the closest node, or (None, inf) if none within range"""
+        if self.node_count == 0:
+            return None, math.inf
+
+        cell = self.grid_cell_deg
+        base_lat = int(math.floor(lat / cell))
+        base_lon = int(math.floor(lon / cell))
+        max_ring = None
+        if max_distance_m is not None:
+            max_ring = int(math.ceil(max_distance_m / (cell * 111000.0 * max(math.cos(math.radians(lat)), 0.1)))) + 1
+
+        best_node, best_dist = None, math.inf
+        ring = 0
+        while True:
+            candidates = []
+            for dlat in range(-ring, ring + 1):
+                for dlon in range(-ring, ring + 1):
+                    if max(abs(dlat), abs(dlon)) != ring:
+                        continue
+                    span = self._grid.get((base_lat + dlat) * 1000003 + base_lon + dlon)
+                    if span is not None:
+                        candidates.append(self._grid_order[span[0]:span[1]])
+
+            if candidates:
+                nodes = np.concatenate(candidates)
+                dists = haversine(lat, lon, self.lat[nodes], self.lon[nodes]) * 1000.0
+                i = int(np.argmin(dists))
+                if dists[i] < best_dist:
+                    best_node, best_dist = int(nodes[i]), float(dists[i])
+
+            # Anything in the next ring is at least ring * cell away
+            if best_node is not None and ring * cell * 111000.0 * math.cos(math.radians(lat)) > best_dist:
+                break
+            if max_ring is not None and ring >= max_ring:
+                break
+            if ring > 1000:
+                break
+            ring += 1
+
+        if max_distance_m is not None and best_dist > max_distance_m:
+            return None, math.inf
+        return best_node, best_dist
+
+    def _heuristic_m(self, node, target_lat, target_lon):
+        """Great-circle lower bound on road distance, in metres"""
+        lat1 = math.radians(self._lat[node])
+        lat2 = math.radians(target_lat)
+        dlat = lat2 - lat1
+        dlon = math.radians(target_lon - self._lon[node])
+        a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+        return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+    def _search_potentials(self, s_lat, s_lon, t_lat, t_lon, margin=0.25):
+        """
+        Vectorised A* potentials for every node in the corridor around source and target
+        Nodes outside the corridor are left as NaN and computed lazily if reached
+        """
+        potentials = np.full(self.node_count, np.nan)
+
+        pad_lat = abs(t_lat - s_lat) * margin + 0.02
+        pad_lon = abs(t_lon - s_lon) * margin + 0.02
+        mask = ((self.lat >= min(s_lat, t_lat) - pad_lat) & (self.lat <= max(s_lat, t_lat) + pad_lat) &
+                (self.lon >= min(s_lon, t_lon) - pad_lon) & (self.lon <= max(s_lon, t_lon) + pad_lon))
+        nodes = np.flatnonzero(mask)
+
+        lat, lon = self.lat[nodes], self.lon[nodes]
+        potentials[nodes] = 0.5 * (haversine(lat, lon, t_lat, t_lon) - haversine(lat, lon, s_lat, s_lon)) * 1000.0
+        return memoryview(potentials)
+
+    def shortest_path(self, source, target, class_factors=None):
+        """
+        Bidirectional A* between two node ids
+        Uses the average potential pf = (h_target - h_source) / 2 so both searches
+        work on the same reduced graph; stops once top_f + top_b >= best.
+        With class_factors (speed factor per road class, see _travel_weights)
+        edges cost length / factor, so the fastest path at that hour wins; the
+        potentials are scaled by the largest factor to stay admissible.
+        Returns (node_list, cost) - metres, or metres / factor with factors -
+        or (None, inf) when unreachable
+        """
+        if source == target:
+            return [source], 0.0
+
+        s_lat, s_lon = self._lat[source], self._lon[source]
+        t_lat, t_lon = self._lat[target], self._lon[target]
+        heuristic = self._heuristic_m
+        potentials = self._search_potentials(s_lat, s_lon, t_lat, t_lon)
+        graphs = (self._fwd, self._bwd)
+        scale = 1.0
+        if class_factors is not None:
+            class_factors = np.asarray(class_factors, dtype=np.float64)
+            forward, backward = self._travel_weights(class_factors)
+            graphs = ((self._fwd[0], self._fwd[1], forward), (self._bwd[0], self._bwd[1], backward))
+            scale = 1.0 / float(class_factors.max())
+
+        def potential(node):
+            p = potentials[node]
+            if p != p:
+                # Outside the precomputed corridor (NaN) - fall back to scalar maths
+                p = 0.5 * (heuristic(node, t_lat, t_lon) - heuristic(node, s_lat, s_lon))
+                potentials[node] = p
+            return p * scale
+
+        dist = ({source: 0.0}, {target: 0.0})
+        parent = ({source: -1}, {target: -1})
+        settled = (set(), set())
+        heaps = ([(potential(source), source)], [(-potential(target), target)])
+        signs = (1.0, -1.0)
+
+        best = math.inf
+        meeting = None
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            other = 1 - side
+            key, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+
+            indptr, indices, lengths = graphs[side]
+            du = dist[side][u]
+            my_dist, other_dist, my_parent = dist[side], dist[other], parent[side]
+            heap, sign = heaps[side], signs[side]
+
+            for e in range(indptr[u], indptr[u + 1]):
+                v = indices[e]
+                nd = du + lengths[e]
+                if nd < my_dist.get(v, math.inf):
+                    my_dist[v] = nd
+                    my_parent[v] = u
+                    heapq.heappush(heap, (nd + sign * potential(v), v))
+
+                    dv_other = other_dist.get(v)
+                    if dv_other is not None and nd + dv_other < best:
+                        best = nd + dv_other
+                        meeting = v
+
+        if meeting is None:
+            return None, math.inf
+
+        forward = []
+        node = meeting
+        while node != -1:
+            forward.append(node)
+            node = parent[0][node]
+        forward.reverse()
+
+        node = parent[1][meeting]
+        while node != -1:
+            forward.append(node)
+            node = parent[1][node]
+
+        return forward, best
+
+    def distances_from(self, source, targets, class_factors=None):
+        """
+        One-to-many Dijkstra from a source node
+        Stops as soon as every target is settled; returns road lengths in metres
+        aligned with targets (inf where unreachable). With class_factors the
+        search runs on length / factor (see _travel_weights) and returns that.
+        """
+        remaining = set(targets)
+        remaining.discard(-1)
+        dist = {source: 0.0}
+        settled = set()
+        heap = [(0.0, source)]
+        indptr, indices, lengths = self._fwd
+        if class_factors is not None:
+            lengths = self._travel_weights(np.asarray(class_factors, dtype=np.float64))[0]
+
+        while heap and remaining:
+            du, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled.add(u)
+            remaining.discard(u)
+
+            for e in range(indptr[u], indptr[u + 1]):
+                v = indices[e]
+                nd = du + lengths[e]
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+
+        return np.array([dist.get(t, math.inf) if t in settled else math.inf for t in targets])
+
+    def route(self, start_lat, start_lon, end_lat, end_lon, max_snap_m=2000.0, class_factors=None):
+        """
+        Road route between two coordinates as a list of [lat, lon] points
+        Endpoints are snapped to the nearest graph node; returns None when either end
+        is too far from the network or the nodes are not connected. class_factors
+        makes it the fastest route for those speeds rather than the shortest.
+        """
+        source, _ = self.nearest_node(start_lat, start_lon, max_snap_m)
+        target, _ = self.nearest_node(end_lat, end_lon, max_snap_m)
+        if source is None or target is None:
+            return None
+
+        nodes, length = self.shortest_path(source, target, class_factors)
+        if nodes is None:
+            return None
+
+        lat, lon = self._lat, self._lon
+        route = [[start_lat, start_lon]]
+        route.extend([lat[n], lon[n]] for n in nodes)
+        route.append([end_lat, end_lon])
+        return route
+
+
+def build_road_graph_from_osm(osm_path):
+    """Convert an OpenStreetMap XML export into a RoadGraph of driveable roads"""
+    node_coords = {}
+    ways = []
+
+    for _, elem in ET.iterparse(osm_path, events=("end",)):
+        if elem.tag == "node":
+            node_coords[int(elem.get("id"))] = (float(elem.get("lat")), float(elem.get("lon")))
+            elem.clear()
+        elif elem.tag == "way":
+            tags = {t.get("k"): t.get("v") for t in elem.findall("tag")}
+            if tags.get("highway") in DRIVEABLE_HIGHWAYS:
+                refs = [int(nd.get("ref")) for nd in elem.findall("nd")]
+                oneway = tags.get("oneway", "no")
+                if tags.get("junction") == "roundabout" and oneway == "no":
+                    oneway = "yes"
+                ways.append((refs, oneway, HIGHWAY_CLASSES[tags["highway"]]))
+            elem.clear()
+
+    # Keep only nodes used by roads and renumber them densely
+    used = {}
+    edge_u, edge_v, edge_class = [], [], []
+    for refs, oneway, road_class in ways:
+        refs = [r for r in refs if r in node_coords]
+        if oneway == "-1":
+            refs.reverse()
+        ids = [used.setdefault(r, len(used)) for r in refs]
+        for a, b in zip(ids, ids[1:]):
+            edge_u.append(a)
+            edge_v.append(b)
+            edge_class.append(road_class)
+            if oneway not in ("yes", "true", "1", "-1"):
+                edge_u.append(b)
+                edge_v.append(a)
+                edge_class.append(road_class)
+
+    lat = np.empty(len(used))
+    lon = np.empty(len(used))
+    for osm_id, idx in used.items():
+        lat[idx], lon[idx] = node_coords[osm_id]
+
+    return RoadGraph.from_edges(lat, lon, edge_u, edge_v, road_class=edge_class)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m core.road_graph <input.osm> <output.npz>")
+        sys.exit(1)
+
+    graph = build_road_graph_from_osm(sys.argv[1])
+    graph.save(sys.argv[2])
+    size_mb = os.path.getsize(sys.argv[2]) / 1e6
+    print(f"Saved road graph with {graph.node_count} nodes and {graph.edge_count} edges ({size_mb:.1f} MB)")
@@ -0,0 +1,93 @@
+"""
+Clarke-Wright savings construction of capacitated multi-stop tours
+
+Every customer starts on its own depot -> customer -> depot tour. Joining
+the tours ending at i and starting at j saves d(0, i) + d(j, 0) - d(i, j)
+km, so pairs are merged greedily by descending saving whenever i and j are
+still tour ends and the combined load fits the vehicle. Savings for all
+pairs are computed at once with NumPy; only the merge pass is a Python loop.
+"""
+import numpy as np
+
+
+def savings_list(distance):
+    """
+    (i, j) customer pairs with a positive saving, best first
+    distance is the (n + 1, n + 1) matrix with the depot at index 0; the
+    returned indices are 0-based customer indices (matrix index - 1).
+    """
+    distance = np.asarray(distance, dtype=np.float64)
+    # Road matrices are slightly asymmetric; tours may run either way round
+    symmetric = (distance + distance.T) / 2.0
+    to_depot = symmetric[0, 1:]
+    savings = to_depot[:, None] + to_depot[None, :] - symmetric[1:, 1:]
+
+    i, j = np.triu_indices(len(to_depot), k=1)
+    values = savings[i, j]
+    keep = values > 0
+    order = np.argsort(-values[keep], kind="stable")
+    return i[keep][order], j[keep][order]
+
+
+def clarke_wright(distance, demands, capacity):
+    """
+    Capacitated tours as lists of 0-based customer indices
+    Customers whose own demand exceeds capacity cannot be served and are left
+    out; every other customer is on exactly one tour.
+    """
+    demands = np.asarray(demands, dtype=np.float64)
+    feasible = np.flatnonzero(demands <= capacity)
+    tours = {int(c): [int(c)] for c in feasible}    # Tour id (its first customer at creation) -> customers
+    tour_of = {int(c): int(c) for c in feasible}
+    load = {int(c): float(demands[c]) for c in feasible}
+
+    for i, j in zip(*savings_list(distance)):
+        i, j = int(i), int(j)
+        if i not in tour_of or j not in tour_of:
+            continue
+        a, b = tour_of[i], tour_of[j]
+        if a == b or load[a] + load[b] > capacity:
+            continue
+        first, second = tours[a], tours[b]
+
+        # Orient both tours so that i ends the first and j starts the second
+        if first[-1] != i:
+            if first[0] != i:
+                continue
+            first.reverse()
+        if second[0] != j:
+            if second[-1] != j:
+                continue
+            second.reverse()
+
+        first.extend(second)
+        load[a] += load.pop(b)
+        for customer in tours.pop(b):
+            tour_of[customer] = a
+
+    return list(tours.values())
+
+
+def tour_km(distance, tour):
+    """Length of depot -> tour -> depot over the matrix"""
+    stops = [0] + [c + 1 for c in tour] + [0]
+    return float(np.asarray(distance)[stops[:-1], stops[1:]].sum())
+
+
+def assign_tours(tour_lengths, tour_loads, capacities):
+    """
+    Spread tours over vehicles: longest tour first, each to the least busy
+    vehicle that can carry it. Returns one list of tour indices per vehicle;
+    tours no vehicle can carry are left out.
+    """
+    busy_km = np.zeros(len(capacities))
+    assigned = [[] for _ in capacities]
+    capacities = np.asarray(capacities, dtype=np.float64)
+    for tour in np.argsort(-np.asarray(tour_lengths), kind="stable"):
+        fits = np.flatnonzero(capacities >= tour_loads[tour])
+        if len(fits) == 0:
+            continue
+        vehicle = fits[np.argmin(busy_km[fits])]
+        busy_km[vehicle] += tour_lengths[tour]
+        assigned[vehicle].append(int(tour))
+    return assigned
@@ -0,0 +1,34 @@
+"""
+Simulation engine for the delivery fleet
+
+The engine owns simulated time and fleet state; the GUI only drives and samples it.
+Nothing here imports Qt, so scenarios also run headless: python -m core.sim --help
+"""
+
+from .clock import SimulationClock, MAX_SPEED
+from .engine import SimulationEngine
+from .events import EventDrivenEngine, EventQueue, create_engine
+from .waves import WavePlan, plan_waves
+from .recording import SimulationRecorder, SimulationReplay, MergedReplay
+from .snapshot import save_snapshot, load_snapshot
+from .orders import OrderDispatcher, open_order_source, replay_orders
+from . import scenario
+
+__all__ = [
+    'SimulationClock',
+    'SimulationEngine',
+    'EventDrivenEngine',
+    'EventQueue',
+    'create_engine',
+    'WavePlan',
+    'plan_waves',
+    'SimulationRecorder',
+    'SimulationReplay',
+    'MergedReplay',
+    'save_snapshot',
+    'load_snapshot',
+    'OrderDispatcher',
+    'open_order_source',
+    'replay_orders',
+    'MAX_SPEED'
+]
@@ -0,0 +1,171 @@
+"""
+Run one delivery scenario headless and write its KPIs
+
+Usage: python -m core.sim --depot 12.85,74.92 --customers 10 --drones 3 \
+           --electric-trucks 2 --fuel-trucks 1 --seed 42 --output kpis.json
+
+With --replicas N the scenario is run N times with seeds seed..seed+N-1 on a
+process pool and KPI distributions are written instead. --mode event runs the
+discrete-event engine, and --events log.csv writes its timestamped event log.
+--waves serves every customer by re-dispatching the fleet in DEFAULT_WAVES waves.
+Without it trucks run capacitated multi-stop tours; --single-stop sends every
+vehicle to one customer instead, and --improve-seconds sets the local search budget.
+--assignment picks how single-stop deliveries are handed out (makespan, total or shuffle).
+Drones ride the trucks and fly sorties from them unless --no-tandem is given.
+Trucks drive at TRAFFIC_CONFIG time-of-day speeds; --no-traffic keeps them at nominal speed.
+--record run.simrec saves a replayable binary recording of the run.
+--orders streams more orders into the running routes, from a file of timed
+orders or generate:RATE:COUNT (a Poisson stream of COUNT orders at RATE/s).
+--depots [hubs.json] runs every hub of MULTI_DEPOT_CONFIG (or of the JSON
+list) as a shard in its own process; --record then names a directory.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import sys
+
+from config.app_config import (DEFAULT_DEPOT_COORDS, DEFAULT_CUSTOMER_COUNT, DEFAULT_FLEET_CONFIG,
+                               DEFAULT_WAVES, ROUTING_CONFIG, ASSIGNMENT_CONFIG, MULTI_STOP_CONFIG,
+                               TRAFFIC_CONFIG)
+from core.sim.depots import run_multi_depot
+from core.sim.monte_carlo import run_monte_carlo
+from core.sim.runner import run_scenario
+from core.sim.events import ENGINE_MODES, EventDrivenEngine
+
+# Fixed CSV columns; anything else an event carries goes into "data" as JSON
+EVENT_FIELDS = ("time_s", "clock", "event", "vehicle", "data")
+
+
+def parse_coords(text):
+    lat, lon = (float(part) for part in text.split(","))
+    return [lat, lon]
+
+
+def write_event_log(events, path):
+    """Event log as JSON, or CSV when the path ends in .csv"""
+    with open(path, "w", newline="") as f:
+        if path.lower().endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=EVENT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for event in events:
+                writer.writerow({**event, "data": json.dumps({
+                    key: value for key, value in event.items() if key not in EVENT_FIELDS
+                })})
+        else:
+            json.dump(events, f, indent=2)
+            f.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.sim", description="Headless delivery simulation")
+    parser.add_argument("--depot", type=parse_coords, default=DEFAULT_DEPOT_COORDS, help="lat,lon")
+    parser.add_argument("--customers", type=int, default=DEFAULT_CUSTOMER_COUNT)
+    parser.add_argument("--electric-trucks", type=int, default=DEFAULT_FLEET_CONFIG["electric_trucks"])
+    parser.add_argument("--fuel-trucks", type=int, default=DEFAULT_FLEET_CONFIG["fuel_trucks"])
+    parser.add_argument("--drones", type=int, default=DEFAULT_FLEET_CONFIG["drones"])
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--replicas", type=int, default=1, help="Monte Carlo replicas (default: single run)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --replicas or --depots")
+    parser.add_argument("--customer-seed", type=int, default=None,
+                        help="Hold customer points fixed across replicas")
+    parser.add_argument("--step-seconds", type=float, default=None, help="Simulated seconds per engine step")
+    parser.add_argument("--mode", choices=sorted(ENGINE_MODES), default=None,
+                        help="Time-stepped or discrete-event engine (default: SIMULATION_CONFIG['mode'])")
+    parser.add_argument("--waves", action="store_true",
+                        help="Serve every customer in DEFAULT_WAVES dispatch waves (event mode)")
+    parser.add_argument("--depots", nargs="?", const="", default=None, metavar="HUBS_JSON",
+                        help="Multi-depot run over MULTI_DEPOT_CONFIG hubs, or the hubs in this JSON file")
+    parser.add_argument("--single-stop", action="store_true",
+                        help="One customer per vehicle instead of multi-stop truck tours")
+    parser.add_argument("--no-tandem", action="store_true",
+                        help="Fly drones from the depot instead of launching them from the trucks")
+    parser.add_argument("--no-traffic", action="store_true",
+                        help="Drive trucks at nominal speed instead of TRAFFIC_CONFIG time-of-day speeds")
+    parser.add_argument("--improve-seconds", type=float, default=None,
+                        help="Local search budget for multi-stop tours (default: MULTI_STOP_CONFIG)")
+    parser.add_argument("--assignment", choices=["makespan", "total", "shuffle"], default=None,
+                        help="Single-stop delivery assignment objective (default: ASSIGNMENT_CONFIG)")
+    parser.add_argument("--orders", default=None, metavar="SOURCE",
+                        help="Insert live orders from a file or generate:RATE:COUNT into the running routes")
+    parser.add_argument("--record", default=None, help="Record position frames and events to this .simrec file")
+    parser.add_argument("--events", default=None, help="Write the event log here (.csv or .json; event mode only)")
+    parser.add_argument("--routing", choices=["auto", "local", "osrm"], default=None,
+                        help="Override ROUTING_CONFIG['backend']")
+    parser.add_argument("--output", default=None, help="Write KPIs as JSON here instead of stdout")
+    parser.add_argument("--verbose", action="store_true", help="Show route building logs")
+    args = parser.parse_args(argv)
+
+    if args.routing:
+        ROUTING_CONFIG["backend"] = args.routing
+    if args.improve_seconds is not None:
+        MULTI_STOP_CONFIG["improve_seconds"] = args.improve_seconds
+    if args.no_tandem:
+        MULTI_STOP_CONFIG["tandem"] = False
+    if args.no_traffic:
+        TRAFFIC_CONFIG["enabled"] = False
+    if args.assignment:
+        ASSIGNMENT_CONFIG["objective"] = args.assignment
+    if args.waves and args.replicas > 1:
+        parser.error("--waves runs a single scenario; drop --replicas")
+    if args.record and args.replicas > 1:
+        parser.error("--record runs a single scenario; drop --replicas")
+    if args.waves and args.mode == "step":
+        parser.error("--waves needs --mode event")
+    if args.orders and (args.replicas > 1 or args.depots is not None):
+        parser.error("--orders runs a single scenario; drop --replicas and --depots")
+    if args.orders and (args.orders.startswith("tcp:") or
+                        (args.orders.startswith("generate") and args.orders.count(":") < 2)):
+        parser.error("--orders needs a finite source headless: a file or generate:RATE:COUNT")
+    if args.depots is not None and (args.replicas > 1 or args.events):
+        parser.error("--depots runs one shard per hub; drop --replicas and --events")
+
+    depots = None
+    if args.depots:
+        with open(args.depots) as f:
+            depots = json.load(f)
+
+    log = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    fleet = dict(electric_trucks=args.electric_trucks, fuel_trucks=args.fuel_trucks, drones=args.drones)
+    with log:
+        if args.depots is not None:
+            kpis = run_multi_depot(
+                depots, seed=args.seed, mode="event" if args.waves else args.mode,
+                waves=DEFAULT_WAVES if args.waves else None, workers=args.workers, record_dir=args.record,
+                verbose=args.verbose
+            )
+            engine = None
+        elif args.replicas > 1:
+            kpis = run_monte_carlo(
+                args.depot, args.customers, replicas=args.replicas, seed=args.seed or 0,
+                customer_seed=args.customer_seed, workers=args.workers,
+                step_seconds=args.step_seconds, mode=args.mode, multi_stop=False if args.single_stop else None,
+                **fleet
+            )
+            engine = None
+        else:
+            kpis, engine = run_scenario(
+                args.depot, args.customers, seed=args.seed, step_seconds=args.step_seconds,
+                mode="event" if args.waves else args.mode, waves=DEFAULT_WAVES if args.waves else None,
+                record=args.record, multi_stop=False if args.single_stop else None, orders=args.orders, **fleet
+            )
+
+    if args.events:
+        if not isinstance(engine, EventDrivenEngine):
+            parser.error("--events needs a single run in event mode")
+        write_event_log(engine.event_log, args.events)
+        print(f"{len(engine.event_log)} events written to {args.events}")
+
+    text = json.dumps(kpis, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"KPIs written to {args.output}")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Simulation clock decoupled from wall time
+"""
+import time
+
+MAX_SPEED = "max"
+
+
+class SimulationClock:
+    """
+    Simulated time in seconds, driven by wall time at a selectable speed
+    Simulated time is always derived from an anchor (wall, sim) pair rather than
+    by summing per-tick deltas, so late or irregular ticks never cause drift:
+    a tick that arrives late simply yields a larger step. In "max" mode every
+    advance() returns a fixed step and the caller runs as many as it can.
+    """
+
+    def __init__(self, speed=1, max_step_seconds=5.0, wall_clock=time.monotonic):
+        self.wall_clock = wall_clock
+        self.max_step_seconds = max_step_seconds
+        self.speed = speed
+        self.sim_time = 0.0
+        self.running = False
+        self.anchor_wall = 0.0
+        self.anchor_sim = 0.0
+
+    @property
+    def is_max(self):
+        return self.speed == MAX_SPEED
+
+    def _rebase(self):
+        self.anchor_wall = self.wall_clock()
+        self.anchor_sim = self.sim_time
+
+    def start(self):
+        """Start or resume the clock from the current simulated time"""
+        if not self.running:
+            self.running = True
+            self._rebase()
+
+    def pause(self):
+        """Freeze simulated time; wall time spent paused is not counted"""
+        if self.running:
+            self.advance()
+            self.running = False
+
+    def reset(self):
+        """Back to t = 0, stopped"""
+        self.running = False
+        self.sim_time = 0.0
+        self._rebase()
+
+    def jump_to(self, sim_time):
+        """Move simulated time straight to sim_time (event-driven runs)"""
+        self.sim_time = sim_time
+        self._rebase()
+
+    def set_speed(self, speed):
+        """Change speed without a jump: time so far is banked at the old rate"""
+        if self.running:
+            self.advance()
+        self.speed = speed
+        self._rebase()
+
+    def advance(self):
+        """Move simulated time up to now; returns the step in simulated seconds"""
+        if not self.running:
+            return 0.0
+
+        if self.is_max:
+            target = self.sim_time + self.max_step_seconds
+        else:
+            target = self.anchor_sim + (self.wall_clock() - self.anchor_wall) * self.speed
+
+        step = target - self.sim_time
+        if step <= 0.0:
+            return 0.0
+
+        self.sim_time = target
+        if self.is_max:
+            self._rebase()
+        return step
@@ -0,0 +1,178 @@
+"""
+Multi-depot runs
+
+Every hub has its own fleet and the customers generated around it. The
+customers are pooled and each one goes to the hub whose cheapest vehicle
+reaches it at the lowest cost, so a customer between two nearby hubs is
+served from the closer one. Each hub is then simulated as an independent
+shard in its own worker process, and the shard KPIs are merged; shards run
+side by side from t = 0, so the merged makespan is the slowest hub's.
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config.app_config import (ASSIGNMENT_CONFIG, MULTI_DEPOT_CONFIG, MULTI_STOP_CONFIG, ROUTING_CONFIG,
+                               TRAFFIC_CONFIG)
+from core.api_handler import RouteManager
+from core.sim import scenario
+from core.sim.engine import drone_share
+from core.sim.runner import run_scenario
+
+# Per-hub fleet keys -> vehicle type
+FLEET_KEYS = {
+    "drones": "Drone",
+    "electric_trucks": "Electric Truck",
+    "fuel_trucks": "Fuel Truck"
+}
+
+
+def hub_fleet_mix(depot):
+    return {vehicle_type: depot.get(key, 0) for key, vehicle_type in FLEET_KEYS.items()}
+
+
+def generate_customers(depots, seed=None):
+    """Customer points around every hub (hub i draws with seed + i), pooled into one list"""
+    customers = []
+    for i, depot in enumerate(depots):
+        rng = random.Random(None if seed is None else seed + i)
+        customers.extend(scenario.generate_delivery_points(depot["coords"], depot.get("customers", 0), rng))
+    return customers
+
+
+def cost_matrix(depots, customers, cost=None):
+    """
+    (hubs, customers) cost of serving each customer from each hub
+    A hub's cost is that of its cheapest vehicle type for the leg; types a hub
+    has none of are ignored, and a hub with no vehicles costs infinity.
+    """
+    cost = cost or MULTI_DEPOT_CONFIG["cost"]
+    origins = [depot["coords"] for depot in depots]
+    costs = np.full((len(depots), len(customers)), np.inf)
+    for vehicle_type in FLEET_KEYS.values():
+        has_type = np.array([hub_fleet_mix(depot)[vehicle_type] > 0 for depot in depots])
+        if not has_type.any():
+            continue
+        distance_km, duration_hours = RouteManager.matrix(origins, customers, vehicle_type)
+        leg = duration_hours if cost == "duration" else distance_km
+        costs[has_type] = np.minimum(costs[has_type], leg[has_type])
+    return costs
+
+
+def assign_customers(depots, customers, cost=None):
+    """Customer lists per hub, each customer given to its lowest-cost hub"""
+    assigned = [[] for _ in depots]
+    if not customers or not depots:
+        return assigned
+    best = np.argmin(cost_matrix(depots, customers, cost), axis=0)
+    for customer, hub in zip(customers, best.tolist()):
+        assigned[hub].append(customer)
+    return assigned
+
+
+def _run_shard(depot, deliveries, seed, mode, waves, record, backend, multi_stop, assignment, traffic, verbose):
+    """Worker task: simulate one hub; returns its KPIs"""
+    # Shard processes start fresh, so the parent's config overrides and log level are passed in
+    ROUTING_CONFIG["backend"] = backend
+    MULTI_STOP_CONFIG.update(multi_stop)
+    ASSIGNMENT_CONFIG.update(assignment)
+    TRAFFIC_CONFIG.update(traffic)
+    started = time.perf_counter()
+    log = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with log:
+        kpis, _ = run_scenario(
+            depot["coords"], len(deliveries), seed=seed, mode=mode, waves=waves, record=record,
+            deliveries=deliveries, **{key: depot.get(key, 0) for key in FLEET_KEYS}
+        )
+    kpis["name"] = depot["name"]
+    kpis["recording"] = record
+    kpis["shard_seconds"] = time.perf_counter() - started
+    return kpis
+
+
+def merge_kpis(shards):
+    """Network-wide KPIs from the per-hub ones"""
+    by_type = {}
+    for shard in shards:
+        for vehicle_type, entry in shard["by_type"].items():
+            merged = by_type.setdefault(vehicle_type, {"vehicles": 0, "distance_km": 0.0, "deliveries": 0})
+            merged["vehicles"] += entry["vehicles"]
+            merged["distance_km"] += entry["distance_km"]
+            merged["deliveries"] += entry["deliveries"]
+
+    vehicles = sum(shard["vehicles"] for shard in shards)
+    deliveries = sum(shard["deliveries"] for shard in shards)
+    makespan_hours = max((shard["makespan_hours"] for shard in shards), default=0.0)
+    # Weighted by each hub's trips (event mode) or vehicles (step mode)
+    weights = [shard.get("trips", shard["vehicles"]) for shard in shards]
+    return {
+        "depots": len(shards),
+        "vehicles": vehicles,
+        "customers": sum(shard["customers"] for shard in shards),
+        "deliveries": deliveries,
+        "unserved_customers": sum(shard["unserved_customers"] for shard in shards),
+        "makespan_hours": makespan_hours,
+        "mean_cycle_hours": float(np.average([shard["mean_cycle_hours"] for shard in shards], weights=weights))
+        if sum(weights) else 0.0,
+        "total_distance_km": sum(shard["total_distance_km"] for shard in shards),
+        "drone_share": drone_share(by_type, deliveries),
+        "by_type": by_type,
+        "deliveries_per_hour": deliveries / makespan_hours if makespan_hours > 0 else 0.0
+    }
+
+
+def run_multi_depot(depots=None, seed=None, mode=None, waves=None, workers=None, record_dir=None, cost=None,
+                    verbose=True):
+    """
+    Assign customers across hubs, simulate every hub as a shard in a process
+    pool and merge the results. Hub i runs with seed + i. With record_dir set,
+    each shard records to <record_dir>/<hub>.simrec for a merged replay.
+    Returns {"totals", "depots": per-hub KPIs, "reassigned_customers", ...}.
+    """
+    depots = depots or MULTI_DEPOT_CONFIG["depots"]
+    workers = workers or MULTI_DEPOT_CONFIG["workers"] or min(len(depots), os.cpu_count() or 1)
+    started = time.perf_counter()
+
+    customers = generate_customers(depots, seed)
+    assigned = assign_customers(depots, customers, cost)
+
+    # How many customers ended up at a hub other than the one they were generated around
+    home = np.repeat(np.arange(len(depots)), [depot.get("customers", 0) for depot in depots])
+    served_by = {tuple(customer): hub for hub, points in enumerate(assigned) for customer in points}
+    reassigned = int(sum(served_by[tuple(customer)] != hub for customer, hub in zip(customers, home)))
+    assignment_seconds = time.perf_counter() - started
+
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
+    shards = []
+    # "spawn" so shards start clean even when the caller (the GUI) is running threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [
+            pool.submit(
+                _run_shard, depot, points, None if seed is None else seed + i, mode, waves,
+                os.path.join(record_dir, f"{i:02d}_{depot['name']}.simrec") if record_dir else None,
+                ROUTING_CONFIG["backend"], dict(MULTI_STOP_CONFIG), dict(ASSIGNMENT_CONFIG),
+                dict(TRAFFIC_CONFIG), verbose
+            )
+            for i, (depot, points) in enumerate(zip(depots, assigned))
+        ]
+        for depot, future in zip(depots, futures):
+            shard = future.result()
+            shard["generated_customers"] = depot.get("customers", 0)
+            shards.append(shard)
+
+    return {
+        "totals": merge_kpis(shards),
+        "depots": shards,
+        "reassigned_customers": reassigned,
+        "cost": cost or MULTI_DEPOT_CONFIG["cost"],
+        "seed": seed,
+        "assignment_seconds": assignment_seconds,
+        "wall_seconds": time.perf_counter() - started
+    }
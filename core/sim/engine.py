@@ -0,0 +1,217 @@
+"""
+Simulation engine: advances the fleet from its own clock
+"""
+import time
+
+import numpy as np
+
+from core.api_handler import RouteManager
+from core.energy import battery_profile
+from core.fleet_state import FleetState, MultiStopRoute, TimedRoute
+from core.sim.clock import SimulationClock, MAX_SPEED
+
+
+def count_deliveries(by_type, deliveries):
+    """Add each type's count of a {customer: vehicle type} map to by_type[type]["deliveries"]"""
+    for entry in by_type.values():
+        entry["deliveries"] = 0
+    for vehicle_type in deliveries.values():
+        by_type[vehicle_type]["deliveries"] += 1
+
+
+def drone_share(by_type, deliveries):
+    """Fraction of the deliveries made by drones"""
+    return by_type.get("Drone", {}).get("deliveries", 0) / deliveries if deliveries else 0.0
+
+
+class SimulationEngine:
+    """
+    Owns the fleet state and the simulation clock
+    UI timers only ask the engine to catch up; how far the fleet moves is
+    decided by the clock, and renderers sample fleet state whenever they like
+    """
+
+    def __init__(self, fleet=None, clock=None):
+        self.fleet = fleet if fleet is not None else FleetState()
+        self.clock = clock or SimulationClock()
+        self.recorder = None    # SimulationRecorder capturing frames, if any
+
+    @property
+    def sim_hours(self):
+        return self.clock.sim_time / 3600.0
+
+    @property
+    def finished(self):
+        return not self.fleet.active_mask().any()
+
+    def step(self):
+        """Advance the fleet by however much simulated time has passed; returns moved slots"""
+        step_seconds = self.clock.advance()
+        if step_seconds <= 0.0:
+            return np.empty(0, dtype=np.intp)
+        moved = self.fleet.advance(step_seconds / 3600.0)
+        self._record(self.clock.sim_time)
+        return moved
+
+    def positions_at(self, time_s):
+        """Fleet positions at time_s; a stepped fleet only knows where it is now"""
+        return self.fleet.positions()
+
+    def _record(self, until_s):
+        """Write every recorder frame due up to until_s"""
+        recorder = self.recorder
+        if recorder is None:
+            return
+        while recorder.next_time <= until_s:
+            recorder.append(self.positions_at(recorder.next_time))
+
+    def run_for(self, budget_seconds):
+        """Step repeatedly for up to budget_seconds of wall time (used by "max" speed)"""
+        deadline = time.perf_counter() + budget_seconds
+        moved = []
+
+        while self.clock.running and not self.finished:
+            moved.append(self.step())
+            if time.perf_counter() >= deadline:
+                break
+
+        if not moved:
+            return np.empty(0, dtype=np.intp)
+        return np.unique(np.concatenate(moved))
+
+    def add_vehicle(self, name, spec, route):
+        """Put a vehicle on its route at the depot, with a full battery; it leaves now"""
+        view = self._place(name, spec, route)
+        self.time_trip(view.slot, self.clock.sim_time)
+        return view
+
+    def _place(self, name, spec, route):
+        """Put a vehicle on its route at the depot, with a full battery, without timing its trip"""
+        vehicle = dict(spec)
+        for key, value in battery_profile(spec).items():
+            vehicle.setdefault(key, value)
+        vehicle.update({"route": route, "route_index": 0, "distance_km": 0.0})
+        return self.fleet.add(name, vehicle)
+
+    def time_trip(self, slot, depart_s):
+        """Time a vehicle's trip leaving at depart_s through time-of-day traffic (trucks; see core.traffic)"""
+        fleet = self.fleet
+        route = fleet.routes[slot]
+        timed = RouteManager.timed_route(route, fleet.types[slot], fleet.speed[slot], depart_s)
+        if timed is not route:
+            fleet.set_route(slot, timed)
+
+    def reroute(self, name, route, extras=None):
+        """
+        Swap a vehicle's route mid-trip for one that shares the part it has driven
+        The vehicle carries on from where it is; extras (stops, loads) are updated with it.
+        """
+        fleet = self.fleet
+        slot = fleet.slots[name]
+        previous = fleet.routes[slot]
+        fleet.set_route(slot, route)
+        if isinstance(previous, TimedRoute):
+            # Timed from the same departure, the shared part keeps its timetable
+            self.time_trip(slot, previous.depart_s)
+        if extras:
+            fleet.extras[slot].update(extras)
+        return fleet[name]
+
+    def reset(self):
+        """Send every vehicle back to the depot with the clock at zero"""
+        self.fleet.reset()
+        self.clock.reset()
+        for slot, route in enumerate(self.fleet.routes):
+            if isinstance(route, TimedRoute):
+                self.time_trip(slot, 0.0)
+
+    def clear(self):
+        """Remove the whole fleet and reset the clock"""
+        self.fleet.clear()
+        self.clock.reset()
+
+    def run_to(self, time_s):
+        """Advance the fleet to simulated time_s in steps of at most max_step_seconds (headless runs)"""
+        clock = self.clock
+        while clock.sim_time < time_s:
+            step_seconds = min(clock.max_step_seconds, time_s - clock.sim_time)
+            clock.jump_to(clock.sim_time + step_seconds)
+            self.fleet.advance(step_seconds / 3600.0)
+            self._record(clock.sim_time)
+
+    def run_to_completion(self, step_seconds=None):
+        """Run the delivery cycle flat out until every vehicle is back; returns the KPIs"""
+        if step_seconds is not None:
+            self.clock.max_step_seconds = step_seconds
+        self.clock.set_speed(MAX_SPEED)
+        self.clock.start()
+
+        steps = 0
+        started = time.perf_counter()
+        while not self.finished:
+            self.step()
+            steps += 1
+        self.clock.pause()
+
+        kpis = self.kpis()
+        kpis["sim_steps"] = steps
+        kpis["wall_seconds"] = time.perf_counter() - started
+        return kpis
+
+    def kpis(self):
+        """Delivery KPIs for the current fleet; durations are exact, not step-quantised"""
+        fleet = self.fleet
+        count = len(fleet)
+        speed = fleet.speed[:count]
+        # A vehicle that runs its battery flat ends its cycle (and its distance) there
+        total_km = fleet.total_km[:count]
+        driven_km = np.minimum(total_km, fleet.strand_km[:count])
+        cycle_hours = np.divide(driven_km, speed, out=np.zeros(count), where=speed > 0)
+        done = np.divide(driven_km, total_km, out=np.ones(count), where=total_km > 0)
+        # Scheduled routes wait in places, so distance is asked of the route
+        travel_km = [route.travel_km * share for route, share in zip(fleet.routes, done.tolist())]
+
+        by_type = {}
+        for slot, vehicle_type in enumerate(fleet.types):
+            entry = by_type.setdefault(vehicle_type, {"vehicles": 0, "distance_km": 0.0, "deliveries": 0})
+            entry["vehicles"] += 1
+            entry["distance_km"] += travel_km[slot]
+
+        # Customer -> type of the vehicle that delivered it
+        deliveries = {}
+        for slot, extras in enumerate(fleet.extras):
+            if "assigned_delivery" in extras:
+                for stop in self.reached_stops(slot, extras.get("stops", [extras["assigned_delivery"]])):
+                    deliveries.setdefault(tuple(stop), fleet.types[slot])
+        count_deliveries(by_type, deliveries)
+        makespan_hours = float(cycle_hours.max()) if count else 0.0
+
+        return {
+            "vehicles": count,
+            "deliveries": len(deliveries),
+            "makespan_hours": makespan_hours,
+            "mean_cycle_hours": float(cycle_hours.mean()) if count else 0.0,
+            "total_distance_km": float(sum(travel_km)),
+            "drone_share": drone_share(by_type, len(deliveries)),
+            "by_type": by_type,
+            "deliveries_per_hour": len(deliveries) / makespan_hours if makespan_hours > 0 else 0.0,
+            "sim_hours": self.sim_hours,
+            "energy_kwh": float(fleet.drain_kwh[:count] @ driven_km),
+            "stranded": int(np.count_nonzero(fleet.strand_km[:count] < total_km))
+        }
+
+    def reached_stops(self, slot, stops):
+        """The stops a vehicle gets to before its battery runs flat (all of them if it never does)"""
+        fleet = self.fleet
+        strand_km = fleet.strand_km[slot]
+        if strand_km >= fleet.total_km[slot]:
+            return stops
+        route = fleet.routes[slot]
+        stop_km = route.stop_km if isinstance(route, MultiStopRoute) else [route.index.total_km]
+        return [stop for stop, km in zip(stops, stop_km) if km <= strand_km]
+
+    def tick(self, budget_seconds):
+        """Catch the fleet up to the clock: one step at real-time speeds, a burst at "max" """
+        if self.clock.is_max:
+            return self.run_for(budget_seconds)
+        return self.step()
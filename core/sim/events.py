@@ -0,0 +1,460 @@
+"""
+Discrete-event simulation mode
+
+Vehicles travel at constant speed along precomputed routes, so everything
+interesting (departure, arrival at the customer, return to the depot, battery
+swaps and recharges, running flat, wave starts) can be scheduled exactly when
+a vehicle departs, and a vehicle can be re-dispatched on its next wave leg
+once it is back and topped up. The engine pops
+events from a heap in time order and jumps straight between them; positions
+are only computed when someone asks for a sample.
+"""
+import heapq
+import itertools
+import time
+
+import numpy as np
+
+from config.app_config import SIMULATION_CONFIG
+from core.energy import SWAP, RECHARGE, top_up
+from core.fleet_state import RoundTripRoute, MultiStopRoute
+from core.sim.engine import SimulationEngine, count_deliveries, drone_share
+
+WAVE_START = "wave_start"
+DEPART = "depart"
+DELIVER = "deliver"
+RETURN = "return"
+STRANDED = "stranded"
+
+
+def format_clock(sim_seconds, day_start=None):
+    """Simulated seconds as a HH:MM:SS time of day"""
+    hours, minutes, seconds = (int(part) for part in (day_start or SIMULATION_CONFIG["day_start"]).split(":"))
+    total = int(round(sim_seconds)) + hours * 3600 + minutes * 60 + seconds
+    return f"{total // 3600 % 24:02d}:{total // 60 % 60:02d}:{total % 60:02d}"
+
+
+class EventQueue:
+    """Min-heap of (time_s, seq, kind, vehicle, data); seq keeps ties in scheduling order"""
+
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()
+
+    def push(self, time_s, kind, vehicle=None, data=None):
+        heapq.heappush(self.heap, (time_s, next(self.counter), kind, vehicle, data))
+
+    def pop(self):
+        return heapq.heappop(self.heap)
+
+    def peek_time(self):
+        return self.heap[0][0] if self.heap else None
+
+    def discard(self, vehicle, kinds, after_s):
+        """Drop a vehicle's pending events of the given kinds scheduled after after_s"""
+        self.heap = [entry for entry in self.heap
+                     if not (entry[3] == vehicle and entry[2] in kinds and entry[0] > after_s)]
+        heapq.heapify(self.heap)
+
+    def clear(self):
+        self.heap = []
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class EventDrivenEngine(SimulationEngine):
+    """
+    Jumps from event to event instead of ticking
+    A vehicle's position at time t depends only on its departure time, so
+    sample() can place the whole fleet at any instant in one vectorised call.
+    """
+
+    def __init__(self, fleet=None, clock=None):
+        super().__init__(fleet, clock)
+        self.queue = EventQueue()
+        self.depart_s = {}      # Vehicle name -> departure time
+        self.return_s = {}      # Vehicle name -> time back at the depot
+        self.event_log = []
+        self.plan = []          # Externally scheduled events, replayed by reset()
+        self.trips = []         # One record per departure: times, distance, customer
+        self.waves = None       # WavePlan when dispatching in waves
+        self.busy = set()       # Vehicles out on a wave leg
+        self.wave_router = None # Called as wave_router(wave, time_s) to route a wave when it is released
+        self.handlers = {
+            WAVE_START: self._on_wave_start,
+            DEPART: self._on_depart,
+            DELIVER: self._on_deliver,
+            RETURN: self._on_return,
+            STRANDED: self._on_stranded,
+            SWAP: self._on_top_up,
+            RECHARGE: self._on_top_up
+        }
+
+    @property
+    def finished(self):
+        return len(self.queue) == 0 and (self.waves is None or not self.waves.pending())
+
+    # Scheduling
+
+    def add_vehicle(self, name, spec, route, depart_s=None):
+        """
+        Add a vehicle and schedule its departure (default: now)
+        depart_s=False adds it without scheduling a departure
+        """
+        # Trips are timed through traffic when they leave (_on_depart)
+        view = self._place(name, spec, route)
+        if depart_s is not False:
+            self._plan(self.clock.sim_time if depart_s is None else depart_s, DEPART, name)
+        return view
+
+    def _plan(self, time_s, kind, vehicle=None, data=None):
+        self.plan.append((time_s, kind, vehicle, data))
+        self.queue.push(time_s, kind, vehicle, data)
+
+    def schedule_departure(self, name, depart_s):
+        self.queue.push(depart_s, DEPART, name)
+
+    def set_waves(self, plan, start_s=0.0):
+        """Dispatch a WavePlan, releasing its first wave at start_s"""
+        self.waves = plan
+        self._plan(start_s, WAVE_START, None, {"wave": 0})
+
+    def add_leg_route(self, wave, name, route):
+        """Hand over a built route for a wave leg; the vehicle leaves as soon as it can"""
+        self.waves.set_route(wave, name, route)
+        self._dispatch(name, self.clock.sim_time)
+
+    def _dispatch(self, name, time_s):
+        """Send name on its next wave leg if it is idle, released and routed"""
+        if name in self.busy:
+            return
+        leg = self.waves.next_leg(name)
+        if leg is None:
+            return
+
+        wave, spec, route = leg
+        depart_s = max(time_s, self.waves.ready_s.get(name, 0.0))
+        self.busy.add(name)
+        # The vehicle is at the depot, so its route can be swapped before it leaves
+        self._place(name, spec, route)
+        self.depart_s[name] = depart_s
+        self.queue.push(depart_s, DEPART, name, {"wave": wave})
+
+    # Event handlers
+
+    def _on_wave_start(self, time_s, vehicle, data):
+        wave = data["wave"]
+        self.waves.released.add(wave)
+        self.waves.release_scheduled.add(wave)
+        if self.wave_router is not None:
+            self.wave_router(wave, time_s)
+        names = self.waves.vehicles(wave)
+        for name in names:
+            self._dispatch(name, time_s)
+        if not names and wave + 1 < len(self.waves.waves):
+            self.queue.push(time_s, WAVE_START, None, {"wave": wave + 1})
+
+    def _on_depart(self, time_s, vehicle, data):
+        self.depart_s[vehicle] = time_s
+        self.time_trip(self.fleet.slots[vehicle], time_s)
+        trip = self._schedule_trip(vehicle, time_s)
+        if trip is not None:
+            self.trips.append(trip)
+
+    def _schedule_trip(self, vehicle, time_s, after_s=None):
+        """
+        Push every event of a trip leaving at time_s on the vehicle's current route
+        With after_s only the events after it are pushed (a trip rerouted on
+        the way). Returns the trip record, or None for a vehicle that cannot move.
+        """
+        fleet = self.fleet
+        slot = fleet.slots[vehicle]
+
+        def push(at_s, kind, data=None):
+            if after_s is None or at_s > after_s:
+                self.queue.push(at_s, kind, vehicle, data)
+
+        speed = fleet.speed[slot]
+        if speed <= 0:
+            return None
+        route = fleet.routes[slot]
+        extras = fleet.extras[slot]
+        total_km = fleet.total_km[slot]
+        # A battery that runs flat cuts the trip short there
+        driven_km = float(min(total_km, fleet.strand_km[slot]))
+        stranded = bool(driven_km < total_km)
+
+        # Everything else this trip does is known the moment it leaves
+        deliver_s = None
+        customer = extras.get("assigned_delivery")
+        # A single-stop trip timed through traffic is a multi-stop route with its customer as the one stop
+        stops = extras.get("stops", None if customer is None else [customer])
+        if isinstance(route, RoundTripRoute):
+            if route.index.total_km <= driven_km:
+                deliver_s = time_s + route.index.total_km / speed * 3600.0
+                push(deliver_s, DELIVER, {"customer": customer})
+            else:
+                customer = None
+        elif isinstance(route, MultiStopRoute):
+            reached = route.stop_km <= driven_km
+            stop_s = time_s + route.stop_km[reached] / speed * 3600.0
+            stops = [stop for stop, ok in zip(stops or [], reached.tolist()) if ok]
+            for stop, at_s in zip(stops, stop_s.tolist()):
+                push(at_s, DELIVER, {"customer": stop})
+            deliver_s = float(stop_s[0]) if len(stop_s) else None
+            if not stops:
+                customer = None
+
+        # Back-to-back tours pass the depot, which swaps in a fresh pack without holding the timetable
+        battery_kwh, drain_kwh = fleet.battery_kwh[slot], fleet.drain_kwh[slot]
+        if battery_kwh > 0:
+            starts = route.depot_km
+            for pass_km, previous_km in zip(starts[1:].tolist(), starts[:-1].tolist()):
+                if pass_km < driven_km:
+                    push(time_s + pass_km / speed * 3600.0, SWAP,
+                         {"kwh": round(drain_kwh * (pass_km - previous_km), 3), "minutes": 0.0})
+
+        return_s = time_s + driven_km / speed * 3600.0
+        push(return_s, STRANDED if stranded else RETURN)
+
+        return {
+            "vehicle": vehicle,
+            "type": fleet.types[slot],
+            "wave": extras.get("wave", 0),
+            "customer": customer,
+            "stops": stops,
+            "depart_s": time_s,
+            "deliver_s": deliver_s,
+            "return_s": return_s,
+            "distance_km": route.travel_km * (driven_km / total_km if total_km > 0 else 1.0),
+            "energy_kwh": drain_kwh * driven_km,
+            "stranded": stranded
+        }
+
+    def reroute(self, name, route, extras=None):
+        """
+        Swap a vehicle's route mid-trip and reschedule what is still ahead of it
+        Events up to now are the same on both routes, since they share the part
+        already driven; later ones are dropped and pushed again from the new
+        route, and the trip's record is replaced.
+        """
+        view = super().reroute(name, route, extras)
+        now = self.clock.sim_time
+        depart_s = self.depart_s.get(name)
+        leaving = any(entry[3] == name and entry[2] == DEPART for entry in self.queue.heap)
+        if depart_s is None or depart_s > now or leaving:
+            return view     # Not on the road yet: its departure schedules the new route
+
+        self.queue.discard(name, (DELIVER, RETURN, STRANDED, SWAP), now)
+        trip = self._schedule_trip(name, depart_s, after_s=now)
+        for k in range(len(self.trips) - 1, -1, -1):
+            if self.trips[k]["vehicle"] == name:
+                if trip is not None:
+                    self.trips[k] = trip
+                break
+        return view
+
+    def _on_deliver(self, time_s, vehicle, data):
+        pass
+
+    def _on_return(self, time_s, vehicle, data):
+        self.return_s[vehicle] = time_s
+
+        # Top the battery up before it can leave again (drawn since the last depot pass)
+        fleet = self.fleet
+        slot = fleet.slots[vehicle]
+        used_kwh = fleet.drain_kwh[slot] * (fleet.total_km[slot] - fleet.routes[slot].depot_km[-1])
+        kind, minutes = top_up(fleet.types[slot], used_kwh)
+        if kind is not None:
+            self.queue.push(time_s, kind, vehicle, {"kwh": round(float(used_kwh), 3), "minutes": round(minutes, 2)})
+
+        if self.waves is None or vehicle not in self.busy:
+            return
+
+        # Turn the vehicle round for the next wave; the first one back releases it
+        waves = self.waves
+        self.busy.discard(vehicle)
+        ready_s = time_s + max(waves.pause_s, minutes * 60.0)
+        waves.ready_s[vehicle] = ready_s
+        next_wave = self.fleet.extras[self.fleet.slots[vehicle]].get("wave", 0) + 1
+        if next_wave < len(waves.waves) and next_wave not in waves.release_scheduled:
+            waves.release_scheduled.add(next_wave)
+            self.queue.push(ready_s, WAVE_START, None, {"wave": next_wave})
+        self._dispatch(vehicle, time_s)
+
+    def _on_stranded(self, time_s, vehicle, data):
+        """A flat battery ends the vehicle's day: it stays put and its remaining wave legs go unserved"""
+        if self.waves is not None:
+            self.busy.discard(vehicle)
+            self.waves.legs.pop(vehicle, None)
+
+    def _on_top_up(self, time_s, vehicle, data):
+        pass
+
+    def process_until(self, time_s):
+        """Handle every event up to and including time_s; returns how many ran"""
+        processed = 0
+        while self.queue and self.queue.peek_time() <= time_s:
+            event_time, _, kind, vehicle, data = self.queue.pop()
+            self.handlers[kind](event_time, vehicle, data)
+            entry = {
+                "time_s": event_time,
+                "clock": format_clock(event_time),
+                "event": kind,
+                "vehicle": vehicle,
+                **(data or {})
+            }
+            self.event_log.append(entry)
+            if self.recorder is not None:
+                self.recorder.add_event(entry)
+            processed += 1
+        return processed
+
+    def run_to(self, time_s):
+        """Handle every event up to time_s and place the fleet there"""
+        self.clock.jump_to(max(time_s, self.clock.sim_time))
+        self.advance_to(self.clock.sim_time)
+        self.sample()
+
+    def advance_to(self, time_s):
+        """
+        process_until() that also writes recorder frames on the way
+        Frames up to each event are written before it runs, since handling an
+        event can put a vehicle on a new route. Leaves positions to the caller.
+        """
+        if self.recorder is None:
+            return self.process_until(time_s)
+
+        processed = 0
+        while self.queue and self.queue.peek_time() <= time_s:
+            event_time = self.queue.peek_time()
+            self._record(event_time)
+            processed += self.process_until(event_time)
+        self._record(time_s)
+        return processed
+
+    # Sampling
+
+    def sample(self, time_s=None):
+        """Place every vehicle where it is at time_s (default: clock time); returns positions"""
+        fleet = self.fleet
+        count = len(fleet)
+        if count == 0:
+            return fleet.positions()
+
+        time_s = self.clock.sim_time if time_s is None else time_s
+        depart = np.array([self.depart_s.get(name, np.inf) for name in fleet.names])
+        elapsed_hours = np.maximum(time_s - depart, 0.0) / 3600.0  # Not yet departed -> 0
+        fleet.seek(np.arange(count), fleet.speed[:count] * elapsed_hours)
+        return fleet.positions()
+
+    def positions_at(self, time_s):
+        return self.sample(time_s)
+
+    def step(self):
+        """Catch up with the clock, then sample positions for the renderer"""
+        self.clock.advance()
+        self.advance_to(self.clock.sim_time)
+        moving = self.fleet.active_mask()
+        self.sample()
+        return np.flatnonzero(moving)
+
+    def tick(self, budget_seconds):
+        """At "max" speed jump straight to the next event instead of stepping"""
+        if self.clock.is_max:
+            next_time = self.queue.peek_time()
+            if next_time is None or not self.clock.running:
+                return np.empty(0, dtype=np.intp)
+            self.clock.jump_to(max(next_time, self.clock.sim_time))
+            self.advance_to(self.clock.sim_time)
+            moving = self.fleet.active_mask()
+            self.sample()
+            return np.flatnonzero(moving)
+        return self.step()
+
+    def reset(self):
+        """Back to t = 0 with the original departures and waves rescheduled"""
+        super().reset()
+        self.queue.clear()
+        self.event_log = []
+        self.trips = []
+        self.depart_s = {}
+        self.return_s = {}
+        self.busy = set()
+        if self.waves is not None:
+            self.waves.reset()
+        for time_s, kind, vehicle, data in self.plan:
+            self.queue.push(time_s, kind, vehicle, data)
+
+    def clear(self):
+        super().clear()
+        self.queue.clear()
+        self.event_log = []
+        self.plan = []
+        self.trips = []
+        self.waves = None
+        self.busy = set()
+        self.depart_s = {}
+        self.return_s = {}
+
+    # Running
+
+    def run_to_completion(self, step_seconds=None):
+        """Process every event in order with no ticking; returns the KPIs"""
+        started = time.perf_counter()
+        processed = 0
+        while self.queue:
+            processed += self.advance_to(self.queue.peek_time())
+        if self.event_log:
+            self.clock.jump_to(self.event_log[-1]["time_s"])
+        self.sample()
+
+        kpis = self.kpis()
+        kpis["sim_steps"] = processed
+        kpis["wall_seconds"] = time.perf_counter() - started
+        return kpis
+
+    def kpis(self):
+        """Base KPIs recomputed over every trip, from first departure to last return"""
+        kpis = super().kpis()
+        trips = self.trips
+        if trips:
+            makespan_hours = (max(t["return_s"] for t in trips) - min(t["depart_s"] for t in trips)) / 3600.0
+            delivered = {}
+            for t in trips:
+                if t["customer"] is not None:
+                    for stop in t["stops"] or [t["customer"]]:
+                        delivered.setdefault(tuple(stop), t["type"])
+            count_deliveries(kpis["by_type"], delivered)
+            deliveries = len(delivered)
+            for entry in kpis["by_type"].values():
+                entry["distance_km"] = 0.0
+            for trip in trips:
+                kpis["by_type"][trip["type"]]["distance_km"] += trip["distance_km"]
+            kpis.update({
+                "energy_kwh": sum(t.get("energy_kwh", 0.0) for t in trips),
+                "stranded": sum(1 for t in trips if t.get("stranded")),
+                "deliveries": deliveries,
+                "drone_share": drone_share(kpis["by_type"], deliveries),
+                "makespan_hours": makespan_hours,
+                "mean_cycle_hours": float(np.mean([t["return_s"] - t["depart_s"] for t in trips])) / 3600.0,
+                "total_distance_km": sum(t["distance_km"] for t in trips),
+                "deliveries_per_hour": deliveries / makespan_hours if makespan_hours > 0 else 0.0
+            })
+        kpis["trips"] = len(trips)
+        if self.waves is not None:
+            kpis["waves"] = len(self.waves.waves)
+        kpis["events"] = len(self.event_log)
+        return kpis
+
+
+ENGINE_MODES = {
+    "step": SimulationEngine,
+    "event": EventDrivenEngine
+}
+
+
+def create_engine(mode=None, fleet=None, clock=None):
+    """Engine for the given mode ("step" or "event"; default from SIMULATION_CONFIG)"""
+    return ENGINE_MODES[mode or SIMULATION_CONFIG["mode"]](fleet, clock)
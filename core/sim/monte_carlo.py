@@ -0,0 +1,197 @@
+"""
+Monte Carlo scenario runner
+
+Fans seeded scenario replicas out over a process pool and aggregates their
+KPIs into distributions. Replicas are planned the way a single run is
+(multi-stop tours and tandem sorties unless disabled) on the pool, then
+route geometry is built in the parent: every distinct depot -> customer leg
+once across all replicas, and each replica's tours. The routes are packed
+into one set of float64 buffers on disk (core.sim.snapshot.RouteTable) and
+memory-mapped read-only by the workers, so the OS shares the pages and no
+worker rebuilds or copies a route. Workers are handed the parent's config
+explicitly rather than relying on fork to inherit it.
+"""
+import contextlib
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config.app_config import (MONTE_CARLO_CONFIG, ROUTE_BUILD_CONFIG, ROUTING_CONFIG, TRAFFIC_CONFIG,
+                               ENERGY_CONFIG, MULTI_STOP_CONFIG, ASSIGNMENT_CONFIG, SIMULATION_CONFIG)
+from core.api_handler import RouteManager
+from core.sim import scenario
+from core.sim.events import create_engine
+from core.sim.snapshot import RouteTable
+
+# KPIs collected from every replica and summarised as distributions
+SAMPLED_KPIS = ("makespan_hours", "total_distance_km", "drone_share", "mean_cycle_hours", "deliveries_per_hour")
+
+# Config dicts whose current values are copied into every worker process
+SHARED_CONFIGS = (ROUTING_CONFIG, TRAFFIC_CONFIG, ENERGY_CONFIG, MULTI_STOP_CONFIG, ASSIGNMENT_CONFIG,
+                  SIMULATION_CONFIG)
+
+# Per-worker routes over the shared buffers, set by _attach_routes
+_shared_routes = None
+
+
+def _leg_key(delivery, use_drone):
+    # ~1 cm rounding so identical customers from different replicas share a leg
+    return (round(delivery[0], 7), round(delivery[1], 7), use_drone)
+
+
+def _configure(configs):
+    """Pool initializer: take on the parent's config overrides"""
+    for config, values in zip(SHARED_CONFIGS, configs):
+        config.update(values)
+
+
+def _attach_routes(directory, configs):
+    """Pool initializer: map the packed route buffers read-only"""
+    global _shared_routes
+    _configure(configs)
+    arrays = {name[:-4]: np.load(os.path.join(directory, name), mmap_mode="r") for name in os.listdir(directory)}
+    _shared_routes = RouteTable.load(arrays)
+
+
+def _plan_replicas(seeds, depot, customers, fleet_mix, customer_seed, multi_stop):
+    """Worker task: vehicle specs for a chunk of replicas, planned like a single run (runner.run_scenario)"""
+    plans = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for seed in seeds:
+            rng = random.Random(seed)
+            customer_rng = random.Random(customer_seed) if customer_seed is not None else None
+            if multi_stop:
+                deliveries = scenario.generate_delivery_points(depot, customers, customer_rng or rng)
+                specs = scenario.plan_multi_stop(depot, deliveries, fleet_mix, rng)
+            else:
+                specs = scenario.plan_scenario(depot, customers, fleet_mix, rng, customer_rng)
+            plans.append((seed, specs))
+    return plans
+
+
+def _run_replicas(replicas, step_seconds, mode):
+    """Worker task: simulate a chunk of planned replicas against the shared routes"""
+    results = []
+    for seed, vehicles in replicas:
+        engine = create_engine(mode)
+        for name, spec, route_id in vehicles:
+            # Routes are zero-copy views of the shared buffers
+            engine.add_vehicle(name, spec, _shared_routes[route_id])
+
+        kpis = engine.run_to_completion(step_seconds)
+        sample = {key: kpis[key] for key in SAMPLED_KPIS}
+        sample["seed"] = seed
+        results.append(sample)
+    return results
+
+
+def summarise(values):
+    """Distribution summary of one KPI across replicas"""
+    values = np.asarray(values, dtype=np.float64)
+    p5, p50, p95 = np.percentile(values, [5, 50, 95])
+    return {
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "p5": float(p5),
+        "p50": float(p50),
+        "p95": float(p95),
+        "max": float(values.max())
+    }
+
+
+def run_monte_carlo(depot, customers, electric_trucks=2, fuel_trucks=1, drones=3,
+                    replicas=1000, seed=0, customer_seed=None, workers=None,
+                    step_seconds=None, chunk_size=None, mode=None, multi_stop=None):
+    """
+    Run seeded replicas and return KPI distributions plus the per-replica samples
+    Replica i uses seed + i. With customer_seed set the customer points are the
+    same in every replica and only allocation and vehicle draws vary (with an
+    optimal ASSIGNMENT_CONFIG objective only the vehicle payloads do).
+    Trucks run multi-stop tours unless multi_stop is False (default:
+    MULTI_STOP_CONFIG["enabled"]), as in a single run.
+    """
+    fleet_mix = {"Drone": drones, "Electric Truck": electric_trucks, "Fuel Truck": fuel_trucks}
+    workers = workers or MONTE_CARLO_CONFIG["workers"] or os.cpu_count()
+    chunk_size = chunk_size or MONTE_CARLO_CONFIG["chunk_size"]
+    step_seconds = step_seconds or MONTE_CARLO_CONFIG["step_seconds"]
+    mode = mode or MONTE_CARLO_CONFIG["mode"]
+    if multi_stop is None:
+        multi_stop = MULTI_STOP_CONFIG["enabled"]
+    configs = [dict(config) for config in SHARED_CONFIGS]
+    started = time.perf_counter()
+
+    # Plan every replica on the pool (local search makes multi-stop planning the costly part)
+    seeds = [seed + i for i in range(replicas)]
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+    plans = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_configure, initargs=(configs,)) as pool:
+        count = len(chunks)
+        for planned in pool.map(_plan_replicas, chunks, [depot] * count, [customers] * count,
+                                [fleet_mix] * count, [customer_seed] * count, [multi_stop] * count):
+            plans.extend(planned)
+
+    # Build each distinct single-stop leg exactly once, and every replica's tours
+    legs = {}
+    for _, specs in plans:
+        for _, _, delivery, use_drone in scenario.route_jobs(depot, specs):
+            if not isinstance(delivery, dict) and not isinstance(delivery[0], (list, tuple)):
+                legs.setdefault(_leg_key(delivery, use_drone), (len(legs), depot, delivery, use_drone))
+    leg_routes = RouteManager.build_routes_parallel(
+        list(legs.values()), max_workers=ROUTE_BUILD_CONFIG["max_workers"]
+    )
+
+    table = RouteTable()
+    tasks = []
+    for replica_seed, specs in plans:
+        jobs = [job for job in scenario.route_jobs(depot, specs)
+                if isinstance(job[2], dict) or isinstance(job[2][0], (list, tuple))]
+        # Tandem routes come back keyed by vehicle name, so tours are built one replica at a time
+        routes = RouteManager.build_routes_parallel(jobs, max_workers=ROUTE_BUILD_CONFIG["max_workers"])
+        vehicles = []
+        for name, spec in specs.items():
+            route = routes.get(name)
+            if route is None and "tours" not in spec and "carrier" not in spec:
+                route = leg_routes.get(legs[_leg_key(spec["assigned_delivery"], spec["type"] == "Drone")][0])
+            if route is not None:
+                vehicles.append((name, spec, table.add(route)))
+        tasks.append((replica_seed, vehicles))
+    planning_seconds = time.perf_counter() - started
+
+    shared_dir = tempfile.mkdtemp(prefix="mc_routes_")
+    try:
+        arrays = table.arrays()
+        for name, values in arrays.items():
+            np.save(os.path.join(shared_dir, name + ".npy"), values)
+
+        samples = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_routes,
+                                 initargs=(shared_dir, configs)) as pool:
+            chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+            for results in pool.map(_run_replicas, chunks, [step_seconds] * len(chunks), [mode] * len(chunks)):
+                samples.extend(results)
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+    return {
+        "replicas": len(samples),
+        "depot": list(depot),
+        "customers": customers,
+        "fleet_mix": fleet_mix,
+        "mode": mode,
+        "multi_stop": multi_stop,
+        "seed": seed,
+        "customer_seed": customer_seed,
+        "distinct_routes": len(table.routes),
+        "route_points": len(arrays["route_coords"]),
+        "distributions": {key: summarise([s[key] for s in samples]) for key in SAMPLED_KPIS} if samples else {},
+        "planning_seconds": planning_seconds,
+        "wall_seconds": time.perf_counter() - started,
+        "samples": samples
+    }
@@ -0,0 +1,516 @@
+"""
+Live order intake with online cheapest insertion
+
+Orders arrive while the fleet is out, from a file (followed as it grows), a
+TCP socket or a generator. Every batch is priced against every leg the
+fleet has not driven yet in one NumPy expression (the straight-line detour
+times a road factor, in hours at each vehicle's speed), and each order goes
+to the cheapest leg whose tour still has room for its parcel. Only vehicles
+that took orders get a new route, and it reuses the geometry of every leg
+that did not change; the part already driven is untouched, so a vehicle
+carries on from where it is. Vehicles back at the depot start a new tour,
+and orders nothing can take wait in a backlog for the next batch.
+
+Orders are {"id", "coords": [lat, lon], "kg"} dicts, optionally with a
+"time_s" arrival time. Sources accept one order per line as "lat,lon[,kg]"
+or a JSON object with those keys, and yield None while nothing arrives so a
+consumer can flush its batch and check whether to stop.
+"""
+import itertools
+import json
+import random
+import selectors
+import socket
+import time
+
+import numpy as np
+
+from config.app_config import (ORDER_STREAM_CONFIG, MULTI_STOP_CONFIG, DELIVERY_DISTANCE_MIN,
+                               DELIVERY_DISTANCE_MAX)
+from core import geodesy
+from core.api_handler import RouteManager
+from core.energy import battery_profile, top_up
+from core.fleet_state import RoundTripRoute, MultiStopRoute, ScheduledRoute, TimedRoute, route_kwh
+from core.sim.events import DEPART, EventDrivenEngine
+
+_order_ids = itertools.count(1)
+
+
+def parse_order(text):
+    """An order from one line of "lat,lon[,kg]" or JSON; None for blank lines and # comments"""
+    text = text.strip()
+    if not text or text.startswith("#"):
+        return None
+    if text.startswith("{"):
+        data = json.loads(text)
+        coords = data.get("coords") or [data["lat"], data["lon"]]
+        order = {"id": str(data.get("id", "")), "coords": [float(coords[0]), float(coords[1])],
+                 "kg": float(data.get("kg", ORDER_STREAM_CONFIG["default_kg"]))}
+        if "time_s" in data:
+            order["time_s"] = float(data["time_s"])
+    else:
+        fields = [float(part) for part in text.split(",")]
+        order = {"id": "", "coords": fields[:2],
+                 "kg": fields[2] if len(fields) > 2 else ORDER_STREAM_CONFIG["default_kg"]}
+    if not order["id"]:
+        order["id"] = f"order-{next(_order_ids)}"
+    return order
+
+
+def _read_order(line):
+    """parse_order() for a raw line from a stream; malformed lines are reported and skipped (None)"""
+    try:
+        return parse_order(line.decode("utf-8"))
+    except (ValueError, KeyError, IndexError) as e:
+        print(f"Skipping malformed order {line[:80]!r}: {e}")
+        return None
+
+
+def file_orders(path, follow=False, should_stop=None):
+    """Orders from a file, one per line; with follow, keep reading lines appended to it"""
+    poll_s = ORDER_STREAM_CONFIG["poll_s"]
+    partial = b""
+    with open(path, "rb") as f:
+        while should_stop is None or not should_stop():
+            partial += f.readline()
+            # A line still being written is completed on a later read
+            if partial.endswith(b"\n") or (partial and not follow):
+                order = _read_order(partial)
+                partial = b""
+                if order is not None:
+                    yield order
+            elif not follow:
+                return
+            else:
+                yield None
+                time.sleep(poll_s)
+
+
+def socket_orders(host, port, should_stop=None):
+    """
+    Orders sent to a TCP server on host:port, one per line
+    Any number of clients can connect at once (e.g. nc host port < orders.txt).
+    """
+    poll_s = ORDER_STREAM_CONFIG["poll_s"]
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen()
+    server.setblocking(False)
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    buffers = {}
+    print(f"Listening for orders on {host}:{port}")
+    try:
+        while should_stop is None or not should_stop():
+            ready = selector.select(poll_s)
+            if not ready:
+                yield None
+            for key, _ in ready:
+                if key.fileobj is server:
+                    client, _ = server.accept()
+                    client.setblocking(False)
+                    selector.register(client, selectors.EVENT_READ)
+                    buffers[client] = b""
+                    continue
+                client = key.fileobj
+                data = client.recv(65536)
+                if data:
+                    *lines, buffers[client] = (buffers[client] + data).split(b"\n")
+                else:
+                    # The client hung up: an unterminated last line is still an order
+                    lines = [buffers.pop(client)]
+                    selector.unregister(client)
+                    client.close()
+                for line in lines:
+                    order = _read_order(line)
+                    if order is not None:
+                        yield order
+    finally:
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+        selector.close()
+
+
+def generated_orders(depot, rate=None, count=None, rng=random, realtime=True, should_stop=None):
+    """
+    Random orders around the depot arriving as a Poisson stream of rate per second
+    Each carries its arrival "time_s"; with realtime the generator also waits
+    for it in wall time. Stops after count orders (default: never).
+    """
+    rate = ORDER_STREAM_CONFIG["generate_rate"] if rate is None else rate
+    low, high = MULTI_STOP_CONFIG["parcel_weight_kg"]
+    started = time.perf_counter()
+    time_s = 0.0
+    for k in itertools.count():
+        if (count is not None and k >= count) or (should_stop is not None and should_stop()):
+            return
+        time_s += rng.expovariate(rate)
+        while realtime and time.perf_counter() - started < time_s:
+            yield None
+            time.sleep(min(ORDER_STREAM_CONFIG["poll_s"], max(time_s - (time.perf_counter() - started), 0.0)))
+        lat, lon = geodesy.destination_point(depot[0], depot[1], rng.uniform(0, 360),
+                                             rng.uniform(DELIVERY_DISTANCE_MIN, DELIVERY_DISTANCE_MAX))
+        yield {"id": f"order-{next(_order_ids)}", "coords": [float(lat), float(lon)],
+               "kg": rng.uniform(low, high), "time_s": time_s}
+
+
+def open_order_source(spec, depot, rng=random, realtime=True, follow=None, should_stop=None):
+    """
+    Order generator for a source spec: "generate[:rate[:count]]",
+    "tcp:[host:]port" or a file path ("file:path" also works)
+    """
+    kind, _, rest = spec.partition(":")
+    if kind == "generate":
+        parts = rest.split(":") if rest else []
+        rate = float(parts[0]) if parts and parts[0] else None
+        count = int(parts[1]) if len(parts) > 1 else None
+        return generated_orders(depot, rate, count, rng, realtime, should_stop)
+    if kind == "tcp":
+        host, _, port = rest.rpartition(":")
+        return socket_orders(host or "127.0.0.1", int(port), should_stop)
+    path = rest if kind == "file" else spec
+    follow = ORDER_STREAM_CONFIG["follow_file"] if follow is None else follow
+    return file_orders(path, follow, should_stop)
+
+
+def _runs_flat(route, vehicle_type, speed, battery_kwh, kwh_per_km):
+    """Whether some depot-to-depot trip of route needs more than one battery pack"""
+    if battery_kwh <= 0 or kwh_per_km <= 0:
+        return False
+    progress, kwh = route_kwh(route, vehicle_type, speed, kwh_per_km)
+    trip_kwh = np.interp(np.append(route.depot_km, route.total_km), progress, kwh)
+    return bool((np.diff(trip_kwh) > battery_kwh).any())
+
+
+class _Plan:
+    """
+    A vehicle's route as nodes (depot passes and stops) while a batch is inserted
+    Every plan ends with an empty extra tour, so a vehicle whose tours are
+    full can still take orders on one more trip out of the depot.
+    """
+
+    def __init__(self, slot, nodes, waypoints, depots, loads, tour_km, node_km, first, fresh):
+        self.slot = slot
+        self.nodes = nodes              # [lat, lon] per node, depot first and last
+        self.waypoints = waypoints      # Node's waypoint on the current route; None for new nodes
+        self.depots = depots            # Whether each node is a depot pass
+        self.loads = loads              # Parcel kg per tour
+        self.tour_km = tour_km          # Length of each tour
+        self.node_km = node_km          # Distance still to drive to each node (nodes behind the vehicle: <= 0)
+        self.first = first              # First leg the vehicle has not started
+        self.fresh = fresh              # A new trip from the depot rather than a reroute
+        self.orders = []
+
+    def tour_of(self, leg):
+        """Tour the leg leaving node leg belongs to"""
+        return sum(self.depots[:leg + 1]) - 1
+
+    def drop_empty_tour(self):
+        """Forget the extra tour if no order went on it"""
+        if len(self.nodes) > 2 and self.depots[-1] and self.depots[-2]:
+            for values in (self.nodes, self.waypoints, self.depots):
+                values.pop()
+            self.loads.pop()
+            self.tour_km.pop()
+
+
+class OrderDispatcher:
+    """
+    Inserts streamed orders into the routes of a running engine
+    submit() takes a batch, rebuilds the routes of the vehicles that took
+    orders and returns their names; the caller only redraws those.
+    A parcel only joins a tour with room left in the vehicle's payload and,
+    for battery vehicles, only while the tour stays within one pack.
+    """
+
+    def __init__(self, engine, depot, vehicle_types=None):
+        self.engine = engine
+        self.depot = list(depot)
+        self.vehicle_types = set(ORDER_STREAM_CONFIG["vehicle_types"] if vehicle_types is None else vehicle_types)
+        self.backlog = []
+        self.received = 0
+        self.inserted = 0
+        self.dropped = 0
+
+    def _plans(self):
+        """A _Plan for every vehicle that can still take stops"""
+        engine = self.engine
+        fleet = engine.fleet
+        # The event engine times trips from their departure, so a vehicle back at the depot
+        # starts a new trip; a stepped vehicle simply drives on along its longer route
+        timed = isinstance(engine, EventDrivenEngine)
+        stranded = fleet.stranded_mask()
+        departing = {entry[3] for entry in engine.queue.heap if entry[2] == DEPART} if timed else set()
+        plans = []
+        for slot, name in enumerate(fleet.names):
+            route = fleet.routes[slot]
+            if fleet.types[slot] not in self.vehicle_types or fleet.speed[slot] <= 0 or stranded[slot]:
+                continue
+            extras = fleet.extras[slot]
+            # A vehicle waiting to leave is still at the start of its route, whatever was last sampled
+            distance = 0.0 if name in departing else fleet.distance_km[slot]
+            if timed and distance >= fleet.total_km[slot]:
+                # Unless a wave leg is already waiting for the vehicle
+                if name in engine.busy or (engine.waves is not None and engine.waves.legs.get(name)):
+                    continue
+                plans.append(_Plan(slot, [self.depot, self.depot], [None, None], [True, True], [0.0], [0.0],
+                                   [0.0, 0.0], 0, True))
+                continue
+            # A timetabled tandem route cannot take stops without reworking its drone sorties
+            # (a trip timed through traffic can: it is timed again from its departure)
+            tandem = isinstance(route, ScheduledRoute) and not isinstance(route, TimedRoute)
+            if tandem or not isinstance(route, (RoundTripRoute, MultiStopRoute)):
+                continue
+
+            coords = np.asarray(route, dtype=np.float64)
+            if isinstance(route, MultiStopRoute):
+                at_depot = np.flatnonzero(np.all(np.abs(coords - coords[0]) < 1e-9, axis=1))
+                waypoints = np.union1d(at_depot, route.stop_index)
+                depots = np.isin(waypoints, at_depot)
+                node_km = route.index.cumulative_km[waypoints]
+            else:
+                # Depot, customer, depot along the unfolded round trip
+                waypoints = np.array([0, len(route.outbound) - 1, len(route) - 1])
+                depots = np.array([True, False, True])
+                node_km = np.array([0.0, route.index.total_km, route.total_km])
+            first = int(np.searchsorted(node_km, distance, side="left"))
+            if ORDER_STREAM_CONFIG["board_at_depot"]:
+                # Parcels are loaded at the depot, so only tours that have not left yet can take them
+                first += int(np.argmax(depots[first:]))
+            if isinstance(route, TimedRoute):
+                # Progress runs slow in traffic; battery use goes by the distance actually driven
+                tour_km = np.diff(route.road_km[waypoints][depots]).tolist()
+            else:
+                tour_km = np.diff(node_km[depots]).tolist()
+            loads = list(extras.get("tour_loads") or [extras.get("load_kg", 0.0)] * len(tour_km))
+            plans.append(_Plan(slot, coords[waypoints].tolist() + [self.depot], waypoints.tolist() + [None],
+                               depots.tolist() + [True], loads + [0.0], tour_km + [0.0],
+                               (np.append(node_km, node_km[-1]) - distance).tolist(), first, False))
+        return plans
+
+    def _legs(self, plans):
+        """Parallel arrays over every leg not yet started: ends, base km, owning plan and tour, spare kg and km"""
+        fleet = self.engine.fleet
+        road_factor = ORDER_STREAM_CONFIG["road_factor"]
+        start, end, owner, leg, tour, factor, speed, ahead = [], [], [], [], [], [], [], []
+        spare_kg, spare_km = [], []
+        for p, plan in enumerate(plans):
+            slot = plan.slot
+            battery, rate = fleet.battery_kwh[slot], fleet.kwh_per_km[slot]
+            reach = battery / rate if battery > 0 and rate > 0 else np.inf
+            tour_base = len(spare_kg)
+            spare_kg.extend(fleet.weight[slot] - load for load in plan.loads)
+            spare_km.extend(reach - km for km in plan.tour_km)
+            for k in range(plan.first, len(plan.nodes) - 1):
+                start.append(plan.nodes[k])
+                end.append(plan.nodes[k + 1])
+                owner.append(p)
+                leg.append(k)
+                tour.append(tour_base + plan.tour_of(k))
+                factor.append(1.0 if fleet.types[slot] == "Drone" else road_factor)
+                speed.append(fleet.speed[slot])
+                ahead.append(plan.node_km[k])
+        start = np.asarray(start, dtype=np.float64).reshape(-1, 2)
+        end = np.asarray(end, dtype=np.float64).reshape(-1, 2)
+        return {
+            "start": start,
+            "end": end,
+            "base": geodesy.haversine(start[:, 0], start[:, 1], end[:, 0], end[:, 1]),
+            "owner": np.asarray(owner, dtype=np.intp),
+            "leg": np.asarray(leg, dtype=np.intp),
+            "tour": np.asarray(tour, dtype=np.intp),
+            "factor": np.asarray(factor),
+            "speed": np.asarray(speed),
+            "ahead_km": np.asarray(ahead, dtype=np.float64),
+            "spare_kg": np.asarray(spare_kg, dtype=np.float64),
+            "spare_km": np.asarray(spare_km, dtype=np.float64)
+        }
+
+    def submit(self, orders):
+        """Insert a batch of orders (plus the backlog) into the fleet's routes; returns the rerouted vehicle names"""
+        orders = list(orders)
+        self.received += len(orders)
+        pending = self.backlog + orders
+        self.backlog = []
+        if not pending:
+            return []
+
+        plans = self._plans()
+        legs = self._legs(plans)
+        wait_weight = ORDER_STREAM_CONFIG["wait_weight"]
+        for order in pending:
+            lat, lon = order["coords"]
+            if len(legs["owner"]) == 0:
+                self.backlog.append(order)
+                continue
+            # Detour of putting the order on every open leg at once, and how long the customer would wait
+            start, end = legs["start"], legs["end"]
+            to_order_km = geodesy.haversine(start[:, 0], start[:, 1], lat, lon) * legs["factor"]
+            detour_km = (to_order_km + geodesy.haversine(lat, lon, end[:, 0], end[:, 1]) * legs["factor"]
+                         - legs["base"] * legs["factor"])
+            wait_km = legs["ahead_km"] + to_order_km
+            fits = ((legs["spare_kg"][legs["tour"]] >= order["kg"])
+                    & (legs["spare_km"][legs["tour"]] >= detour_km))
+            hours = np.where(fits, (detour_km + wait_weight * wait_km) / legs["speed"], np.inf)
+            best = int(np.argmin(hours))
+            if not np.isfinite(hours[best]):
+                self.backlog.append(order)
+                continue
+
+            # The leg A -> B becomes A -> order -> B
+            p = legs["owner"][best]
+            plan = plans[p]
+            k = int(legs["leg"][best])
+            plan.nodes.insert(k + 1, list(order["coords"]))
+            plan.waypoints.insert(k + 1, None)
+            plan.depots.insert(k + 1, False)
+            plan.loads[plan.tour_of(k)] += order["kg"]
+            plan.tour_km[plan.tour_of(k)] += detour_km[best]
+            plan.orders.append(order)
+            legs["spare_kg"][legs["tour"][best]] -= order["kg"]
+            legs["spare_km"][legs["tour"][best]] -= detour_km[best]
+
+            point = np.array([[lat, lon]])
+            later = (legs["owner"] == p) & (legs["leg"] > k)
+            legs["leg"][later] += 1
+            legs["ahead_km"][later] += detour_km[best]
+            legs["ahead_km"] = np.insert(legs["ahead_km"], best + 1, wait_km[best])
+            legs["start"] = np.insert(start, best + 1, point, axis=0)
+            legs["end"] = np.insert(end, best, point, axis=0)
+            legs["base"] = np.insert(legs["base"], best + 1, geodesy.haversine(lat, lon, end[best, 0], end[best, 1]))
+            legs["base"][best] = geodesy.haversine(start[best, 0], start[best, 1], lat, lon)
+            for key in ("owner", "tour", "factor", "speed"):
+                legs[key] = np.insert(legs[key], best + 1, legs[key][best])
+            legs["leg"] = np.insert(legs["leg"], best + 1, k + 1)
+
+        changed = []
+        for plan in plans:
+            if plan.orders and self._apply(plan):
+                changed.append(self.engine.fleet.names[plan.slot])
+
+        limit = ORDER_STREAM_CONFIG["max_backlog"]
+        if len(self.backlog) > limit:
+            self.dropped += len(self.backlog) - limit
+            print(f"Order backlog full: dropping {len(self.backlog) - limit} oldest orders")
+            self.backlog = self.backlog[-limit:]
+        return changed
+
+    def _apply(self, plan):
+        """Build the plan's route and put its vehicle on it; False (orders back to the backlog) if it cannot make it"""
+        engine = self.engine
+        fleet = engine.fleet
+        slot = plan.slot
+        name = fleet.names[slot]
+        old_route = fleet.routes[slot]
+        use_drone = fleet.types[slot] == "Drone"
+        coords = np.asarray(old_route, dtype=np.float64)
+        plan.drop_empty_tour()
+
+        path = [np.asarray([plan.nodes[0]], dtype=np.float64)]
+        stop_index = []
+        for k, (start, end) in enumerate(zip(plan.nodes[:-1], plan.nodes[1:])):
+            a, b = plan.waypoints[k], plan.waypoints[k + 1]
+            if a is not None and b is not None:
+                leg = coords[a:b + 1]           # Unchanged leg: its geometry is reused
+            else:
+                if use_drone:
+                    leg = RouteManager.create_drone_route(start[0], start[1], end[0], end[1])
+                else:
+                    # Routed for the traffic of the hour the order comes in
+                    leg = RouteManager.get_road_route(start[0], start[1], end[0], end[1],
+                                                      depart_s=engine.clock.sim_time)
+                leg = np.asarray(leg or [start, end], dtype=np.float64)
+                # ENFORCE: every leg starts and ends exactly on its nodes
+                leg[0], leg[-1] = start, end
+            path.append(leg[1:])
+            if not plan.depots[k + 1]:
+                stop_index.append(sum(len(piece) for piece in path) - 1)
+        route = MultiStopRoute(np.concatenate(path), stop_index)
+
+        stops = [node for node, depot in zip(plan.nodes, plan.depots) if not depot]
+        tours = [[]]
+        for node, depot in zip(plan.nodes[1:-1], plan.depots[1:-1]):
+            if depot:
+                tours.append([])
+            else:
+                tours[-1].append(node)
+        extras = {
+            "assigned_delivery": stops[0],
+            "stops": stops,
+            "tours": tours,
+            "tour_loads": plan.loads,
+            "load_kg": max(plan.loads)
+        }
+
+        if plan.fresh:
+            spec = dict(fleet.extras[slot], type=fleet.types[slot], speed=fleet.speed[slot],
+                        weight=fleet.weight[slot], **extras)
+            spec.pop("tandem", None)    # The new trip carries no drones
+            profile = battery_profile(spec)
+            # Leave once the pack from the last trip is topped up
+            used_kwh = fleet.drain_kwh[slot] * (fleet.total_km[slot] - old_route.depot_km[-1])
+            _, minutes = top_up(fleet.types[slot], used_kwh)
+            now = engine.clock.sim_time
+            depart_s = max(now, engine.return_s.get(name, now) + minutes * 60.0)
+            # The battery is checked against the trip as traffic will time it
+            timed = RouteManager.timed_route(route, spec["type"], spec["speed"], depart_s)
+            if _runs_flat(timed, spec["type"], spec["speed"], profile["battery_kwh"], profile["kwh_per_km"]):
+                self.backlog.extend(plan.orders)
+                return False
+            engine.add_vehicle(name, spec, route, depart_s=False)
+            engine.depart_s[name] = depart_s
+            engine.schedule_departure(name, depart_s)
+        else:
+            # Road legs can run longer than their straight-line estimate, and traffic changes the draw
+            timed = route
+            if isinstance(old_route, TimedRoute):
+                timed = RouteManager.timed_route(route, fleet.types[slot], fleet.speed[slot], old_route.depart_s)
+            if _runs_flat(timed, fleet.types[slot], fleet.speed[slot],
+                          fleet.battery_kwh[slot], fleet.kwh_per_km[slot]):
+                self.backlog.extend(plan.orders)
+                return False
+            engine.reroute(name, route, extras)
+
+        self.inserted += len(plan.orders)
+        return True
+
+    def summary(self):
+        """Order counts so far: received, inserted, waiting in the backlog and dropped from it"""
+        return {"received": self.received, "inserted": self.inserted, "backlog": len(self.backlog),
+                "dropped": self.dropped}
+
+
+def replay_orders(dispatcher, orders):
+    """
+    Headless intake: run the engine to each batch's arrival time and insert it
+    Orders without a "time_s" arrive when the one before them did; None
+    heartbeats are skipped. Once the stream ends the backlog is retried every
+    retry_s of simulated time until it is empty or no vehicle can take it.
+    """
+    engine = dispatcher.engine
+    window_s = ORDER_STREAM_CONFIG["batch_ms"] / 1000.0
+    batch, batch_s = [], 0.0
+    for order in orders:
+        if order is None:
+            continue
+        time_s = order.get("time_s", batch_s)
+        if batch and time_s > batch_s + window_s:
+            engine.run_to(batch_s + window_s)
+            dispatcher.submit(batch)
+            batch = []
+        if not batch:
+            batch_s = max(time_s, engine.clock.sim_time)
+        batch.append(order)
+    if batch:
+        engine.run_to(batch_s + window_s)
+        dispatcher.submit(batch)
+
+    while dispatcher.backlog:
+        if engine.finished:
+            if not dispatcher.submit([]):
+                break
+        else:
+            engine.run_to(engine.clock.sim_time + ORDER_STREAM_CONFIG["retry_s"])
+            dispatcher.submit([])
+    return dispatcher.summary()
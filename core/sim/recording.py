@@ -0,0 +1,232 @@
+"""
+Binary simulation recording and replay
+
+A recording is one file: a fixed header, then one fixed-size frame per
+frame_interval_s of simulated time, then a JSON trailer with vehicle names,
+types and the discrete event log. Frames hold every vehicle slot's position
+quantised to uint16 within the recording's bounding box (about 1 m at city
+scale), so frame k sits at a known offset and replay can seek to any time
+in O(1) through a read-only memory map.
+
+1000 vehicles at 2 frames per simulated second for an 8-hour shift is
+57,600 frames of 4 kB, about 230 MB.
+"""
+import bisect
+import json
+import os
+import struct
+
+import numpy as np
+
+from config.app_config import RECORDING_CONFIG
+from core import geodesy
+
+MAGIC = b"DTSIMREC"
+VERSION = 1
+# magic, version, capacity, frame interval, start time, lat min/max, lon min/max, frame count, trailer offset
+HEADER = struct.Struct("<8sIIddddddQQ")
+ABSENT = 0xFFFF             # Slot not yet in the fleet
+SCALE = ABSENT - 1          # Largest quantised coordinate
+
+
+def bounds_around(center, radius_km):
+    """(lat_min, lat_max, lon_min, lon_max) of a box radius_km around center"""
+    lats, lons = geodesy.destination_point(center[0], center[1], [0.0, 90.0, 180.0, 270.0], radius_km)
+    return float(lats.min()), float(lats.max()), float(lons.min()), float(lons.max())
+
+
+def bounds_of(points, margin_km):
+    """(lat_min, lat_max, lon_min, lon_max) of a box covering points plus margin_km on every side"""
+    points = np.asarray(points, dtype=np.float64)
+    corners = np.array([points.min(axis=0), points.max(axis=0)])
+    lats, _ = geodesy.destination_point(corners[:, 0], corners[:, 1], [180.0, 0.0], margin_km)
+    _, lons = geodesy.destination_point(corners[:, 0], corners[:, 1], [270.0, 90.0], margin_km)
+    return float(lats[0]), float(lats[1]), float(lons[0]), float(lons[1])
+
+
+class SimulationRecorder:
+    """
+    Appends position frames and events while a simulation runs
+    The engine calls append() once per frame interval of simulated time, so a
+    frame's time is implied by its index and never stored.
+    """
+
+    def __init__(self, path, capacity, bounds, frame_interval_s=None, start_s=0.0):
+        self.path = path
+        self.capacity = capacity
+        self.bounds = bounds
+        self.frame_interval_s = frame_interval_s or RECORDING_CONFIG["frame_interval_s"]
+        self.start_s = start_s
+        self.frame_count = 0
+        self.events = []
+
+        lat_min, lat_max, lon_min, lon_max = bounds
+        self.origin = np.array([lat_min, lon_min])
+        self.span = np.array([lat_max - lat_min, lon_max - lon_min])
+        self.frame = np.full((capacity, 2), ABSENT, dtype=np.uint16)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "wb")
+        self._write_header(0)
+
+    @property
+    def next_time(self):
+        """Simulated time of the next frame to be written"""
+        return self.start_s + self.frame_count * self.frame_interval_s
+
+    @property
+    def frame_bytes(self):
+        return self.frame.nbytes
+
+    def _write_header(self, trailer_offset):
+        lat_min, lat_max, lon_min, lon_max = self.bounds
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.capacity, self.frame_interval_s, self.start_s,
+                                    lat_min, lat_max, lon_min, lon_max, self.frame_count, trailer_offset))
+
+    def append(self, positions):
+        """Write one frame from an (n, 2) array of [lat, lon]; slots past n are marked absent"""
+        count = min(len(positions), self.capacity)
+        scaled = np.clip((np.asarray(positions[:count]) - self.origin) / self.span, 0.0, 1.0)
+        self.frame[:count] = np.rint(scaled * SCALE)
+        self.frame[count:] = ABSENT
+        self.file.write(self.frame.tobytes())
+        self.frame_count += 1
+
+    def add_event(self, event):
+        self.events.append(event)
+
+    def close(self, fleet=None, metadata=None):
+        """Write the trailer and final header; fleet supplies vehicle names and types"""
+        if self.file.closed:
+            return
+        self.file.seek(HEADER.size + self.frame_count * self.frame_bytes)
+        trailer_offset = self.file.tell()
+        self.file.write(json.dumps({
+            "names": list(fleet.names) if fleet is not None else [],
+            "types": list(fleet.types) if fleet is not None else [],
+            "speeds": fleet.speed[:len(fleet)].tolist() if fleet is not None else [],
+            "weights": fleet.weight[:len(fleet)].tolist() if fleet is not None else [],
+            "events": self.events,
+            "metadata": metadata or {}
+        }, default=str).encode("utf-8"))
+        self._write_header(trailer_offset)
+        self.file.close()
+        size_mb = (trailer_offset - HEADER.size) / 1e6
+        print(f"Recording saved to {self.path}: {self.frame_count} frames, {size_mb:.1f} MB")
+
+
+class SimulationReplay:
+    """
+    Read-only view of a recording with O(1) seeking
+    A recording cut short (no trailer) still replays: its frame count is
+    recovered from the file size, only names and events are missing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            (magic, version, self.capacity, self.frame_interval_s, self.start_s,
+             lat_min, lat_max, lon_min, lon_max, frame_count, trailer_offset) = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a simulation recording")
+
+            frame_bytes = self.capacity * 2 * 2
+            if trailer_offset:
+                f.seek(trailer_offset)
+                trailer = json.loads(f.read().decode("utf-8"))
+            else:
+                frame_count = (os.path.getsize(path) - HEADER.size) // frame_bytes
+                trailer = {}
+
+        self.frame_count = frame_count
+        self.origin = np.array([lat_min, lon_min])
+        self.span = np.array([lat_max - lat_min, lon_max - lon_min])
+        self.names = trailer.get("names") or [f"Vehicle {i + 1}" for i in range(self.capacity)]
+        self.types = trailer.get("types") or ["Drone"] * len(self.names)
+        self.speeds = trailer.get("speeds") or [0] * len(self.names)
+        self.weights = trailer.get("weights") or [0] * len(self.names)
+        self.events = trailer.get("events", [])
+        self.event_times = [event["time_s"] for event in self.events]
+        self.metadata = trailer.get("metadata", {})
+        self.frames = np.memmap(path, dtype=np.uint16, mode="r", offset=HEADER.size,
+                                shape=(frame_count, self.capacity, 2)) if frame_count else None
+
+    @property
+    def end_s(self):
+        return self.start_s + max(self.frame_count - 1, 0) * self.frame_interval_s
+
+    def frame_index(self, time_s):
+        """Index of the frame showing time_s, clamped to the recording"""
+        index = int((time_s - self.start_s) // self.frame_interval_s)
+        return min(max(index, 0), max(self.frame_count - 1, 0))
+
+    def frame_time(self, index):
+        return self.start_s + index * self.frame_interval_s
+
+    def positions_at(self, time_s):
+        """(positions, present) for time_s: [lat, lon] per slot and which slots were in the fleet"""
+        if self.frames is None:
+            return np.zeros((0, 2)), np.zeros(0, dtype=bool)
+        frame = self.frames[self.frame_index(time_s)]
+        present = frame[:, 0] != ABSENT
+        return self.origin + frame / SCALE * self.span, present
+
+    def events_between(self, start_s, end_s):
+        """Events with start_s < time_s <= end_s"""
+        lo = bisect.bisect_right(self.event_times, start_s)
+        hi = bisect.bisect_right(self.event_times, end_s)
+        return self.events[lo:hi]
+
+
+class MergedReplay(SimulationReplay):
+    """
+    Several recordings played as one, e.g. the shards of a multi-depot run
+    Recordings must share a start time and frame interval; one that ends
+    early keeps showing its last frame. Vehicle names get their recording's
+    label as a prefix so they stay unique on the map.
+    """
+
+    def __init__(self, paths, labels=None):
+        self.replays = [SimulationReplay(path) for path in paths]
+        if not self.replays:
+            raise ValueError("No recordings to merge")
+        first = self.replays[0]
+        for replay in self.replays[1:]:
+            if replay.start_s != first.start_s or replay.frame_interval_s != first.frame_interval_s:
+                raise ValueError(f"{replay.path} does not line up with {first.path}")
+
+        self.path = os.path.dirname(first.path) or first.path
+        self.start_s = first.start_s
+        self.frame_interval_s = first.frame_interval_s
+        self.frame_count = max(replay.frame_count for replay in self.replays)
+        self.labels = labels or [os.path.splitext(os.path.basename(path))[0] for path in paths]
+
+        # Only slots with a named vehicle are kept, so the merged slots line up with names
+        self.counts = [min(len(replay.names), replay.capacity) for replay in self.replays]
+        self.names, self.types, self.speeds, self.weights, self.events = [], [], [], [], []
+        for label, replay, count in zip(self.labels, self.replays, self.counts):
+            self.names.extend(f"{label} {name}" for name in replay.names[:count])
+            self.types.extend(replay.types[:count])
+            self.speeds.extend(replay.speeds[:count])
+            self.weights.extend(replay.weights[:count])
+            self.events.extend(
+                {**event, "vehicle": f"{label} {event['vehicle']}" if event.get("vehicle") else None, "depot": label}
+                for event in replay.events
+            )
+        self.events.sort(key=lambda event: event["time_s"])
+        self.event_times = [event["time_s"] for event in self.events]
+        self.metadata = {label: replay.metadata for label, replay in zip(self.labels, self.replays)}
+
+    def positions_at(self, time_s):
+        positions, present = [], []
+        for replay, count in zip(self.replays, self.counts):
+            shard_positions, shard_present = replay.positions_at(time_s)
+            if len(shard_positions) < count:
+                shard_positions, shard_present = np.zeros((count, 2)), np.zeros(count, dtype=bool)
+            positions.append(shard_positions[:count])
+            present.append(shard_present[:count])
+        return np.concatenate(positions), np.concatenate(present)
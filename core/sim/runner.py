@@ -0,0 +1,137 @@
+"""
+Headless scenario runner: depot, customers and fleet mix in, KPIs out
+"""
+import random
+import time
+
+from config.app_config import (ROUTE_BUILD_CONFIG, SIMULATION_CONFIG, RECORDING_CONFIG, MULTI_STOP_CONFIG,
+                               DELIVERY_DISTANCE_MAX)
+from core.api_handler import RouteManager
+from core.sim import scenario
+from core.sim.events import EventDrivenEngine, create_engine
+from core.sim.orders import OrderDispatcher, open_order_source, replay_orders
+from core.sim.recording import SimulationRecorder, bounds_around, bounds_of
+from core.sim.waves import WavePlan, plan_waves
+
+
+def run_scenario(depot, customers, electric_trucks=2, fuel_trucks=1, drones=3,
+                 seed=None, step_seconds=None, max_workers=None, mode=None, waves=None, record=None,
+                 deliveries=None, multi_stop=None, orders=None):
+    """
+    Generate customers, allocate the fleet, build routes and run the delivery
+    cycle as fast as possible in the given engine mode ("step" or "event").
+    With waves (a DEFAULT_WAVES-style list) every customer is served, the
+    fleet being re-dispatched wave after wave; this needs the event engine.
+    With record set to a path, position frames and events are recorded there.
+    deliveries, when given, are the customer points (customers is then their count).
+    Without waves, trucks run Clarke-Wright multi-stop tours unless multi_stop
+    is False (default: MULTI_STOP_CONFIG["enabled"]).
+    orders, a file or "generate:rate:count" source spec, streams extra orders
+    into the running routes at their arrival times (see core.sim.orders).
+    Returns (KPI dict, engine).
+    """
+    fleet_mix = {"Drone": drones, "Electric Truck": electric_trucks, "Fuel Truck": fuel_trucks}
+    if deliveries is not None:
+        customers = len(deliveries)
+    engine = create_engine(mode)
+    if record:
+        if deliveries:
+            bounds = bounds_of([depot] + list(deliveries), RECORDING_CONFIG["margin_km"])
+        else:
+            bounds = bounds_around(depot, DELIVERY_DISTANCE_MAX + RECORDING_CONFIG["margin_km"])
+        engine.recorder = SimulationRecorder(record, sum(fleet_mix.values()), bounds)
+
+    if waves is not None:
+        kpis = _run_waves(engine, depot, customers, fleet_mix, waves, seed, max_workers, deliveries, orders)
+    else:
+        if multi_stop is None:
+            multi_stop = MULTI_STOP_CONFIG["enabled"]
+        kpis = _run_single(engine, depot, customers, fleet_mix, seed, step_seconds, max_workers, deliveries,
+                           multi_stop, orders)
+
+    if engine.recorder is not None:
+        engine.recorder.close(engine.fleet, {"kpis": kpis})
+    return kpis, engine
+
+
+def _run_single(engine, depot, customers, fleet_mix, seed, step_seconds, max_workers, deliveries=None,
+                multi_stop=False, orders=None):
+    rng = random.Random(seed)
+    if multi_stop:
+        if deliveries is None:
+            deliveries = scenario.generate_delivery_points(depot, customers, rng)
+        specs = scenario.plan_multi_stop(depot, deliveries, fleet_mix, rng)
+    else:
+        specs = scenario.plan_scenario(depot, customers, fleet_mix, rng, deliveries=deliveries)
+
+    started = time.perf_counter()
+    routes = RouteManager.build_routes_parallel(
+        scenario.route_jobs(depot, specs),
+        max_workers=max_workers or ROUTE_BUILD_CONFIG["max_workers"],
+        depart_s=engine.clock.sim_time
+    )
+    route_build_seconds = time.perf_counter() - started
+
+    for name, spec in specs.items():
+        if name in routes:
+            engine.add_vehicle(name, spec, routes[name])
+
+    engine.clock.max_step_seconds = step_seconds or SIMULATION_CONFIG["max_step_seconds"]
+    received = _take_orders(engine, depot, orders, rng)
+    kpis = engine.run_to_completion()
+    return _finish(kpis, depot, customers, fleet_mix, seed, route_build_seconds, received)
+
+
+def _run_waves(engine, depot, customers, fleet_mix, waves, seed, max_workers, deliveries=None, orders=None):
+    if not isinstance(engine, EventDrivenEngine):
+        raise ValueError("Wave dispatch needs the event engine (mode='event')")
+
+    rng = random.Random(seed)
+    if deliveries is None:
+        deliveries = scenario.generate_delivery_points(depot, customers, rng)
+    plan = WavePlan(plan_waves(deliveries, fleet_mix, waves, rng, depot))
+
+    # Each wave is routed when it is released, for the traffic at that hour
+    build_seconds = []
+
+    def route_wave(wave, time_s):
+        jobs = [job for job in plan.route_jobs(depot, wave) if job[0] not in plan.routes]
+        started = time.perf_counter()
+        routes = RouteManager.build_routes_parallel(
+            jobs, max_workers=max_workers or ROUTE_BUILD_CONFIG["max_workers"], depart_s=time_s
+        )
+        build_seconds.append(time.perf_counter() - started)
+        for (k, name), route in routes.items():
+            plan.set_route(k, name, route)
+        plan.drop_unrouted(wave)
+
+    engine.wave_router = route_wave
+    engine.set_waves(plan)
+
+    received = _take_orders(engine, depot, orders, rng)
+    kpis = engine.run_to_completion()
+    kpis["wall_seconds"] -= sum(build_seconds)     # Routing happened inside the run
+    return _finish(kpis, depot, customers, fleet_mix, seed, sum(build_seconds), received)
+
+
+def _take_orders(engine, depot, orders, rng):
+    """Stream the orders source into the running fleet; returns the order counts (None without a source)"""
+    if not orders:
+        return None
+    dispatcher = OrderDispatcher(engine, depot)
+    return replay_orders(dispatcher, open_order_source(orders, depot, rng, realtime=False, follow=False))
+
+
+def _finish(kpis, depot, customers, fleet_mix, seed, route_build_seconds, orders=None):
+    if orders is not None:
+        kpis["orders"] = orders
+        customers += orders["received"]
+    kpis.update({
+        "depot": list(depot),
+        "customers": customers,
+        "unserved_customers": customers - kpis["deliveries"],
+        "fleet_mix": fleet_mix,
+        "seed": seed,
+        "route_build_seconds": route_build_seconds
+    })
+    return kpis
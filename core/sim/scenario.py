@@ -0,0 +1,412 @@
+"""
+Scenario set-up shared by the GUI and the headless runner
+
+Every function takes an optional random source so runs can be seeded;
+the module-level random functions are used when none is given.
+"""
+import random
+import time
+
+import numpy as np
+
+from config.app_config import (VEHICLE_SPEEDS, VEHICLE_WEIGHTS, VEHICLE_CHARACTERISTICS, DELIVERY_DISTANCE_MIN,
+                               DELIVERY_DISTANCE_MAX, ASSIGNMENT_CONFIG, MULTI_STOP_CONFIG)
+from core import geodesy
+from core.api_handler import RouteManager
+from core.assignment import assign
+from core.feasibility import vehicle_range_km, feasibility_mask
+from core.savings import clarke_wright, tour_km, assign_tours
+from core.local_search import LocalSearch
+from core.tandem import split_tour
+
+# Order in which vehicle types take delivery assignments
+FLEET_ORDER = ("Drone", "Electric Truck", "Fuel Truck")
+
+
+def generate_delivery_points(depot, customer_count, rng=random):
+    """Customer points in a rough circle around the depot, as [[lat, lon], ...]"""
+    angles = []
+    distances_km = []
+
+    for i in range(customer_count):
+        angles.append((i * (360 / customer_count)) + rng.uniform(-20, 20))
+        distances_km.append(rng.uniform(DELIVERY_DISTANCE_MIN, DELIVERY_DISTANCE_MAX))
+
+    # Project every bearing/distance pair onto the sphere at once
+    lats, lons = geodesy.destination_point(depot[0], depot[1], angles, distances_km)
+    return np.column_stack((lats, lons)).tolist()
+
+
+def allocate_deliveries(depot, deliveries, total_vehicles, rng=random):
+    """
+    One delivery per vehicle: the closest points when vehicles are short,
+    otherwise every point once plus extra vehicles spread round-robin
+    """
+    if total_vehicles < len(deliveries):
+        print(f"WARNING: You have {len(deliveries)} delivery points but only {total_vehicles} vehicles!")
+        print(f"Only {total_vehicles} delivery points will be assigned vehicles.")
+        print(f"{len(deliveries) - total_vehicles} delivery points will remain unassigned.")
+
+        # Select the closest delivery points to the depot for assignment
+        distance_km, _ = RouteManager.matrix([depot], deliveries)
+        closest = np.argsort(distance_km[0], kind="stable")[:total_vehicles]
+        allocated = [deliveries[i] for i in closest]
+
+        print(f"Selected {len(allocated)} closest delivery points for vehicle assignment.")
+        return allocated
+
+    allocated = list(deliveries)
+
+    # If we have extra vehicles, distribute them among delivery points
+    remaining_vehicles = total_vehicles - len(deliveries)
+    if remaining_vehicles > 0 and deliveries:
+        print(f"Distributing {remaining_vehicles} extra vehicles among {len(deliveries)} delivery points.")
+        for i in range(remaining_vehicles):
+            allocated.append(deliveries[i % len(deliveries)])
+
+    # Shuffle to distribute vehicle types evenly
+    rng.shuffle(allocated)
+    return allocated
+
+
+def assign_vehicles(allocated, fleet_mix, rng=random):
+    """
+    Vehicle specs keyed by name ("Drone 1", ...) for a fleet mix such as
+    {"Drone": 3, "Electric Truck": 2, "Fuel Truck": 1}
+    """
+    specs = {}
+    vehicle_count = 0
+
+    for vehicle_type in FLEET_ORDER:
+        for i in range(fleet_mix.get(vehicle_type, 0)):
+            if vehicle_count >= len(allocated):
+                break
+
+            specs[f"{vehicle_type} {i+1}"] = {
+                "type": vehicle_type,
+                "speed": VEHICLE_SPEEDS[vehicle_type],
+                "weight": rng.randint(*VEHICLE_WEIGHTS[vehicle_type]),
+                "assigned_delivery": allocated[vehicle_count]
+            }
+            vehicle_count += 1
+
+    return specs
+
+
+def draw_parcels(deliveries, rng=random):
+    """A parcel weight (kg) per delivery, drawn from MULTI_STOP_CONFIG["parcel_weight_kg"]"""
+    low, high = MULTI_STOP_CONFIG["parcel_weight_kg"]
+    return [rng.uniform(low, high) for _ in deliveries]
+
+
+def round_trip_km(depot, deliveries, vehicle_types):
+    """
+    (vehicles, deliveries) km of each vehicle's depot -> delivery -> depot trip
+    Trucks go by road, drones by air. Vehicles of one type share a row, so
+    there is one matrix query per type and direction.
+    """
+    rows = {}
+    for vehicle_type in set(vehicle_types):
+        out_km, _ = RouteManager.matrix([depot], deliveries, vehicle_type)
+        back_km, _ = RouteManager.matrix(deliveries, [depot], vehicle_type)
+        rows[vehicle_type] = out_km[0] + back_km[:, 0]
+    return np.array([rows[vehicle_type] for vehicle_type in vehicle_types]).reshape(len(vehicle_types), len(deliveries))
+
+
+def feasible_pairs(depot, deliveries, vehicle_types, payloads, parcels):
+    """
+    (mask, trip_km) for every vehicle-delivery pair (core.feasibility)
+    A vehicle can serve a delivery when the parcel fits its payload and the
+    round trip is within its type's range carrying that parcel.
+    """
+    trip_km = round_trip_km(depot, deliveries, vehicle_types)
+    ranges = [vehicle_range_km(vehicle_type, parcels) for vehicle_type in vehicle_types]
+    return feasibility_mask(payloads, ranges, parcels, trip_km), trip_km
+
+
+def drop_infeasible(depot, specs, rng=random):
+    """Specs whose vehicle can carry its delivery's parcel there and back; the rest are reported and dropped"""
+    names = list(specs)
+    if not names:
+        return specs
+    parcels = draw_parcels(names, rng)
+    mask, _ = feasible_pairs(depot, [specs[name]["assigned_delivery"] for name in names],
+                             [specs[name]["type"] for name in names], [specs[name]["weight"] for name in names],
+                             parcels)
+    kept = {}
+    for k, name in enumerate(names):
+        if mask[k, k]:
+            kept[name] = dict(specs[name], load_kg=parcels[k])
+        else:
+            print(f"WARNING: {name} cannot carry a {parcels[k]:.1f} kg parcel to its delivery point and back; "
+                  f"it stays at the depot.")
+    return kept
+
+
+def assign_optimal(depot, deliveries, fleet_mix, rng=random, objective=None):
+    """
+    Vehicle specs with deliveries handed out optimally (core.assignment.assign)
+    objective is "makespan" or "total" (default: ASSIGNMENT_CONFIG). Every
+    vehicle gets at most one delivery and every delivery at most one vehicle;
+    vehicles left over stay at the depot.
+    """
+    objective = objective or ASSIGNMENT_CONFIG["objective"]
+    parcels = draw_parcels(deliveries, rng)
+    names, types = [], []
+    for vehicle_type in FLEET_ORDER:
+        for i in range(fleet_mix.get(vehicle_type, 0)):
+            names.append(f"{vehicle_type} {i+1}")
+            types.append(vehicle_type)
+    weights = [rng.randint(*VEHICLE_WEIGHTS[vehicle_type]) for vehicle_type in types]
+    if not names or not deliveries:
+        return {}
+
+    started = time.perf_counter()
+    # Pairs that break payload or range cost infinity, so the solver never picks them
+    mask, trip_km = feasible_pairs(depot, deliveries, types, weights, parcels)
+    speeds = np.array([VEHICLE_SPEEDS[vehicle_type] for vehicle_type in types], dtype=np.float64)
+    cost = np.where(mask, trip_km / speeds[:, None], np.inf)
+    rows, cols = assign(cost, objective)
+    print(f"Optimal assignment ({objective}): {len(rows)} of {len(names)} vehicles to {len(deliveries)} deliveries, "
+          f"longest trip {cost[rows, cols].max(initial=0.0):.2f} h, total {cost[rows, cols].sum():.2f} h "
+          f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+    unservable = int((~mask.any(axis=0)).sum())
+    if unservable:
+        print(f"WARNING: {unservable} of {len(deliveries)} delivery points fit no vehicle's payload or range.")
+    if len(rows) < len(deliveries):
+        print(f"WARNING: {len(deliveries) - len(rows)} of {len(deliveries)} delivery points will remain unassigned.")
+
+    return {
+        names[v]: {
+            "type": types[v],
+            "speed": VEHICLE_SPEEDS[types[v]],
+            "weight": weights[v],
+            "assigned_delivery": deliveries[c],
+            "load_kg": parcels[c]
+        }
+        for v, c in zip(rows.tolist(), cols.tolist())
+    }
+
+
+def allocate_fleet(depot, deliveries, fleet_mix, rng=random, objective=None):
+    """
+    One delivery per vehicle: optimal assignment, or with objective "shuffle"
+    the legacy allocate_deliveries + assign_vehicles hand-out in random order
+    (minus the pairs that break payload or range)
+    """
+    objective = objective or ASSIGNMENT_CONFIG["objective"]
+    if objective == "shuffle":
+        allocated = allocate_deliveries(depot, deliveries, sum(fleet_mix.values()), rng)
+        return drop_infeasible(depot, assign_vehicles(allocated, fleet_mix, rng), rng)
+    return assign_optimal(depot, deliveries, fleet_mix, rng, objective)
+
+
+def plan_multi_stop(depot, deliveries, fleet_mix, rng=random, improve_seconds=None, on_improvement=None,
+                    should_stop=None, tandem=None):
+    """
+    Vehicle specs serving every customer the fleet can carry
+    Each customer gets a parcel weight. Drones fly one parcel each, taking the
+    customers farthest from the depot by road whose parcel fits their payload
+    and whose round trip is within range; trucks serve everyone else on
+    Clarke-Wright tours loaded up to their payload, running them back to back.
+    The tours are then improved by local search for improve_seconds (default
+    MULTI_STOP_CONFIG), and on_improvement(tours, km) receives each better set
+    of tours as lists of [lat, lon] stops.
+    With tandem (default MULTI_STOP_CONFIG["tandem"]) the drones ride the
+    trucks instead and take customers off their tours as sorties (plan_tandem).
+    """
+    parcels = draw_parcels(deliveries, rng)
+    payloads = {}
+    for vehicle_type in FLEET_ORDER:
+        for i in range(fleet_mix.get(vehicle_type, 0)):
+            payloads[f"{vehicle_type} {i+1}"] = (vehicle_type, rng.randint(*VEHICLE_WEIGHTS[vehicle_type]))
+    if not deliveries:
+        return {}
+
+    points = [depot] + list(deliveries)
+    road_km, _ = RouteManager.matrix(points, points, "Electric Truck")
+    # Which vehicle could serve each customer on its own; trucks' tours are then built from the customers
+    # some truck can reach and carry for, so no tour holds a stop its truck could never make
+    rows = {name: k for k, name in enumerate(payloads)}
+    mask, _ = feasible_pairs(depot, deliveries, [vehicle_type for vehicle_type, _ in payloads.values()],
+                             [payload for _, payload in payloads.values()], parcels)
+
+    tandem = MULTI_STOP_CONFIG["tandem"] if tandem is None else tandem
+    drones = [(name, payload) for name, (vehicle_type, payload) in payloads.items() if vehicle_type == "Drone"]
+    tandem = bool(tandem and drones and len(drones) < len(payloads))
+
+    specs = {}
+    remaining = set(range(len(deliveries)))
+    by_road = np.argsort(-road_km[0, 1:], kind="stable").tolist()
+    for name, (vehicle_type, payload) in payloads.items():
+        if vehicle_type != "Drone" or tandem:
+            continue
+        for c in by_road:
+            if c in remaining and mask[rows[name], c]:
+                remaining.discard(c)
+                specs[name] = {
+                    "type": vehicle_type,
+                    "speed": VEHICLE_SPEEDS[vehicle_type],
+                    "weight": payload,
+                    "assigned_delivery": deliveries[c],
+                    "load_kg": parcels[c]
+                }
+                break
+
+    trucks = [(name, vehicle_type, payload) for name, (vehicle_type, payload) in payloads.items()
+              if vehicle_type != "Drone"]
+    by_truck = mask[[rows[name] for name, _, _ in trucks]].any(axis=0)
+    customers = [c for c in sorted(remaining) if by_truck[c]]
+    if trucks and customers:
+        index = [0] + [c + 1 for c in customers]
+        distance = road_km[np.ix_(index, index)]
+        demands = [parcels[c] for c in customers]
+        # Tours sized for the smallest truck, so any truck can take any tour and the work balances
+        capacity = min(payload for _, _, payload in trucks)
+        tours = clarke_wright(distance, demands, capacity)
+
+        improve_seconds = MULTI_STOP_CONFIG["improve_seconds"] if improve_seconds is None else improve_seconds
+        if improve_seconds > 0 and tours:
+            search = LocalSearch(distance, demands, capacity, tours, MULTI_STOP_CONFIG["neighbours"],
+                                 random.Random(rng.random()))
+            initial_km = search.cost
+            report = None
+            if on_improvement is not None:
+                def report(improved, km):
+                    on_improvement([[deliveries[customers[c]] for c in tour] for tour in improved], km)
+            tours = search.improve(improve_seconds, report, MULTI_STOP_CONFIG["report_interval_s"],
+                                   should_stop=should_stop)
+            print(f"Local search: {initial_km:.1f} -> {search.cost:.1f} km in {search.seconds:.2f} s "
+                  f"({search.moves} moves, {search.rounds} restarts)")
+        lengths = [tour_km(distance, tour) for tour in tours]
+        loads = [sum(demands[c] for c in tour) for tour in tours]
+
+        capacities = [payload for _, _, payload in trucks]
+        for (name, vehicle_type, payload), tour_ids in zip(trucks, assign_tours(lengths, loads, capacities)):
+            if not tour_ids:
+                continue
+            truck_tours = [[deliveries[customers[c]] for c in tours[t]] for t in tour_ids]
+            for t in tour_ids:
+                remaining.difference_update(customers[c] for c in tours[t])
+            stops = [stop for tour in truck_tours for stop in tour]
+            specs[name] = {
+                "type": vehicle_type,
+                "speed": VEHICLE_SPEEDS[vehicle_type],
+                "weight": payload,
+                "assigned_delivery": stops[0],
+                "stops": stops,
+                "tours": truck_tours,
+                "tour_loads": [loads[t] for t in tour_ids],
+                "load_kg": max(loads[t] for t in tour_ids)
+            }
+            print(f"{name}: {len(truck_tours)} tours, {len(stops)} stops, "
+                  f"{sum(lengths[t] for t in tour_ids):.1f} km, heaviest load {specs[name]['load_kg']:.0f}/{payload} kg")
+
+    if tandem:
+        plan_tandem(depot, deliveries, parcels, road_km, specs, drones)
+    if remaining:
+        print(f"WARNING: {len(remaining)} of {len(deliveries)} delivery points fit no vehicle's payload or range "
+              f"and will remain unassigned.")
+    return specs
+
+
+def plan_tandem(depot, deliveries, parcels, road_km, specs, drones):
+    """
+    Put drones on the planned trucks and move truck customers onto drone sorties
+    Drones are shared out one at a time, busiest truck first. Each truck tour
+    is then split (core.tandem.split_tour) using the customers whose parcel
+    fits a drone on that truck. Truck specs get a "tandem" plan for
+    RouteManager.build_tandem_routes; drones that fly at least one sortie get
+    a spec with their "carrier" truck.
+    """
+    trucks = [name for name, spec in specs.items() if "tours" in spec]
+    if not trucks:
+        return
+    index = {tuple(point): c for c, point in enumerate(deliveries)}
+    points = [depot] + list(deliveries)
+    air_km, _ = RouteManager.matrix(points, points, "Drone")
+    drone_speed = VEHICLE_SPEEDS["Drone"]
+    drone_hours = air_km / drone_speed
+    endurance_hours = float(vehicle_range_km("Drone")) / drone_speed
+    launch_hours = MULTI_STOP_CONFIG["launch_minutes"] / 60.0
+    recover_hours = MULTI_STOP_CONFIG["recover_minutes"] / 60.0
+
+    def truck_hours(name):
+        spec = specs[name]
+        return sum(tour_km(road_km, [index[tuple(stop)] for stop in tour]) for tour in spec["tours"]) / spec["speed"]
+
+    carried = {name: [] for name in trucks}
+    busiest = sorted(trucks, key=truck_hours, reverse=True)
+    for k, drone in enumerate(drones):
+        carried[busiest[k % len(trucks)]].append(drone)
+
+    for truck in trucks:
+        aboard = carried[truck]
+        if not aboard:
+            continue
+        spec = specs[truck]
+        before, after = 0.0, 0.0
+        capable = np.array(parcels)[:, None] <= np.array([weight for _, weight in aboard])[None, :]
+        hours_by_road = road_km / spec["speed"]
+        tours, flown = [], {name: [] for name, _ in aboard}
+        for tour in spec["tours"]:
+            customers = [index[tuple(stop)] for stop in tour]
+            before += tour_km(road_km, customers) / spec["speed"]
+            kept, sorties, hours = split_tour(hours_by_road, drone_hours, customers, capable, endurance_hours,
+                                              launch_hours, recover_hours)
+            after += hours
+            tours.append({
+                "stops": [deliveries[c] for c in kept],
+                "sorties": [[a, deliveries[c], b, aboard[u][0]] for a, c, b, u in sorties]
+            })
+            for _, c, _, u in sorties:
+                flown[aboard[u][0]].append(deliveries[c])
+
+        stops = [stop for tour in tours for stop in tour["stops"]]
+        spec.update({
+            "assigned_delivery": (stops or [stop for served in flown.values() for stop in served])[0],
+            "stops": stops,
+            "tours": [tour["stops"] for tour in tours],
+            "tandem": {
+                "truck": truck,
+                "speed": spec["speed"],
+                "drones": [[name, drone_speed] for name, _ in aboard if flown[name]],
+                "launch_hours": launch_hours,
+                "recover_hours": recover_hours,
+                "tours": tours
+            }
+        })
+        for name, weight in aboard:
+            if flown[name]:
+                specs[name] = {
+                    "type": "Drone",
+                    "speed": drone_speed,
+                    "weight": weight,
+                    "assigned_delivery": flown[name][0],
+                    "stops": flown[name],
+                    "carrier": truck
+                }
+        print(f"{truck} + {len(aboard)} drones: {len(stops)} truck stops, "
+              f"{sum(len(served) for served in flown.values())} sorties, {before:.2f} h -> {after:.2f} h")
+
+
+def route_jobs(depot, specs):
+    """(key, depot, delivery or tours, use_drone) jobs for RouteManager.build_routes_parallel"""
+    # Drones riding a truck are routed with it, through the truck's tandem plan
+    return [
+        (name, depot, spec.get("tandem") or spec.get("tours", spec["assigned_delivery"]), spec["type"] == "Drone")
+        for name, spec in specs.items() if "carrier" not in spec
+    ]
+
+
+def plan_scenario(depot, customers, fleet_mix, rng=random, customer_rng=None, deliveries=None, objective=None):
+    """
+    Customers, allocation and vehicle specs for one run
+    customer_rng, when given, draws the customer points separately so they can
+    be held fixed while allocations vary; deliveries, when given, are used as
+    the customer points instead of generating them. objective picks the
+    allocation (allocate_fleet; default: ASSIGNMENT_CONFIG)
+    """
+    if deliveries is None:
+        deliveries = generate_delivery_points(depot, customers, customer_rng or rng)
+    return allocate_fleet(depot, deliveries, fleet_mix, rng, objective)
@@ -0,0 +1,249 @@
+"""
+Checkpoint and restore of a running simulation
+
+A snapshot is one uncompressed .npz file: every route's geometry packed into
+a single coordinate array, the fleet's struct-of-arrays fields as they are,
+and everything else (clock, event queue, wave plan, RNG state and caller
+extras such as UI history) as one JSON document. Saving or loading a fleet
+of thousands of vehicles takes milliseconds, and a restored engine carries
+on exactly where the snapshot was taken.
+"""
+import collections
+import heapq
+import itertools
+import json
+import random
+
+import numpy as np
+
+from core.fleet_state import ArrayRoute, RoundTripRoute, MultiStopRoute, ScheduledRoute, TimedRoute
+from core.sim.events import EventDrivenEngine
+from core.sim.waves import WavePlan
+
+FORMAT_VERSION = 5
+PORTABLE_TYPES = (str, int, float, bool, list, tuple, dict, type(None))
+
+
+class RouteTable:
+    """Distinct routes packed into one buffer; each route is stored once however often it is referenced"""
+
+    def __init__(self):
+        self.ids = {}
+        self.routes = []
+
+    def add(self, route):
+        key = id(route)
+        if key not in self.ids:
+            self.ids[key] = len(self.routes)
+            self.routes.append(route)
+        return self.ids[key]
+
+    def arrays(self):
+        # Round trips only store the outbound leg; the return leg is a view of it
+        geometry = [route.outbound if isinstance(route, RoundTripRoute) else route.coords for route in self.routes]
+        counts = np.array([len(coords) for coords in geometry], dtype=np.int64)
+        stops = [route.stop_index if isinstance(route, MultiStopRoute) else None for route in self.routes]
+        return {
+            "route_coords": np.concatenate(geometry) if geometry else np.zeros((0, 2)),
+            "route_counts": counts,
+            "route_round_trip": np.array([isinstance(route, RoundTripRoute) for route in self.routes], dtype=bool),
+            # Stop waypoints of multi-stop routes; -1 marks a route without stops
+            "route_stop_counts": np.array([-1 if s is None else len(s) for s in stops], dtype=np.int64),
+            "route_stops": np.concatenate([s for s in stops if s is not None] or [np.zeros(0, dtype=np.intp)]),
+            # Timetable progress of scheduled routes; NaN travel_km marks a route without one
+            "route_travel_km": np.array([route.travel_km if isinstance(route, ScheduledRoute) else np.nan
+                                         for route in self.routes]),
+            "route_progress": np.concatenate([route.index.cumulative_km for route in self.routes
+                                              if isinstance(route, ScheduledRoute)] or [np.zeros(0)]),
+            # Departure a traffic-timed route was timed from; NaN for any other route
+            "route_depart_s": np.array([route.depart_s if isinstance(route, TimedRoute) else np.nan
+                                        for route in self.routes])
+        }
+
+    @staticmethod
+    def load(arrays):
+        """Rebuild the route list from arrays()"""
+        coords = arrays["route_coords"]
+        offsets = np.concatenate(([0], np.cumsum(arrays["route_counts"])))
+        stop_counts = arrays["route_stop_counts"]
+        stop_offsets = np.concatenate(([0], np.cumsum(np.maximum(stop_counts, 0))))
+        travel_km = arrays["route_travel_km"]
+        depart_s = arrays["route_depart_s"]
+        progress = arrays["route_progress"]
+        progress_start = 0
+        routes = []
+        for k, (start, end, round_trip) in enumerate(zip(offsets[:-1], offsets[1:], arrays["route_round_trip"])):
+            stops = arrays["route_stops"][stop_offsets[k]:stop_offsets[k + 1]]
+            if round_trip:
+                routes.append(RoundTripRoute(coords[start:end]))
+            elif not np.isnan(travel_km[k]):
+                progress_end = progress_start + end - start
+                if np.isnan(depart_s[k]):
+                    routes.append(ScheduledRoute(coords[start:end], progress[progress_start:progress_end], stops,
+                                                 travel_km[k]))
+                else:
+                    routes.append(TimedRoute(coords[start:end], progress[progress_start:progress_end], stops,
+                                             travel_km[k], depart_s[k]))
+                progress_start = progress_end
+            elif stop_counts[k] >= 0:
+                routes.append(MultiStopRoute(coords[start:end], stops))
+            else:
+                routes.append(ArrayRoute(coords[start:end]))
+        return routes
+
+
+def portable(values):
+    """The JSON-serialisable part of an extras/spec dict (drops e.g. map route levels)"""
+    return {key: value for key, value in values.items() if isinstance(value, PORTABLE_TYPES)}
+
+
+def _fleet_state(fleet, routes):
+    count = len(fleet)
+    arrays = {
+        "fleet_speed": fleet.speed[:count].copy(),
+        "fleet_weight": fleet.weight[:count].copy(),
+        "fleet_distance_km": fleet.distance_km[:count].copy(),
+        "fleet_battery_kwh": fleet.battery_kwh[:count].copy(),
+        "fleet_kwh_per_km": fleet.kwh_per_km[:count].copy(),
+        "fleet_route_index": fleet.route_index[:count].copy(),
+        "fleet_pos": fleet.positions().copy(),
+        "fleet_route": np.array([routes.add(route) for route in fleet.routes], dtype=np.int64)
+    }
+    state = {
+        "names": list(fleet.names),
+        "types": list(fleet.types),
+        "extras": [portable(extras) for extras in fleet.extras]
+    }
+    return arrays, state
+
+
+def _restore_fleet(fleet, arrays, state, routes):
+    fleet.clear()
+    for slot, name in enumerate(state["names"]):
+        vehicle = dict(state["extras"][slot])
+        vehicle.update({
+            "type": state["types"][slot],
+            "route": routes[arrays["fleet_route"][slot]],
+            "speed": arrays["fleet_speed"][slot],
+            "weight": arrays["fleet_weight"][slot],
+            "distance_km": arrays["fleet_distance_km"][slot],
+            "battery_kwh": arrays["fleet_battery_kwh"][slot],
+            "kwh_per_km": arrays["fleet_kwh_per_km"][slot],
+            "route_index": int(arrays["fleet_route_index"][slot]),
+            "pos": arrays["fleet_pos"][slot]
+        })
+        fleet.add(name, vehicle)
+
+
+def _event_state(engine, routes):
+    queue = engine.queue
+    state = {
+        # Stored in heap order, so the list is still a valid heap when loaded
+        "queue": [list(entry) for entry in queue.heap],
+        "next_seq": max((entry[1] for entry in queue.heap), default=-1) + 1,
+        "depart_s": engine.depart_s,
+        "return_s": engine.return_s,
+        "event_log": engine.event_log,
+        "plan": engine.plan,
+        "trips": engine.trips,
+        "busy": sorted(engine.busy),
+        "waves": None
+    }
+
+    plan = engine.waves
+    if plan is not None:
+        state["waves"] = {
+            "waves": [{name: portable(spec) for name, spec in specs.items()} for specs in plan.waves],
+            "pause_s": plan.pause_s,
+            "routes": [[wave, name, routes.add(route)] for (wave, name), route in plan.routes.items()],
+            "legs": {name: list(legs) for name, legs in plan.legs.items()},
+            "released": sorted(plan.released),
+            "release_scheduled": sorted(plan.release_scheduled),
+            "ready_s": plan.ready_s
+        }
+    return state
+
+
+def _restore_events(engine, state, routes):
+    engine.queue.heap = [tuple(entry) for entry in state["queue"]]
+    heapq.heapify(engine.queue.heap)
+    engine.queue.counter = itertools.count(state["next_seq"])
+    engine.depart_s = dict(state["depart_s"])
+    engine.return_s = dict(state["return_s"])
+    engine.event_log = list(state["event_log"])
+    engine.plan = [tuple(entry) for entry in state["plan"]]
+    engine.trips = list(state["trips"])
+    engine.busy = set(state["busy"])
+
+    waves = state["waves"]
+    engine.waves = None
+    if waves is not None:
+        plan = WavePlan(waves["waves"], waves["pause_s"])
+        for wave, name, route_id in waves["routes"]:
+            plan.set_route(wave, name, routes[route_id])
+        plan.legs = {name: collections.deque(legs) for name, legs in waves["legs"].items()}
+        plan.released = set(waves["released"])
+        plan.release_scheduled = set(waves["release_scheduled"])
+        plan.ready_s = dict(waves["ready_s"])
+        engine.waves = plan
+
+
+def save_snapshot(path, engine, extra=None):
+    """
+    Write the engine's full state (plus a JSON-able extra dict) to path
+    The global random and NumPy RNG states are included, so a restored run
+    draws the same numbers the original would have.
+    """
+    routes = RouteTable()
+    arrays, fleet = _fleet_state(engine.fleet, routes)
+
+    random_state = random.getstate()
+    np_state = np.random.get_state()
+    state = {
+        "version": FORMAT_VERSION,
+        "mode": "event" if isinstance(engine, EventDrivenEngine) else "step",
+        "clock": {"sim_time": engine.clock.sim_time, "speed": engine.clock.speed},
+        "fleet": fleet,
+        "events": _event_state(engine, routes) if isinstance(engine, EventDrivenEngine) else None,
+        "random": [random_state[0], list(random_state[1]), random_state[2]],
+        "np_random": [np_state[0], int(np_state[2]), int(np_state[3]), float(np_state[4])],
+        "extra": extra or {}
+    }
+
+    arrays.update(routes.arrays())
+    arrays["np_random_keys"] = np_state[1]
+    arrays["state"] = np.array(json.dumps(state))
+
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def load_snapshot(path, engine):
+    """
+    Restore a snapshot into engine (same mode it was taken in); returns the extra dict
+    The clock is left paused at the snapshot time with its saved speed.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+
+    state = json.loads(str(arrays["state"]))
+    if state["version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {state['version']}")
+    mode = "event" if isinstance(engine, EventDrivenEngine) else "step"
+    if state["mode"] != mode:
+        raise ValueError(f"Snapshot was taken in {state['mode']} mode, engine runs in {mode} mode")
+
+    routes = RouteTable.load(arrays)
+    engine.clear()
+    _restore_fleet(engine.fleet, arrays, state["fleet"], routes)
+    if state["events"] is not None:
+        _restore_events(engine, state["events"], routes)
+
+    engine.clock.set_speed(state["clock"]["speed"])
+    engine.clock.jump_to(state["clock"]["sim_time"])
+
+    version, internal, gauss = state["random"]
+    random.setstate((version, tuple(internal), gauss))
+    name, pos, has_gauss, cached = state["np_random"]
+    np.random.set_state((name, arrays["np_random_keys"], pos, has_gauss, cached))
+    return state["extra"]
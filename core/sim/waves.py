@@ -0,0 +1,177 @@
+"""
+Multi-wave dispatch
+
+Customers are split into dispatch waves whose vehicle mix comes from
+DEFAULT_WAVES. The same vehicles serve every wave: one that is back at the
+depot waits out PAUSE_BETWEEN_WAVES and then leaves on its leg of the next
+wave, so later waves overlap the tail of earlier ones. Routes for a wave can
+arrive while earlier waves are still driving.
+"""
+import random
+from collections import deque
+
+from config.app_config import DEFAULT_WAVES, PAUSE_BETWEEN_WAVES, VEHICLE_SPEEDS, VEHICLE_WEIGHTS
+from core.sim.scenario import FLEET_ORDER, draw_parcels, feasible_pairs
+
+# DEFAULT_WAVES entry key -> vehicle type
+WAVE_KEYS = {
+    "num_drones": "Drone",
+    "num_electric_trucks": "Electric Truck",
+    "num_fuel_trucks": "Fuel Truck"
+}
+
+
+def wave_mix(wave, fleet_mix):
+    """Vehicles of each type a wave sends out, capped by the fleet (whole fleet if that leaves none)"""
+    mix = {vehicle_type: min(wave.get(key, 0), fleet_mix.get(vehicle_type, 0))
+           for key, vehicle_type in WAVE_KEYS.items()}
+    return mix if any(mix.values()) else dict(fleet_mix)
+
+
+def plan_waves(deliveries, fleet_mix, waves=None, rng=random, depot=None):
+    """
+    Split deliveries into waves of {vehicle name: spec}, one delivery per leg
+    Wave k sends the mix of waves[k], and the last mix repeats until every
+    delivery has a leg. Within a type vehicles take turns, so one that sat
+    out a wave goes first in the next.
+    With depot given, every delivery gets a parcel weight and a vehicle only
+    takes legs it can carry there and back (scenario.feasible_pairs); a wave
+    whose mix can serve none of what is left sends the whole fleet, and
+    deliveries no vehicle can serve are dropped.
+    """
+    waves = DEFAULT_WAVES if waves is None else waves
+    if not deliveries or not any(fleet_mix.values()):
+        return []
+
+    pending = list(range(len(deliveries)))
+    rng.shuffle(pending)
+
+    turns = {}
+    weights = {}
+    types = {}
+    for vehicle_type in FLEET_ORDER:
+        names = [f"{vehicle_type} {i+1}" for i in range(fleet_mix.get(vehicle_type, 0))]
+        turns[vehicle_type] = deque(names)
+        for name in names:
+            weights[name] = rng.randint(*VEHICLE_WEIGHTS[vehicle_type])
+            types[name] = vehicle_type
+
+    parcels = mask = None
+    if depot is not None:
+        parcels = draw_parcels(deliveries, rng)
+        rows = {name: k for k, name in enumerate(weights)}
+        mask, _ = feasible_pairs(depot, deliveries, list(types.values()),
+                                 list(weights.values()), parcels)
+        servable = mask.any(axis=0)
+        if not servable.all():
+            print(f"WARNING: {int((~servable).sum())} of {len(deliveries)} delivery points fit no vehicle's "
+                  f"payload or range and will remain unassigned.")
+        pending = [c for c in pending if servable[c]]
+    pending = deque(pending)
+
+    def take(name):
+        """The first pending delivery name can serve, removed from the queue (None if there is none)"""
+        if mask is None:
+            return pending.popleft()
+        for position, c in enumerate(pending):
+            if mask[rows[name], c]:
+                del pending[position]
+                return c
+        return None
+
+    def fill(mix, wave):
+        specs = {}
+        for vehicle_type in FLEET_ORDER:
+            for _ in range(mix.get(vehicle_type, 0)):
+                if not pending:
+                    break
+                name = turns[vehicle_type][0]
+                turns[vehicle_type].rotate(-1)
+                c = take(name)
+                if c is None:
+                    continue
+                specs[name] = {
+                    "type": vehicle_type,
+                    "speed": VEHICLE_SPEEDS[vehicle_type],
+                    "weight": weights[name],
+                    "assigned_delivery": deliveries[c],
+                    "wave": wave
+                }
+                if parcels is not None:
+                    specs[name]["load_kg"] = parcels[c]
+        return specs
+
+    plan = []
+    while pending:
+        wave = len(plan)
+        mix = wave_mix(waves[min(wave, len(waves) - 1)], fleet_mix) if waves else dict(fleet_mix)
+        plan.append(fill(mix, wave) or fill(fleet_mix, wave))
+
+    return plan
+
+
+class WavePlan:
+    """
+    Each vehicle's queue of wave legs plus the routes built for them so far
+    A leg is dispatched once its wave is released, its vehicle is back at the
+    depot and its route has been built.
+    """
+
+    def __init__(self, waves, pause_s=None):
+        self.waves = waves
+        self.pause_s = PAUSE_BETWEEN_WAVES * 60.0 if pause_s is None else pause_s
+        self.routes = {}    # (wave, name) -> route
+        self.reset()
+
+    def reset(self):
+        """Every leg pending again, no wave released; built routes are kept"""
+        self.legs = {}      # Vehicle name -> waves it still has to drive
+        for wave, specs in enumerate(self.waves):
+            for name in specs:
+                self.legs.setdefault(name, deque()).append(wave)
+        self.released = set()
+        self.release_scheduled = set()
+        self.ready_s = {}   # Vehicle name -> earliest time it can leave the depot again
+
+    def route_jobs(self, depot, wave=None):
+        """Route build jobs keyed (wave, name), for one wave or all of them"""
+        waves = range(len(self.waves)) if wave is None else [wave]
+        return [
+            ((k, name), depot, spec["assigned_delivery"], spec["type"] == "Drone")
+            for k in waves
+            for name, spec in self.waves[k].items()
+        ]
+
+    def set_route(self, wave, name, route):
+        self.routes[(wave, name)] = route
+
+    def drop_unrouted(self, wave):
+        """Forget legs of a wave whose route could not be built; returns how many"""
+        dropped = 0
+        for name in self.waves[wave]:
+            legs = self.legs.get(name)
+            if (wave, name) not in self.routes and legs and wave in legs:
+                legs.remove(wave)
+                dropped += 1
+        return dropped
+
+    def vehicles(self, wave):
+        """Vehicles that still have a leg in this wave"""
+        return [name for name in self.waves[wave] if wave in self.legs.get(name, ())]
+
+    def next_leg(self, name):
+        """Pop (wave, spec, route) for name's next leg if it can leave, else None"""
+        legs = self.legs.get(name)
+        if not legs:
+            return None
+        wave = legs[0]
+        if wave not in self.released or (wave, name) not in self.routes:
+            return None
+        legs.popleft()
+        return wave, self.waves[wave][name], self.routes[(wave, name)]
+
+    def pending(self):
+        return any(self.legs.values())
+
+    def deliveries(self):
+        return sum(len(specs) for specs in self.waves)
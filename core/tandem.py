@@ -0,0 +1,144 @@
+"""
+Truck-and-drone tandem planning (the flying sidekick problem)
+
+Drones ride on a truck and are launched from it at one stop, fly to a
+customer and land back on it at a later stop while the truck carries on
+serving its own customers. Starting from a plain truck tour, each customer a
+drone can carry is tried as a sortie: take it off the truck tour (split) and
+insert it between the launch and recovery stops that cost least. The cost
+estimate for every launch/recovery pair of a customer is one NumPy
+expression; the best candidate is then checked against the exact timetable
+and kept only if the tour really finishes sooner.
+"""
+import numpy as np
+
+EPSILON = 1e-9
+
+
+def schedule(leg_hours, sorties, sortie_hours, launch_hours=0.0, recover_hours=0.0):
+    """
+    Timetable of one truck tour with drone sorties
+    leg_hours[p] is the drive from node p to node p + 1 (node 0 and the last
+    node are the depot); sorties are (launch node, recover node) pairs with
+    sortie_hours their (outbound, return) flight times. At a node the truck
+    first waits for and recovers the drones landing there, then launches.
+    Returns (arrive, depart, launched, landed): truck times per node and drone
+    take-off and landing times per sortie.
+    """
+    nodes = len(leg_hours) + 1
+    arrive = [0.0] * nodes
+    depart = [0.0] * nodes
+    launched = [0.0] * len(sorties)
+    landed = [0.0] * len(sorties)
+    launches = [[] for _ in range(nodes)]
+    recoveries = [[] for _ in range(nodes)]
+    for s, (a, b) in enumerate(sorties):
+        launches[a].append(s)
+        recoveries[b].append(s)
+
+    for p in range(nodes):
+        if p > 0:
+            arrive[p] = depart[p - 1] + leg_hours[p - 1]
+        ready = arrive[p]
+        for s in recoveries[p]:
+            # A drone that gets there first hovers until the truck arrives
+            out_h, back_h = sortie_hours[s]
+            landed[s] = max(launched[s] + out_h + back_h, arrive[p])
+            ready = max(ready, landed[s]) + recover_hours
+        for s in launches[p]:
+            ready += launch_hours
+            launched[s] = ready
+        depart[p] = ready
+    return arrive, depart, launched, landed
+
+
+def _tour_hours(route, sorties, truck, drone, launch_hours, recover_hours):
+    """
+    Exact finish time of route (matrix indices, depot at both ends) and every sortie's airborne hours
+    The tour is over once the truck is back and every drone landing at the depot has been recovered.
+    """
+    legs = [truck[x][y] for x, y in zip(route[:-1], route[1:])]
+    flights = [(drone[route[a]][j], drone[j][route[b]]) for a, j, b, _ in sorties]
+    _, depart, launched, landed = schedule(legs, [(a, b) for a, _, b, _ in sorties], flights,
+                                           launch_hours, recover_hours)
+    return depart[-1], [l - t for t, l in zip(launched, landed)]
+
+
+def split_tour(truck_hours, drone_hours, tour, capable, endurance_hours, launch_hours=0.0, recover_hours=0.0):
+    """
+    Move customers of one truck tour onto drone sorties while that shortens the tour
+    truck_hours and drone_hours are (n + 1, n + 1) travel-time matrices with
+    the depot at index 0, tour lists 0-based customer indices in visiting
+    order and capable is a (customers, drones) mask of which drone can carry
+    which customer's parcel.
+    Returns (truck_tour, sorties, hours): the customers left on the truck,
+    (launch node, customer, recover node, drone) per sortie with nodes indexing
+    [depot] + truck_tour + [depot], and the tour's finish time.
+    """
+    truck = np.asarray(truck_hours, dtype=np.float64)
+    drone = np.asarray(drone_hours, dtype=np.float64)
+    capable = np.asarray(capable, dtype=bool).reshape(len(truck) - 1, -1)
+    route = [0] + [c + 1 for c in tour] + [0]
+    sorties = []
+    best_hours, _ = _tour_hours(route, sorties, truck, drone, launch_hours, recover_hours)
+    if not capable.any():
+        return list(tour), [], best_hours
+
+    handling = launch_hours + recover_hours
+    tried = set()
+    while True:
+        endpoints = {route[a] for a, _, _, _ in sorties} | {route[b] for _, _, b, _ in sorties}
+        best = None
+        for p in range(1, len(route) - 1):
+            j = route[p]
+            if j in tried or j in endpoints or not capable[j - 1].any():
+                continue
+            rest = route[:p] + route[p + 1:]
+            saved = truck[route[p - 1], j] + truck[j, route[p + 1]] - truck[route[p - 1], route[p + 1]]
+
+            # Every launch a < recovery b at once: flight vs. the truck's drive from a to b
+            nodes = np.asarray(rest)
+            drive = np.concatenate(([0.0], np.cumsum(truck[nodes[:-1], nodes[1:]])))
+            flight = drone[nodes, j][:, None] + drone[j, nodes][None, :] + handling
+            between = drive[None, :] - drive[:, None]
+            ok = np.triu(np.maximum(flight, between) <= endurance_hours, k=1)
+
+            # A drone that can carry j is free for (a, b) if none of its sorties shares a leg with it
+            free = np.zeros_like(ok)
+            shifted = [(a - (a > p), b - (b > p), u) for a, _, b, u in sorties]
+            for u in np.flatnonzero(capable[j - 1]):
+                busy = np.zeros(len(rest) - 1)
+                for a, b, owner in shifted:
+                    if owner == u:
+                        busy[a:b] = 1
+                used = np.concatenate(([0.0], np.cumsum(busy)))
+                free |= (used[None, :] - used[:, None]) == 0
+            ok &= free
+            if not ok.any():
+                continue
+
+            estimate = np.where(ok, np.maximum(flight - between, 0.0) - saved, np.inf)
+            a, b = np.unravel_index(np.argmin(estimate), estimate.shape)
+            if best is None or estimate[a, b] < best[0]:
+                best = (estimate[a, b], p, int(a), int(b))
+
+        if best is None or best[0] >= -EPSILON:
+            break
+        _, p, a, b = best
+        j = route[p]
+        rest = route[:p] + route[p + 1:]
+        shifted = [(x - (x > p), c, y - (y > p), u) for x, c, y, u in sorties]
+        for u in np.flatnonzero(capable[j - 1]).tolist():
+            if all(owner != u or y <= a or x >= b for x, _, y, owner in shifted):
+                break
+        candidate = shifted + [(a, j, b, u)]
+        hours, airborne = _tour_hours(rest, candidate, truck, drone, launch_hours, recover_hours)
+        if hours < best_hours - EPSILON and max(airborne) <= endurance_hours + EPSILON:
+            route, sorties, best_hours = rest, candidate, hours
+            # The timetable changed, so customers rejected before may fit now
+            tried.clear()
+        else:
+            tried.add(j)
+
+    sorties.sort(key=lambda sortie: (sortie[0], sortie[2]))
+    return [c - 1 for c in route[1:-1]], [(a, j - 1, b, u) for a, j, b, u in sorties], best_hours
@@ -0,0 +1,218 @@
+"""
+Time-of-day truck speeds by road class
+
+A profile table holds, for every road class and time slot of the day (hours
+by default), the multiple of its nominal speed a truck manages on that
+class of road. A trip is timed when it leaves: every segment of its path is
+driven at the speed of the slot in which the truck enters it, looked up for
+the whole path at once. The timetable is turned into a TimedRoute, whose
+progress runs at the vehicle's nominal speed like any scheduled route, so
+both engines, the KPIs and snapshots follow congestion without knowing
+about it. The road graph router weighs edges by the same table.
+
+Profiles are kept in a compact binary file: a header (magic, version, class
+count, slots per day), the class names as length-prefixed UTF-8, then one
+uint8 per class and slot holding the speed factor in hundredths. Convert a
+CSV with one "class,factor,factor,..." row per road class with:
+    python -m core.traffic speeds.csv traffic_profiles.bin
+"""
+import csv
+import os
+import struct
+import sys
+
+import numpy as np
+
+from config.app_config import TRAFFIC_CONFIG, SIMULATION_CONFIG
+from core import geodesy
+from core.fleet_state import RoundTripRoute, MultiStopRoute, TimedRoute
+
+MAGIC = b"TDSP"
+VERSION = 1
+# magic, version, class count, slots per day
+HEADER = struct.Struct("<4sBBH")
+SCALE = 100.0               # Stored factor units per 1.0
+DAY_S = 86400.0
+
+ROAD_CLASSES = ("motorway", "primary", "secondary", "local")
+UNCLASSIFIED = -1           # Segment off the road graph: priced as TRAFFIC_CONFIG["default_class"]
+
+# OSM highway tag -> index into ROAD_CLASSES
+HIGHWAY_CLASSES = {
+    "motorway": 0, "motorway_link": 0, "trunk": 0, "trunk_link": 0,
+    "primary": 1, "primary_link": 1,
+    "secondary": 2, "secondary_link": 2, "tertiary": 2, "tertiary_link": 2,
+    "unclassified": 3, "residential": 3, "living_street": 3, "service": 3, "road": 3
+}
+
+
+def day_start_s():
+    """Seconds after midnight at simulated t = 0 (SIMULATION_CONFIG["day_start"])"""
+    hours, minutes, seconds = (int(part) for part in SIMULATION_CONFIG["day_start"].split(":"))
+    return hours * 3600.0 + minutes * 60.0 + seconds
+
+
+class SpeedProfiles:
+    """Speed factors as a (road class, time slot) table; slots split the day evenly"""
+
+    def __init__(self, factors, classes=ROAD_CLASSES):
+        factors = np.asarray(factors, dtype=np.float64)
+        classes = list(classes)
+        if factors.ndim != 2 or len(factors) != len(classes) or factors.shape[1] == 0:
+            raise ValueError("Speed profiles need one row of factors per road class")
+        missing = [name for name in ROAD_CLASSES if name not in classes]
+        if missing:
+            raise ValueError(f"Speed profiles have no row for {', '.join(missing)}")
+        if (factors <= 0).any():
+            raise ValueError("Speed factors must be positive")
+
+        # Rows in ROAD_CLASSES order, plus the default class last so UNCLASSIFIED (-1) indexes it
+        rows = [classes.index(name) for name in ROAD_CLASSES]
+        rows.append(classes.index(TRAFFIC_CONFIG["default_class"]))
+        self.factors = np.ascontiguousarray(factors[rows])
+        self.slots = self.factors.shape[1]
+        self.slot_s = DAY_S / self.slots
+
+    @classmethod
+    def from_config(cls):
+        """The table in TRAFFIC_CONFIG["profiles"]"""
+        profiles = TRAFFIC_CONFIG["profiles"]
+        return cls([profiles[name] for name in profiles], list(profiles))
+
+    @classmethod
+    def load(cls, path):
+        """Read a binary profile file written by save()"""
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is not a speed profile file")
+        magic, version, count, slots = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a speed profile file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported speed profile version {version}")
+
+        offset = HEADER.size
+        classes = []
+        for _ in range(count):
+            length = data[offset]
+            classes.append(data[offset + 1:offset + 1 + length].decode("utf-8"))
+            offset += 1 + length
+        table = np.frombuffer(data, dtype=np.uint8, count=count * slots, offset=offset)
+        return cls(table.reshape(count, slots) / SCALE, classes)
+
+    def save(self, path):
+        """Write the table as a binary profile file (factors rounded to hundredths)"""
+        names = [name.encode("utf-8") for name in ROAD_CLASSES]
+        table = np.clip(np.rint(self.factors[:len(ROAD_CLASSES)] * SCALE), 1, 255).astype(np.uint8)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(names), self.slots))
+            f.write(b"".join(bytes([len(name)]) + name for name in names))
+            f.write(table.tobytes())
+
+    def slot_at(self, sim_s):
+        """Time slot of the day at simulated time(s) sim_s"""
+        return (np.floor_divide(np.asarray(sim_s, dtype=np.float64) + day_start_s(), self.slot_s)
+                .astype(np.intp) % self.slots)
+
+    def class_factors(self, sim_s):
+        """Factor of every road class at sim_s, ROAD_CLASSES order; [-1] is the default class"""
+        return self.factors[:, int(self.slot_at(sim_s))]
+
+    def factor(self, road_class, sim_s):
+        """Speed factors for road classes entered at simulated times sim_s (broadcast together)"""
+        return self.factors[road_class, self.slot_at(sim_s)]
+
+    def path_hours(self, segment_km, road_class, speed, depart_s):
+        """
+        Hours from departure to every waypoint of a path driven at speed km/h from depart_s
+        Each segment takes the speed of the slot in which it is entered. Works a
+        slot at a time: every segment still ahead is timed at the current slot's
+        factors, and the ones entered before the slot ends are kept.
+        """
+        segment_km = np.asarray(segment_km, dtype=np.float64)
+        road_class = np.asarray(road_class, dtype=np.intp)
+        hours = np.empty(len(segment_km))
+        offset = day_start_s()
+        now_s = float(depart_s)
+        start = 0
+        while start < len(segment_km):
+            slot_index = np.floor((now_s + offset) / self.slot_s)
+            slot_end_s = (slot_index + 1) * self.slot_s - offset
+            segment_h = segment_km[start:] / (speed * self.factors[road_class[start:], int(slot_index) % self.slots])
+            enter_s = now_s + 3600.0 * (np.cumsum(segment_h) - segment_h)
+            kept = max(int(np.searchsorted(enter_s, slot_end_s, side="left")), 1)
+            hours[start:start + kept] = segment_h[:kept]
+            now_s = float(enter_s[kept - 1] + 3600.0 * segment_h[kept - 1])
+            start += kept
+        return np.concatenate(([0.0], np.cumsum(hours)))
+
+
+_profiles = None
+
+
+def get_profiles():
+    """
+    The SpeedProfiles in use, or None when TRAFFIC_CONFIG is disabled
+    Loaded once from TRAFFIC_CONFIG["profile_path"], falling back to the table in the config.
+    """
+    global _profiles
+    if not TRAFFIC_CONFIG["enabled"]:
+        return None
+    if _profiles is None:
+        path = TRAFFIC_CONFIG["profile_path"]
+        if path and os.path.exists(path):
+            try:
+                _profiles = SpeedProfiles.load(path)
+                print(f"Loaded speed profiles: {_profiles.slots} slots per day from {path}")
+            except (OSError, ValueError) as e:
+                print(f"Could not load speed profiles from {path}, using TRAFFIC_CONFIG: {e}")
+        if _profiles is None:
+            _profiles = SpeedProfiles.from_config()
+    return _profiles
+
+
+def time_route(route, speed, depart_s, road_class, profiles):
+    """
+    TimedRoute for route driven at speed km/h from depart_s through traffic
+    road_class gives each segment's class (UNCLASSIFIED where unknown). Stops
+    stay where they were: a round trip's customer, a multi-stop route's stops,
+    the end of a plain route.
+    """
+    coords = np.asarray(route, dtype=np.float64)
+    if isinstance(route, MultiStopRoute):
+        stop_index = route.stop_index
+    elif isinstance(route, RoundTripRoute):
+        stop_index = [len(route.outbound) - 1]
+    else:
+        stop_index = [len(coords) - 1]
+    segment_km = geodesy.path_lengths(coords)
+    hours = profiles.path_hours(segment_km, road_class, speed, depart_s)
+    return TimedRoute(coords, hours * speed, stop_index, float(segment_km.sum()), depart_s)
+
+
+def profiles_from_csv(path):
+    """SpeedProfiles from a CSV of "class,factor,..." rows (a header row is skipped)"""
+    classes, rows = [], []
+    with open(path, newline="") as f:
+        for record in csv.reader(f):
+            if not record or record[0].strip().startswith("#"):
+                continue
+            try:
+                factors = [float(value) for value in record[1:]]
+            except ValueError:
+                continue    # Header row
+            classes.append(record[0].strip())
+            rows.append(factors)
+    return SpeedProfiles(rows, classes)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m core.traffic <speeds.csv> <output.bin>")
+        sys.exit(1)
+
+    profiles = profiles_from_csv(sys.argv[1])
+    profiles.save(sys.argv[2])
+    print(f"Saved speed profiles for {len(ROAD_CLASSES)} road classes, {profiles.slots} slots per day "
+          f"({os.path.getsize(sys.argv[2])} bytes)")
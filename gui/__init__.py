@@ -5,9 +5,15 @@ This module contains the main application window and GUI components.
 """
 
 from .main_window import IndiaAirspaceMap
+from .workers import DataSimulator, RouteBuildWorker, MultiStopPlanWorker, MultiDepotWorker, OrderStreamWorker
 
 __all__ = [
-    'IndiaAirspaceMap'
+    'IndiaAirspaceMap',
+    'DataSimulator',
+    'RouteBuildWorker',
+    'MultiStopPlanWorker',
+    'MultiDepotWorker',
+    'OrderStreamWorker'
 ]
 
 __version__ = '1.0.0'
\ No newline at end of file
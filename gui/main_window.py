@@ -6,19 +6,31 @@ import sys
 import os
 import json
 import time
-import math
 import random
+import numpy as np
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                           QLabel, QFrame, QToolBar, QAction, QMessageBox)
+                           QLabel, QFrame, QToolBar, QAction, QMessageBox, QComboBox,
+                           QSlider, QFileDialog)
 from PyQt5.QtWebEngineWidgets import QWebEngineView
 from PyQt5.QtCore import QTimer, QUrl, Qt
 from PyQt5.QtGui import QFont, QIcon
 
 # Import from other modules
 from config.app_config import (DARK_STYLE, DEFAULT_DEPOT_COORDS, MAP_CENTER, MAP_ZOOM, 
-                              DEFAULT_WAVES, PAUSE_BETWEEN_WAVES, VEHICLE_SPEEDS, VEHICLE_WEIGHTS)
-from core.data_manager import VehicleData, DataSimulator
+                              DEFAULT_WAVES, PAUSE_BETWEEN_WAVES,
+                              ROUTE_BUILD_CONFIG, ROUTE_SIMPLIFY_CONFIG, SIMULATION_CONFIG,
+                              RECORDING_CONFIG, SNAPSHOT_CONFIG, MULTI_STOP_CONFIG, MULTI_DEPOT_CONFIG,
+                              ORDER_STREAM_CONFIG, DELIVERY_DISTANCE_MAX, MAP_UPDATE_INTERVAL)
+from core.data_manager import VehicleData
+from gui.workers import DataSimulator, RouteBuildWorker, MultiStopPlanWorker, MultiDepotWorker, OrderStreamWorker
 from core.api_handler import RouteManager
+from core.polyline import MultiResolutionRoute
+from core.fleet_state import FleetState
+from core.sim import SimulationClock, MAX_SPEED, EventDrivenEngine, WavePlan, create_engine, plan_waves, scenario
+from core.sim.events import format_clock
+from core.sim.orders import OrderDispatcher
+from core.sim.recording import SimulationRecorder, SimulationReplay, MergedReplay, bounds_around
+from core.sim.snapshot import save_snapshot, load_snapshot, portable
 from widgets.vehicle_control import VehicleControlPanel
 from widgets.delivery_info import DeliveryInfoWidget  
 from widgets.sound_monitoring import SoundGraphWidget, NoiseStatisticsWidget
@@ -46,17 +58,38 @@ class IndiaAirspaceMap(QMainWindow):
         # India center coordinates for full country view
         self.map_center = MAP_CENTER
         self.map_zoom = MAP_ZOOM
+        self.route_zoom = MAP_ZOOM  # Zoom the drawn routes were simplified for
         
         # Major No-fly zones across India
         self.no_fly_zones = get_india_no_fly_zones()
         
         # Vehicle system
-        self.vehicles = {}
+        self.vehicles = FleetState()
+        self.engine = create_engine(SIMULATION_CONFIG["mode"], self.vehicles, SimulationClock(
+            SIMULATION_CONFIG["default_speed"], SIMULATION_CONFIG["max_step_seconds"]
+        ))
+        self.rendered_positions = None  # Last fleet positions drawn by the renderer
         self.current_wave = 0
         self.wave_running = False
         self.wave_start_time = 0.0
         self.vehicles_started = False  # Track if vehicles are started
         self.vehicles_paused = False   # Track if vehicles are paused/stopped
+        self.pending_vehicles = {}     # Vehicles whose routes are still being built
+        self.wave_plan = None          # WavePlan when the event engine dispatches in waves
+        self.building_wave = 0         # Wave whose routes the route worker is building
+        self.trips_drawn = 0           # Engine trips already put on the map
+        self.drawn_vehicles = set()
+        self.replay = None             # SimulationReplay driving the map instead of the engine
+        self.replay_clock = None
+        self.replay_drawn = set()
+        self.replay_time = None        # Replay time last drawn
+        self.multi_depot_worker = None
+        self.plan_worker = None        # Multi-stop tour planner, while it is improving tours
+        self.order_worker = None       # Live order stream, while it is switched on
+        self.order_dispatcher = None   # Inserts the streamed orders into the running routes
+        self.route_worker = None
+        self.retired_route_workers = []
+        self.routes_building = False
         
         # Generate delivery points around selected depot based on customer count
         self.delivery_points = self.generate_delivery_points_around_depot()
@@ -66,34 +99,22 @@ class IndiaAirspaceMap(QMainWindow):
         self.setup_data_simulator()  # Add data simulator for sidebars
         self.create_map_file()
         
-        # Movement timer - no map reload needed
+        # Engine timer - only lets the simulation catch up with its own clock
         self.timer = QTimer()
         self.timer.timeout.connect(self.tick_vehicle_movement)
-        self.timer.start(500)  # Update every 500ms
+        self.timer.start(SIMULATION_CONFIG["step_interval_ms"])
+        
+        # Render timer - samples engine state at the map's frame rate, no map reload needed
+        self.render_timer = QTimer()
+        self.render_timer.timeout.connect(self.render_frame)
+        self.render_timer.start(MAP_UPDATE_INTERVAL)
         
         # Open in full screen
         self.showMaximized()
         
     def generate_delivery_points_around_depot(self):
         """Generate delivery points around the selected depot based on customer count"""
-        points = []
-        depot_lat, depot_lon = self.depot_coords
-        
-        for i in range(self.customer_count):
-            # Generate points in a rough circle around depot
-            angle = (i * (360 / self.customer_count)) + random.uniform(-20, 20)
-            distance_km = random.uniform(15, 45)  # 15-45 km from depot
-            
-            # Convert to lat/lon offset
-            lat_offset = (distance_km / 111.32) * math.cos(math.radians(angle))
-            lon_offset = (distance_km / (111.32 * math.cos(math.radians(depot_lat)))) * math.sin(math.radians(angle))
-            
-            point_lat = depot_lat + lat_offset
-            point_lon = depot_lon + lon_offset
-            
-            points.append([point_lat, point_lon])
-            
-        return points
+        return scenario.generate_delivery_points(self.depot_coords, self.customer_count)
         
     def setup_ui(self):
         """Setup UI with sidebar layout"""
@@ -195,6 +216,68 @@ class IndiaAirspaceMap(QMainWindow):
         self.restart_action.setVisible(False)
         toolbar.addAction(self.restart_action)
         
+        toolbar.addSeparator()
+        
+        # Simulation speed selector
+        self.speed_selector = QComboBox()
+        for speed in SIMULATION_CONFIG["speed_options"]:
+            self.speed_selector.addItem("Max speed" if speed == MAX_SPEED else f"{speed}x", speed)
+        self.speed_selector.setCurrentIndex(
+            SIMULATION_CONFIG["speed_options"].index(SIMULATION_CONFIG["default_speed"])
+        )
+        self.speed_selector.setToolTip("Simulation speed")
+        self.speed_selector.currentIndexChanged.connect(self.on_speed_changed)
+        toolbar.addWidget(self.speed_selector)
+        
+        toolbar.addSeparator()
+        
+        # Recording and replay
+        self.record_action = QAction("⏺ Record", self)
+        self.record_action.setCheckable(True)
+        self.record_action.setToolTip("Record vehicle positions and events to a replayable file")
+        self.record_action.triggered.connect(self.toggle_recording)
+        toolbar.addAction(self.record_action)
+        
+        self.replay_action = QAction("🎞 Replay Recording", self)
+        self.replay_action.triggered.connect(self.toggle_replay)
+        toolbar.addAction(self.replay_action)
+        
+        self.replay_slider = QSlider(Qt.Horizontal)
+        self.replay_slider.setMinimumWidth(200)
+        self.replay_slider.setToolTip("Scrub through the recording")
+        self.replay_slider.sliderMoved.connect(self.on_replay_scrubbed)
+        self.replay_slider_action = toolbar.addWidget(self.replay_slider)
+        self.replay_slider_action.setVisible(False)
+        
+        self.multi_depot_action = QAction("🏭 Multi-Depot Run", self)
+        self.multi_depot_action.setToolTip("Simulate every MULTI_DEPOT_CONFIG hub in its own process and replay them together")
+        self.multi_depot_action.triggered.connect(self.start_multi_depot_run)
+        toolbar.addAction(self.multi_depot_action)
+        
+        self.waves_action = QAction("🌊 Waves", self)
+        self.waves_action.setCheckable(True)
+        self.waves_action.setToolTip("Serve every customer in DEFAULT_WAVES dispatch waves (event mode)")
+        toolbar.addAction(self.waves_action)
+        
+        self.order_stream_action = QAction("📦 Live Orders", self)
+        self.order_stream_action.setCheckable(True)
+        self.order_stream_action.setToolTip("Stream orders from ORDER_STREAM_CONFIG['source'] into the running routes")
+        self.order_stream_action.triggered.connect(self.toggle_order_stream)
+        toolbar.addAction(self.order_stream_action)
+        
+        toolbar.addSeparator()
+        
+        # Checkpoints
+        self.save_snapshot_action = QAction("💾 Save Snapshot", self)
+        self.save_snapshot_action.setToolTip("Save the whole simulation to a file to branch what-if runs from")
+        self.save_snapshot_action.triggered.connect(self.save_simulation_snapshot)
+        toolbar.addAction(self.save_snapshot_action)
+        
+        self.load_snapshot_action = QAction("📂 Load Snapshot", self)
+        self.load_snapshot_action.setToolTip("Restore a saved simulation, paused at the moment it was saved")
+        self.load_snapshot_action.triggered.connect(self.load_simulation_snapshot)
+        toolbar.addAction(self.load_snapshot_action)
+        
         # Map view
         self.map_view = QWebEngineView()
         self.map_view.loadFinished.connect(self.on_map_ready)
@@ -255,6 +338,8 @@ class IndiaAirspaceMap(QMainWindow):
         if not self.map_ready:
             print("Map not ready, cannot start vehicles")
             return False
+        
+        self.stop_replay()
             
         if not self.vehicles_started:
             # First time starting - create vehicles based on configuration
@@ -265,9 +350,11 @@ class IndiaAirspaceMap(QMainWindow):
             # Resume paused vehicles
             self.vehicles_paused = False
         
+        self.engine.clock.start()
+        
         # Update vehicle statuses to "Moving"
         for name, v in self.vehicles.items():
-            vehicle_data = VehicleData(name, v["type"], v["pos"][0], v["pos"][1], "Moving", v["speed"])
+            vehicle_data = VehicleData(name, v["type"], v["pos"][0], v["pos"][1], "Moving", v["speed"], v["soc"])
             self.vehicle_control.update_vehicle_status(vehicle_data)
         
         print(f"Vehicle movement started with configured fleet: {self.electric_trucks}E + {self.fuel_trucks}F + {self.drones}D")
@@ -275,7 +362,12 @@ class IndiaAirspaceMap(QMainWindow):
 
     def create_configured_fleet(self):
         """Create vehicles based on the configured fleet numbers with proper delivery allocation"""
-        self.vehicles.clear()
+        self.engine.clear()
+        self.wave_plan = None
+        self.trips_drawn = 0
+        self.drawn_vehicles.clear()
+        if self.record_action.isChecked():
+            self.start_recording()
         
         # Get delivery points
         deliveries = self.delivery_points[:]
@@ -288,126 +380,176 @@ class IndiaAirspaceMap(QMainWindow):
         print(f"  - Fuel Trucks: {self.fuel_trucks}")
         print(f"  - Drones: {self.drones}")
         
-        # If we have more delivery points than vehicles, we need to select which ones to serve
-        if total_vehicles < len(deliveries):
-            print(f"WARNING: You have {len(deliveries)} delivery points but only {total_vehicles} vehicles!")
-            print(f"Only {total_vehicles} delivery points will be assigned vehicles.")
-            print(f"{len(deliveries) - total_vehicles} delivery points will remain unassigned.")
-            
-            # Select the closest delivery points to the depot for assignment
-            deliveries_with_distance = []
-            depot_lat, depot_lon = self.depot_coords
-            
-            for delivery in deliveries:
-                dist = RouteManager.haversine(depot_lat, depot_lon, delivery[0], delivery[1])
-                deliveries_with_distance.append((delivery, dist))
-            
-            # Sort by distance and take only what we can handle
-            deliveries_with_distance.sort(key=lambda x: x[1])
-            allocated_deliveries = [d[0] for d in deliveries_with_distance[:total_vehicles]]
-            
-            print(f"Selected {len(allocated_deliveries)} closest delivery points for vehicle assignment.")
-            
-        else:
-            # We have enough or more vehicles than delivery points
-            allocated_deliveries = []
-            
-            # First, assign one vehicle to each delivery point
-            for delivery in deliveries:
-                allocated_deliveries.append(delivery)
-            
-            # If we have extra vehicles, distribute them among delivery points
-            remaining_vehicles = total_vehicles - len(deliveries)
-            if remaining_vehicles > 0:
-                print(f"Distributing {remaining_vehicles} extra vehicles among {len(deliveries)} delivery points.")
-                for i in range(remaining_vehicles):
-                    allocated_deliveries.append(deliveries[i % len(deliveries)])
-            
-            # Shuffle to distribute vehicle types evenly
-            random.shuffle(allocated_deliveries)
+        fleet_mix = {"Drone": self.drones, "Electric Truck": self.electric_trucks, "Fuel Truck": self.fuel_trucks}
+        if self.waves_enabled():
+            self.create_wave_fleet(deliveries, fleet_mix)
+            return
         
-        print(f"Final allocation list: {len(allocated_deliveries)} assignments")
+        if MULTI_STOP_CONFIG["enabled"] and self.electric_trucks + self.fuel_trucks:
+            # Trucks chain Clarke-Wright tours, so a few of them cover every customer; the
+            # tours are improved in the background and drawn on the map as they get shorter
+            self.start_plan_worker(deliveries, fleet_mix)
+            return
         
-        # Create vehicles and assign them to delivery points
-        vehicle_count = 0
+        # One delivery per vehicle, handed out by ASSIGNMENT_CONFIG's objective
+        self.pending_vehicles = scenario.allocate_fleet(self.depot_coords, deliveries, fleet_mix)
+        print(f"Final allocation list: {len(self.pending_vehicles)} assignments")
+        self.dispatch_pending_vehicles()
+    
+    def start_plan_worker(self, deliveries, fleet_mix):
+        """Plan multi-stop tours on a background thread"""
+        self.stop_plan_worker()
+        self.plan_worker = MultiStopPlanWorker(self.depot_coords, deliveries, fleet_mix)
+        self.plan_worker.improved.connect(self.on_plan_improved)
+        self.plan_worker.planned.connect(self.on_plan_ready)
+        self.plan_worker.start()
+        self.statusBar().showMessage(f"Planning multi-stop tours for {len(deliveries)} customers...")
+    
+    def stop_plan_worker(self):
+        """Cancel a running tour plan, ignoring anything it still reports"""
+        worker = self.plan_worker
+        if worker is not None:
+            worker.improved.disconnect(self.on_plan_improved)
+            worker.planned.disconnect(self.on_plan_ready)
+            worker.stop()
+            # The search stops at its next restart; keep the thread referenced until then
+            self.retired_route_workers.append(worker)
+            self.plan_worker = None
+        if self.map_ready:
+            self.map_view.page().runJavaScript("clearPlanTours();")
+    
+    def on_plan_improved(self, tours, km):
+        """Preview the best tours found so far"""
+        if self.map_ready:
+            self.map_view.page().runJavaScript(
+                f"showPlanTours({json.dumps(list(self.depot_coords))}, {json.dumps(tours)});")
+        self.statusBar().showMessage(f"Improving tours: {len(tours)} tours, {km:.1f} km")
+    
+    def on_plan_ready(self, specs):
+        """Tours are final: build their road routes and start the vehicles"""
+        self.plan_worker = None
+        if self.map_ready:
+            self.map_view.page().runJavaScript("clearPlanTours();")
+        self.pending_vehicles = specs
+        self.dispatch_pending_vehicles()
+    
+    def dispatch_pending_vehicles(self):
+        """Build the routes of pending_vehicles in parallel; each vehicle joins the map as soon as its route arrives"""
+        for name, spec in self.pending_vehicles.items():
+            delivery = spec["assigned_delivery"]
+            stops = len(spec.get("stops", [delivery]))
+            print(f"  {name} assigned to delivery point: ({delivery[0]:.4f}, {delivery[1]:.4f})"
+                  + (f" and {stops - 1} more stops" if stops > 1 else ""))
         
-        # Create drones based on configuration
-        for i in range(self.drones):
-            if vehicle_count >= len(allocated_deliveries):
-                break
-                
-            name = f"Drone {i+1}"
-            delivery = allocated_deliveries[vehicle_count]
-            route = RouteManager.build_roundtrip_route(self.depot_coords, delivery, use_drone=True)
-            self.vehicles[name] = {
-                "type": "Drone",
-                "pos": route[0][:],
-                "route": route,
-                "route_index": 0,
-                "speed": VEHICLE_SPEEDS["Drone"],
-                "progress": 0.0,
-                "weight": random.randint(*VEHICLE_WEIGHTS["Drone"]),
-                "assigned_delivery": delivery
-            }
-            print(f"  {name} assigned to delivery point: ({delivery[0]:.4f}, {delivery[1]:.4f})")
-            vehicle_count += 1
+        self.wave_running = True
+        self.wave_start_time = self.engine.clock.sim_time
         
-        # Create electric trucks based on configuration
-        for i in range(self.electric_trucks):
-            if vehicle_count >= len(allocated_deliveries):
-                break
-                
-            name = f"Electric Truck {i+1}"
-            delivery = allocated_deliveries[vehicle_count]
-            route = RouteManager.build_roundtrip_route(self.depot_coords, delivery, use_drone=False)
-            self.vehicles[name] = {
-                "type": "Electric Truck",
-                "pos": route[0][:],
-                "route": route,
-                "route_index": 0,
-                "speed": VEHICLE_SPEEDS["Electric Truck"],
-                "progress": 0.0,
-                "weight": random.randint(*VEHICLE_WEIGHTS["Electric Truck"]),
-                "assigned_delivery": delivery
-            }
-            print(f"  {name} assigned to delivery point: ({delivery[0]:.4f}, {delivery[1]:.4f})")
-            vehicle_count += 1
+        # Clear any vehicles from a previous fleet on the map
+        if self.map_ready:
+            self.map_view.page().runJavaScript("clearVehicles();")
         
-        # Create fuel trucks based on configuration
-        for i in range(self.fuel_trucks):
-            if vehicle_count >= len(allocated_deliveries):
-                break
-                
-            name = f"Fuel Truck {i+1}"
-            delivery = allocated_deliveries[vehicle_count]
-            route = RouteManager.build_roundtrip_route(self.depot_coords, delivery, use_drone=False)
-            self.vehicles[name] = {
-                "type": "Fuel Truck",
-                "pos": route[0][:],
-                "route": route,
-                "route_index": 0,
-                "speed": VEHICLE_SPEEDS["Fuel Truck"],
-                "progress": 0.0,
-                "weight": random.randint(*VEHICLE_WEIGHTS["Fuel Truck"]),
-                "assigned_delivery": delivery
-            }
-            print(f"  {name} assigned to delivery point: ({delivery[0]:.4f}, {delivery[1]:.4f})")
-            vehicle_count += 1
+        self.start_route_builder(scenario.route_jobs(self.depot_coords, self.pending_vehicles))
+    
+    def waves_enabled(self):
+        """Dispatch in waves only when asked to; single runs go through the planners in either mode"""
+        return self.waves_action.isChecked() and isinstance(self.engine, EventDrivenEngine)
+    
+    def create_wave_fleet(self, deliveries, fleet_mix):
+        """Serve every delivery point by re-dispatching the fleet in DEFAULT_WAVES waves"""
+        self.wave_plan = WavePlan(plan_waves(deliveries, fleet_mix, DEFAULT_WAVES, depot=self.depot_coords))
+        for wave, specs in enumerate(self.wave_plan.waves):
+            print(f"  Wave {wave + 1}: {len(specs)} vehicles ({', '.join(specs)})")
         
         self.wave_running = True
-        self.wave_start_time = time.time()
+        self.wave_start_time = self.engine.clock.sim_time
+        self.engine.set_waves(self.wave_plan, self.wave_start_time)
         
-        # Send vehicles to JavaScript
-        self.send_vehicles_to_js()
+        if self.map_ready:
+            self.map_view.page().runJavaScript("clearVehicles();")
+        
+        self.start_wave_route_builder(0)
+    
+    def start_wave_route_builder(self, wave):
+        """Build one wave's routes; the next wave is queued when these are done"""
+        self.building_wave = wave
+        self.start_route_builder(scenario.route_jobs(self.depot_coords, self.wave_plan.waves[wave]))
+    
+    def start_route_builder(self, jobs):
+        """Build vehicle routes on a background worker pool"""
+        self.stop_route_builder()
+        
+        self.routes_building = True
+        # Trucks are routed for the traffic at the current simulated time
+        self.route_worker = RouteBuildWorker(jobs, ROUTE_BUILD_CONFIG["max_workers"], self.engine.clock.sim_time)
+        self.route_worker.route_ready.connect(self.on_route_ready)
+        self.route_worker.all_routes_ready.connect(self.on_all_routes_ready)
+        self.route_worker.start()
+        print(f"Building {len(jobs)} routes in parallel (up to {ROUTE_BUILD_CONFIG['max_workers']} at a time)...")
+    
+    def stop_route_builder(self, wait=False):
+        """Cancel an in-flight route build, ignoring any routes it still delivers"""
+        # Forget workers that have already wound down
+        self.retired_route_workers = [w for w in self.retired_route_workers if w.isRunning()]
+        
+        worker = self.route_worker
+        if worker is not None:
+            worker.route_ready.disconnect(self.on_route_ready)
+            worker.all_routes_ready.disconnect(self.on_all_routes_ready)
+            worker.stop()
+            # Requests already in flight finish on their own timeout; keep the
+            # thread referenced until then instead of blocking the GUI
+            self.retired_route_workers.append(worker)
+            self.route_worker = None
+        self.routes_building = False
+        
+        if wait:
+            for retired in self.retired_route_workers:
+                retired.wait()
+            self.retired_route_workers = []
+    
+    def on_route_ready(self, name, route):
+        """Add a vehicle to the fleet once its route has been built"""
+        if self.wave_plan is not None:
+            # The engine dispatches the leg; the map catches up in draw_dispatched_routes
+            spec = self.wave_plan.waves[self.building_wave].get(name)
+            if spec is not None:
+                spec["route_levels"] = MultiResolutionRoute(route, ROUTE_SIMPLIFY_CONFIG["zoom_levels"])
+                self.engine.add_leg_route(self.building_wave, name, route)
+            return
+        
+        spec = self.pending_vehicles.pop(name, None)
+        if spec is None:
+            return
+        
+        vehicle = dict(spec)
+        vehicle["route_levels"] = MultiResolutionRoute(route, ROUTE_SIMPLIFY_CONFIG["zoom_levels"])
+        vehicle = self.engine.add_vehicle(name, vehicle, route)
+        
+        status = "Stopped" if self.vehicles_paused else "Moving"
+        speed = 0 if self.vehicles_paused else vehicle["speed"]
+        self.vehicle_control.update_vehicle_status(
+            VehicleData(name, vehicle["type"], vehicle["pos"][0], vehicle["pos"][1], status, speed, vehicle["soc"])
+        )
+        self.add_vehicle_to_js(name, vehicle)
+    
+    def on_all_routes_ready(self, route_count):
+        """Report the final allocation once every route has been built"""
+        self.routes_building = False
+        self.route_worker = None
+        if self.wave_plan is not None:
+            self.on_wave_routes_ready(route_count)
+            return
+        
+        total_vehicles = self.electric_trucks + self.fuel_trucks + self.drones
         
         # Final allocation summary
         unique_deliveries = set()
         for vehicle in self.vehicles.values():
-            delivery_coords = tuple(vehicle["assigned_delivery"])
-            unique_deliveries.add(delivery_coords)
+            for stop in vehicle.get("stops", [vehicle["assigned_delivery"]]):
+                unique_deliveries.add(tuple(stop))
         
         print(f"\n=== FINAL ALLOCATION SUMMARY ===")
-        print(f"Created vehicles: {len(self.vehicles)}")
+        print(f"Created vehicles: {len(self.vehicles)} ({route_count} routes built)")
         print(f"Unique delivery points with vehicles: {len(unique_deliveries)}")
         print(f"Total delivery points generated: {len(self.delivery_points)}")
         print(f"Unassigned delivery points: {len(self.delivery_points) - len(unique_deliveries)}")
@@ -419,24 +561,51 @@ class IndiaAirspaceMap(QMainWindow):
             print(f"OR reduce the number of customers/delivery points to {total_vehicles} or fewer")
         else:
             print(f"SUCCESS: All delivery points have vehicles assigned!")
+
+        self.print_route_cache_stats()
+        print(f"================================\n")
+
+    def on_wave_routes_ready(self, route_count):
+        """Pipeline route building: start on the next wave while this one drives"""
+        plan = self.wave_plan
+        wave = self.building_wave
+        dropped = plan.drop_unrouted(wave)
+        print(f"Wave {wave + 1}/{len(plan.waves)} routes ready: {route_count} built, {dropped} failed")
+        
+        if wave + 1 < len(plan.waves):
+            self.start_wave_route_builder(wave + 1)
+            return
         
+        print(f"\n=== WAVE DISPATCH SUMMARY ===")
+        print(f"Waves: {len(plan.waves)} (pause between waves: {PAUSE_BETWEEN_WAVES:.1f} simulated min)")
+        print(f"Delivery legs planned: {plan.deliveries()} for {len(self.delivery_points)} delivery points")
+        self.print_route_cache_stats()
         print(f"================================\n")
 
+    def print_route_cache_stats(self):
+        route_cache = RouteManager.get_route_cache()
+        if route_cache is not None:
+            cache_stats = route_cache.stats()
+            print(f"Route cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                  f"{cache_stats['entries']} routes stored")
+
     def restart_vehicles(self):
         """Restart vehicles from the beginning of their routes"""
         if not self.vehicles_started:
             return
         
-        # Reset all vehicles to start of their routes
-        for name, v in self.vehicles.items():
-            v["route_index"] = 0
-            v["progress"] = 0.0
-            v["pos"] = v["route"][0][:]  # Reset to depot position
+        # Reset all vehicles to start of their routes (depot position), clock back at zero
+        self.engine.reset()
+        self.trips_drawn = 0
+        if self.engine.recorder is not None:
+            self.start_recording()  # The clock is back at zero, so start a fresh file
         
         # Resume movement if paused
         self.vehicles_paused = False
         self.wave_running = True
-        self.wave_start_time = time.time()
+        self.engine.clock.start()
+        self.wave_start_time = self.engine.clock.sim_time
+        self.rendered_positions = None
         
         # Update button states
         self.start_stop_action.setChecked(True)
@@ -444,7 +613,7 @@ class IndiaAirspaceMap(QMainWindow):
         
         # Update vehicle statuses to "Moving"
         for name, v in self.vehicles.items():
-            vehicle_data = VehicleData(name, v["type"], v["pos"][0], v["pos"][1], "Moving", v["speed"])
+            vehicle_data = VehicleData(name, v["type"], v["pos"][0], v["pos"][1], "Moving", v["speed"], v["soc"])
             self.vehicle_control.update_vehicle_status(vehicle_data)
         
         # Update positions on map
@@ -461,10 +630,11 @@ class IndiaAirspaceMap(QMainWindow):
     def pause_vehicles(self):
         """Pause vehicle movement but keep them visible on map"""
         self.vehicles_paused = True
+        self.engine.clock.pause()
         
         # Update vehicle statuses to "Stopped"
         for name, v in self.vehicles.items():
-            vehicle_data = VehicleData(name, v["type"], v["pos"][0], v["pos"][1], "Stopped", 0)
+            vehicle_data = VehicleData(name, v["type"], v["pos"][0], v["pos"][1], "Stopped", 0, v["soc"])
             self.vehicle_control.update_vehicle_status(vehicle_data)
             
         print("Vehicle movement paused! Vehicles remain visible at current positions.")
@@ -475,13 +645,22 @@ class IndiaAirspaceMap(QMainWindow):
         self.vehicles_started = False
         self.vehicles_paused = False
         self.wave_running = False
-        self.vehicles.clear()
+        self.stop_plan_worker()
+        self.stop_order_stream()
+        self.stop_route_builder()
+        self.pending_vehicles.clear()
+        self.stop_recording()
+        self.engine.clear()
+        self.wave_plan = None
+        self.trips_drawn = 0
+        self.drawn_vehicles.clear()
+        self.rendered_positions = None
         
         if hasattr(self, 'vehicle_control') and hasattr(self.vehicle_control, 'status_list'):
             self.vehicle_control.status_list.clear()
         
         if self.map_ready:
-            self.map_view.page().runJavaScript("clearVehicles();")
+            self.map_view.page().runJavaScript("clearVehicles(); clearOrderMarkers();")
         
         if hasattr(self, 'start_stop_action'):
             self.start_stop_action.setChecked(False)
@@ -748,7 +927,7 @@ class IndiaAirspaceMap(QMainWindow):
                     "name": name,
                     "type": v["type"],
                     "pos": v["pos"],
-                    "route": v["route"],
+                    "route": self.route_for_map(v),
                     "speed": v["speed"],
                     "weight": v["weight"]
                 }
@@ -759,6 +938,52 @@ class IndiaAirspaceMap(QMainWindow):
         js_code = f"window.setVehicles({json.dumps(vehicle_data)});"
         self.map_view.page().runJavaScript(js_code)
     
+    def add_vehicle_to_js(self, name, v):
+        """Add a single vehicle and its route to the map without touching the others"""
+        if not self.map_ready:
+            return
+        
+        if not self.toggle_vehicles_action.isChecked():
+            return
+        
+        vehicle = {
+            "name": name,
+            "type": v["type"],
+            "pos": v["pos"],
+            "route": self.route_for_map(v),
+            "speed": v["speed"],
+            "weight": v["weight"]
+        }
+        
+        js_code = f"window.addVehicle({json.dumps(vehicle)});"
+        self.map_view.page().runJavaScript(js_code)
+    
+    def route_for_map(self, v):
+        """Route geometry at the resolution suited to the current map zoom"""
+        levels = v.get("route_levels")
+        geometry = v["route"] if levels is None else levels.for_zoom(self.route_zoom)
+        
+        # Array-backed routes are converted only when they are sent to the map
+        return geometry.tolist() if hasattr(geometry, "tolist") else geometry
+    
+    def on_map_zoom_reported(self, zoom):
+        """Redraw routes at a different resolution when the zoom crosses a level boundary"""
+        if zoom is None or zoom == self.route_zoom:
+            return
+        
+        previous_zoom = self.route_zoom
+        self.route_zoom = zoom
+        
+        routes = {}
+        for name, v in self.vehicles.items():
+            levels = v.get("route_levels")
+            if levels is not None and levels.level_for_zoom(zoom) != levels.level_for_zoom(previous_zoom):
+                routes[name] = self.route_for_map(v)
+        
+        if routes and self.map_ready and self.toggle_vehicles_action.isChecked():
+            js_code = f"window.setRouteGeometries({json.dumps(routes)});"
+            self.map_view.page().runJavaScript(js_code)
+    
     def update_vehicle_positions_js(self):
         """Update vehicle positions in JavaScript without reloading map"""
         if not self.map_ready or not self.vehicles:
@@ -767,106 +992,501 @@ class IndiaAirspaceMap(QMainWindow):
         if not self.toggle_vehicles_action.isChecked():
             return
         
+        fleet = self.vehicles
+        count = len(fleet)
+        speeds = [0] * count if self.vehicles_paused else fleet.speed[:count].tolist()
         vehicle_data = {
             "vehicles": [
                 {
                     "name": name,
-                    "type": v["type"],
-                    "pos": v["pos"],
-                    "speed": v["speed"] if not self.vehicles_paused else 0,
-                    "weight": v["weight"]
+                    "type": vehicle_type,
+                    "pos": pos,
+                    "speed": speed,
+                    "weight": weight
                 }
-                for name, v in self.vehicles.items()
+                for name, vehicle_type, pos, speed, weight in zip(
+                    fleet.names, fleet.types, fleet.positions().tolist(), speeds, fleet.weight[:count].tolist()
+                )
             ]
         }
     
         js_code = f"window.updateVehiclePositions({json.dumps(vehicle_data)});"
         self.map_view.page().runJavaScript(js_code)
+        
+        # Poll the zoom so route resolution follows the user's view
+        self.map_view.page().runJavaScript("window.getMapZoom()", self.on_map_zoom_reported)
 
     def all_vehicles_returned(self):
-        """Check if all vehicles completed their routes"""
-        for v in self.vehicles.values():
-            if v["route_index"] < len(v["route"]) - 1:
-                return False
-        return True
+        """Check if all vehicles completed their routes (and every wave, when dispatching in waves)"""
+        return self.engine.finished
+    
+    def on_speed_changed(self, index):
+        """Apply the simulation speed picked in the toolbar"""
+        speed = self.speed_selector.itemData(index)
+        self.engine.clock.set_speed(speed)
+        if self.replay_clock is not None:
+            self.replay_clock.set_speed(speed)
+        print(f"Simulation speed set to {self.speed_selector.itemText(index)}")
     
     def tick_vehicle_movement(self):
-        """Main vehicle movement tick"""
+        """Engine tick: advance the fleet to the simulation clock"""
         if not self.map_ready or not self.vehicles_started or self.vehicles_paused:
             return
             
-        if not self.vehicles:
+        # In wave mode vehicles only join the fleet once the engine has released their wave
+        if not self.vehicles and self.wave_plan is None:
             return
-            
-        # Move vehicles
-        dt = 0.5 / 3600.0  # 500ms in hours
-        vehicles_moved = False
-        
-        for name, v in self.vehicles.items():
-            if v["route_index"] >= len(v["route"]) - 1:
-                continue
-                
-            # Current segment
-            lat1, lon1 = v["route"][v["route_index"]]
-            lat2, lon2 = v["route"][v["route_index"] + 1]
-            
-            # Calculate distance
-            dist = RouteManager.haversine(lat1, lon1, lat2, lon2)
-            if dist == 0:
-                v["route_index"] += 1
-                v["progress"] = 0.0
-                if v["route_index"] < len(v["route"]):
-                    v["pos"] = v["route"][v["route_index"]]
-                vehicles_moved = True
-                continue
-            
-            # Calculate movement
-            step_km = v["speed"] * dt
-            frac = step_km / dist
-            v["progress"] += frac
-            
-            if v["progress"] >= 1.0:
-                v["route_index"] += 1
-                v["progress"] = 0.0
-                if v["route_index"] < len(v["route"]):
-                    v["pos"] = v["route"][v["route_index"]]
-            else:
-                # Interpolate position
-                v["pos"] = [
-                    lat1 + (lat2 - lat1) * v["progress"],
-                    lon1 + (lon2 - lon1) * v["progress"]
-                ]
-            vehicles_moved = True
-            
-            # Update sidebar vehicle status
-            status = "Stopped" if self.vehicles_paused else "Moving"
-            speed = 0 if self.vehicles_paused else v["speed"]
-            vehicle_data = VehicleData(name, v["type"], v["pos"][0], v["pos"][1], status, speed)
-            self.vehicle_control.update_vehicle_status(vehicle_data)
         
-        # Update positions in JavaScript
-        if vehicles_moved:
-            self.update_vehicle_positions_js()
+        self.engine.tick(SIMULATION_CONFIG["max_mode_budget_ms"] / 1000.0)
         
         # Check if all vehicles completed
-        if self.wave_running and self.all_vehicles_returned():
+        if self.wave_running and not self.routes_building and self.all_vehicles_returned():
             self.wave_running = False
             print(f"All vehicles completed their delivery routes!")
             
             # Update status bar
-            active_vehicles = len([v for v in self.vehicles.values() if v["route_index"] < len(v["route"]) - 1])
             status_text = "paused" if self.vehicles_paused else "completed"
             total_vehicles = self.electric_trucks + self.fuel_trucks + self.drones
+            cycle_hours = (self.engine.clock.sim_time - self.wave_start_time) / 3600.0
+            deliveries_per_hour = self.engine.kpis()["deliveries_per_hour"]
             self.statusBar().showMessage(
-                f"Delivery cycle {status_text} - "
+                f"Delivery cycle {status_text} in {cycle_hours:.2f} simulated hours "
+                f"({deliveries_per_hour:.1f} deliveries/h) - "
                 f"Fleet: {total_vehicles} vehicles ({self.electric_trucks}E, {self.fuel_trucks}F, {self.drones}D) - "
                 f"Depot: {self.depot_coords[0]:.4f}, {self.depot_coords[1]:.4f} | Customers: {self.customer_count}"
             )
     
+    def render_frame(self):
+        """Sample engine state at the renderer's own rate and draw what changed"""
+        if self.map_ready and self.replay is not None:
+            self.replay_clock.advance()
+            self.draw_replay_frame()
+            return
+        
+        if not self.map_ready or not self.vehicles:
+            return
+        
+        self.draw_dispatched_routes()
+        positions = self.vehicles.positions()
+        if self.rendered_positions is None or len(self.rendered_positions) != len(positions):
+            changed = np.arange(len(positions))
+        else:
+            changed = np.flatnonzero(np.any(positions != self.rendered_positions, axis=1))
+        if len(changed) == 0:
+            return
+        self.rendered_positions = positions.copy()
+        
+        # Update sidebar vehicle status
+        fleet = self.vehicles
+        status = "Stopped" if self.vehicles_paused else "Moving"
+        soc = fleet.state_of_charge(changed)
+        stranded = fleet.stranded_mask()[changed]
+        for k, (slot, (lat, lon)) in enumerate(zip(changed.tolist(), positions[changed].tolist())):
+            speed = 0 if self.vehicles_paused or stranded[k] else fleet.speed[slot]
+            vehicle_data = VehicleData(fleet.names[slot], fleet.types[slot], lat, lon,
+                                       "Stranded" if stranded[k] else status, speed, soc[k])
+            self.vehicle_control.update_vehicle_status(vehicle_data)
+        
+        # Update positions in JavaScript
+        self.update_vehicle_positions_js()
+    
+    def draw_dispatched_routes(self):
+        """Put vehicles that just left on a wave leg on the map, or redraw their new route"""
+        trips = self.engine.trips if self.wave_plan is not None else ()
+        if self.trips_drawn >= len(trips):
+            return
+        
+        routes = {}
+        for trip in trips[self.trips_drawn:]:
+            name = trip["vehicle"]
+            vehicle = self.vehicles[name]
+            if name in self.drawn_vehicles:
+                routes[name] = self.route_for_map(vehicle)
+            else:
+                self.drawn_vehicles.add(name)
+                self.add_vehicle_to_js(name, vehicle)
+        self.trips_drawn = len(trips)
+        
+        if routes and self.toggle_vehicles_action.isChecked():
+            js_code = f"window.setRouteGeometries({json.dumps(routes)});"
+            self.map_view.page().runJavaScript(js_code)
+    
+    def toggle_recording(self):
+        """Start or stop recording the live simulation"""
+        if not self.record_action.isChecked():
+            self.stop_recording()
+        elif self.vehicles_started:
+            self.start_recording()
+        # Otherwise recording starts together with the fleet
+    
+    def start_recording(self):
+        """Record from the current simulated time into a new file"""
+        self.stop_recording()
+        
+        path = os.path.join(RECORDING_CONFIG["directory"], time.strftime("run_%Y%m%d_%H%M%S.simrec"))
+        bounds = bounds_around(self.depot_coords, DELIVERY_DISTANCE_MAX + RECORDING_CONFIG["margin_km"])
+        total_vehicles = self.electric_trucks + self.fuel_trucks + self.drones
+        self.engine.recorder = SimulationRecorder(path, total_vehicles, bounds, start_s=self.engine.clock.sim_time)
+        print(f"Recording simulation to {path}")
+    
+    def stop_recording(self):
+        """Finish the current recording, if any"""
+        recorder = self.engine.recorder
+        if recorder is None:
+            return
+        self.engine.recorder = None
+        recorder.close(self.vehicles, {
+            "depot": self.depot_coords,
+            "customers": self.customer_count,
+            "fleet": {"electric_trucks": self.electric_trucks, "fuel_trucks": self.fuel_trucks, "drones": self.drones}
+        })
+    
+    def toggle_replay(self):
+        """Open a recording to replay, or leave replay mode"""
+        if self.replay is not None:
+            self.stop_replay()
+            self.update_status_bar()
+            return
+        
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Open Recording", RECORDING_CONFIG["directory"], "Simulation recordings (*.simrec)"
+        )
+        if not path:
+            return
+        
+        try:
+            replay = SimulationReplay(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Replay", f"Could not open recording:\n{e}")
+            return
+        self.start_replay(replay)
+    
+    def start_replay(self, replay):
+        """Drive the map from a recording instead of the live engine"""
+        if self.vehicles_started:
+            self.stop_vehicles()
+        
+        self.replay = replay
+        self.replay_clock = SimulationClock(self.speed_selector.currentData(), SIMULATION_CONFIG["max_step_seconds"])
+        self.replay_clock.jump_to(replay.start_s)
+        self.replay_clock.start()
+        
+        self.replay_slider.setRange(0, max(replay.frame_count - 1, 0))
+        self.replay_slider.setValue(0)
+        self.replay_slider_action.setVisible(True)
+        self.replay_action.setText("⏹ Close Replay")
+        self.draw_replay_frame(reset=True)
+        print(f"Replaying {replay.path}: {replay.frame_count} frames, "
+              f"{(replay.end_s - replay.start_s) / 3600.0:.2f} simulated hours")
+    
+    def stop_replay(self):
+        """Leave replay mode and clear the replayed vehicles"""
+        if self.replay is None:
+            return
+        
+        self.replay = None
+        self.replay_clock = None
+        self.replay_drawn = set()
+        self.replay_time = None
+        self.replay_slider_action.setVisible(False)
+        self.replay_action.setText("🎞 Replay Recording")
+        if self.map_ready:
+            self.map_view.page().runJavaScript("clearVehicles(); clearDepots();")
+    
+    def on_replay_scrubbed(self, index):
+        """Jump the replay to the frame under the slider"""
+        if self.replay is None:
+            return
+        self.replay_clock.jump_to(self.replay.frame_time(index))
+        self.replay_clock.start()
+        self.draw_replay_frame(reset=True)
+    
+    def draw_replay_frame(self, reset=False):
+        """Show the recorded fleet at the replay clock's time; reset redraws from scratch (clears trails)"""
+        replay = self.replay
+        time_s = min(self.replay_clock.sim_time, replay.end_s)
+        if time_s == self.replay_time and not reset:
+            return
+        
+        positions, present = replay.positions_at(time_s)
+        slots = [slot for slot in np.flatnonzero(present).tolist() if slot < len(replay.names)]
+        vehicles = [
+            {
+                "name": replay.names[slot],
+                "type": replay.types[slot],
+                "pos": positions[slot].tolist(),
+                "route": [],
+                "speed": replay.speeds[slot],
+                "weight": replay.weights[slot]
+            }
+            for slot in slots
+        ]
+        
+        if reset or self.replay_time is None:
+            self.map_view.page().runJavaScript(f"window.setVehicles({json.dumps({'vehicles': vehicles})});")
+            self.replay_drawn = set(slots)
+        else:
+            for slot, vehicle in zip(slots, vehicles):
+                if slot not in self.replay_drawn:
+                    self.replay_drawn.add(slot)
+                    self.map_view.page().runJavaScript(f"window.addVehicle({json.dumps(vehicle)});")
+            self.map_view.page().runJavaScript(
+                f"window.updateVehiclePositions({json.dumps({'vehicles': vehicles})});"
+            )
+        
+        # Report the latest event the replay has passed
+        events = replay.events_between(self.replay_time if self.replay_time is not None else -1.0, time_s)
+        index = replay.frame_index(time_s)
+        self.replay_slider.setValue(index)
+        message = f"Replay {format_clock(time_s)} - frame {index + 1}/{replay.frame_count}"
+        if events:
+            event = events[-1]
+            message += f" - {event['clock']} {event['event']} {event['vehicle'] or ''}".rstrip()
+        self.statusBar().showMessage(message)
+        
+        self.replay_time = time_s
+        if time_s >= replay.end_s:
+            self.replay_clock.pause()
+    
+    def start_multi_depot_run(self):
+        """Simulate every configured hub as a separate process, then replay them on one map"""
+        if self.multi_depot_worker is not None:
+            return
+        if self.vehicles_started:
+            self.stop_vehicles()
+        self.stop_replay()
+        
+        depots = MULTI_DEPOT_CONFIG["depots"]
+        mode = SIMULATION_CONFIG["mode"]
+        record_dir = os.path.join(MULTI_DEPOT_CONFIG["directory"], time.strftime("%Y%m%d_%H%M%S"))
+        self.multi_depot_worker = MultiDepotWorker(
+            depots, mode=mode, waves=DEFAULT_WAVES if self.waves_enabled() else None, record_dir=record_dir
+        )
+        self.multi_depot_worker.finished_run.connect(self.on_multi_depot_finished)
+        self.multi_depot_worker.failed.connect(self.on_multi_depot_failed)
+        self.multi_depot_worker.start()
+        self.multi_depot_action.setEnabled(False)
+        self.statusBar().showMessage(f"Simulating {len(depots)} depots in separate processes...")
+    
+    def on_multi_depot_failed(self, message):
+        self.multi_depot_worker = None
+        self.multi_depot_action.setEnabled(True)
+        QMessageBox.warning(self, "Multi-Depot Run", f"Multi-depot run failed:\n{message}")
+        self.update_status_bar()
+    
+    def on_multi_depot_finished(self, result):
+        """Merge the shard recordings into one replay and mark every hub on the map"""
+        self.multi_depot_worker = None
+        self.multi_depot_action.setEnabled(True)
+        shards = result["depots"]
+        totals = result["totals"]
+        
+        try:
+            replay = MergedReplay([shard["recording"] for shard in shards], [shard["name"] for shard in shards])
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Multi-Depot Run", f"Could not open the shard recordings:\n{e}")
+            return
+        self.start_replay(replay)
+        
+        depots = [
+            {"name": depot["name"], "coords": depot["coords"], "customers": shard["customers"]}
+            for depot, shard in zip(MULTI_DEPOT_CONFIG["depots"], shards)
+        ]
+        self.map_view.page().runJavaScript(f"showDepots({json.dumps(depots)});")
+        
+        for shard in shards:
+            print(f"  {shard['name']}: {shard['customers']} customers ({shard['generated_customers']} generated), "
+                  f"{shard['deliveries']} delivered, makespan {shard['makespan_hours']:.2f} h")
+        print(f"Multi-depot run: {totals['deliveries']}/{totals['customers']} deliveries across "
+              f"{totals['depots']} depots, {result['reassigned_customers']} customers moved to a cheaper depot, "
+              f"makespan {totals['makespan_hours']:.2f} h, {result['wall_seconds']:.1f} s")
+    
+    def toggle_order_stream(self):
+        """Start or stop streaming live orders into the running routes"""
+        if not self.order_stream_action.isChecked():
+            self.stop_order_stream()
+            self.update_status_bar()
+            return
+        if not self.vehicles_started:
+            QMessageBox.information(self, "Live Orders", "Start the vehicles before streaming live orders.")
+            self.order_stream_action.setChecked(False)
+            return
+        
+        source = ORDER_STREAM_CONFIG["source"]
+        self.order_dispatcher = OrderDispatcher(self.engine, self.depot_coords)
+        self.order_worker = OrderStreamWorker(source, self.depot_coords)
+        self.order_worker.orders_arrived.connect(self.on_orders_arrived)
+        self.order_worker.failed.connect(self.on_order_stream_failed)
+        self.order_worker.start()
+        self.statusBar().showMessage(f"Streaming live orders from {source}...")
+    
+    def stop_order_stream(self):
+        """Stop the order stream, ignoring any batch it still reports"""
+        worker = self.order_worker
+        if worker is not None:
+            worker.orders_arrived.disconnect(self.on_orders_arrived)
+            worker.failed.disconnect(self.on_order_stream_failed)
+            worker.stop()
+            # Sources notice within poll_s; keep the thread referenced until then
+            self.retired_route_workers.append(worker)
+            self.order_worker = None
+        if hasattr(self, 'order_stream_action'):
+            self.order_stream_action.setChecked(False)
+    
+    def on_order_stream_failed(self, message):
+        self.stop_order_stream()
+        QMessageBox.warning(self, "Live Orders", f"The order stream stopped:\n{message}")
+    
+    def on_orders_arrived(self, orders):
+        """Insert a batch of orders into the running routes and redraw only the routes that changed"""
+        started = time.perf_counter()
+        changed = self.order_dispatcher.submit(orders)
+        
+        zoom_levels = ROUTE_SIMPLIFY_CONFIG["zoom_levels"]
+        routes = {}
+        for name in changed:
+            slot = self.vehicles.slots[name]
+            self.vehicles.extras[slot]["route_levels"] = MultiResolutionRoute(self.vehicles.routes[slot], zoom_levels)
+            routes[name] = self.route_for_map(self.vehicles[name])
+        if changed:
+            # A finished cycle carries on with the new stops
+            self.wave_running = True
+        
+        if self.map_ready:
+            self.map_view.page().runJavaScript(f"window.addOrderMarkers({json.dumps(orders)});")
+            if routes and self.toggle_vehicles_action.isChecked():
+                self.map_view.page().runJavaScript(f"window.setRouteGeometries({json.dumps(routes)});")
+        
+        summary = self.order_dispatcher.summary()
+        self.statusBar().showMessage(
+            f"Live orders: {summary['received']} received, {summary['inserted']} inserted, "
+            f"{summary['backlog']} waiting - last batch of {len(orders)} rerouted {len(changed)} vehicles "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+    
+    def save_simulation_snapshot(self):
+        """Checkpoint the running simulation to a single file"""
+        if not self.vehicles_started:
+            QMessageBox.information(self, "Save Snapshot", "Start the vehicles before saving a snapshot.")
+            return
+        
+        os.makedirs(SNAPSHOT_CONFIG["directory"], exist_ok=True)
+        default_path = os.path.join(SNAPSHOT_CONFIG["directory"], time.strftime("snapshot_%Y%m%d_%H%M%S.npz"))
+        path, _ = QFileDialog.getSaveFileName(self, "Save Snapshot", default_path, "Simulation snapshots (*.npz)")
+        if not path:
+            return
+        
+        started = time.perf_counter()
+        save_snapshot(path, self.engine, {
+            "depot": self.depot_coords,
+            "customer_count": self.customer_count,
+            "fleet": [self.electric_trucks, self.fuel_trucks, self.drones],
+            "delivery_points": self.delivery_points,
+            "wave_running": self.wave_running,
+            "wave_start_time": self.wave_start_time,
+            "pending_vehicles": {name: portable(spec) for name, spec in self.pending_vehicles.items()},
+            "levels_history": [float(level) for level in self.noise_stats.levels_history]
+        })
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        print(f"Snapshot saved to {path} in {elapsed_ms:.1f} ms")
+        self.statusBar().showMessage(f"Snapshot saved at {format_clock(self.engine.clock.sim_time)} "
+                                     f"({elapsed_ms:.0f} ms): {path}")
+    
+    def load_simulation_snapshot(self):
+        """Branch from a saved snapshot: restore it paused, ready to resume"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Load Snapshot", SNAPSHOT_CONFIG["directory"], "Simulation snapshots (*.npz)"
+        )
+        if path:
+            self.restore_simulation_snapshot(path)
+    
+    def restore_simulation_snapshot(self, path):
+        """Replace the current simulation with the one saved in path"""
+        self.stop_replay()
+        self.stop_route_builder()
+        self.stop_recording()
+        
+        started = time.perf_counter()
+        try:
+            extra = load_snapshot(path, self.engine)
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.warning(self, "Load Snapshot", f"Could not load snapshot:\n{e}")
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        # Rebuilding the UI below draws from the global RNG; keep the restored state intact
+        rng_state = random.getstate()
+        
+        self.depot_coords = extra["depot"]
+        self.customer_count = extra["customer_count"]
+        self.electric_trucks, self.fuel_trucks, self.drones = extra["fleet"]
+        self.delivery_points = extra["delivery_points"]
+        self.wave_running = extra["wave_running"]
+        self.wave_start_time = extra["wave_start_time"]
+        self.noise_stats.set_history(extra["levels_history"])
+        self.delivery_info.update_depot(self.depot_coords, self.customer_count)
+        self.update_depot_and_fleet_ui()
+        self.reinitialize_map()
+        
+        # Map route levels are derived data and are not stored in snapshots
+        zoom_levels = ROUTE_SIMPLIFY_CONFIG["zoom_levels"]
+        for slot, route in enumerate(self.vehicles.routes):
+            self.vehicles.extras[slot]["route_levels"] = MultiResolutionRoute(route, zoom_levels)
+        
+        self.wave_plan = self.engine.waves if isinstance(self.engine, EventDrivenEngine) else None
+        self.trips_drawn = len(self.engine.trips) if self.wave_plan is not None else 0
+        self.drawn_vehicles = set(self.vehicles.names)
+        self.rendered_positions = None
+        self.vehicles_started = True
+        self.vehicles_paused = True
+        
+        # Routes that were still being built when the snapshot was taken are rebuilt
+        self.pending_vehicles = extra["pending_vehicles"]
+        if self.wave_plan is not None:
+            for (wave, name), route in self.wave_plan.routes.items():
+                self.wave_plan.waves[wave][name]["route_levels"] = MultiResolutionRoute(route, zoom_levels)
+            unrouted = [wave for name, legs in self.wave_plan.legs.items() for wave in legs
+                        if (wave, name) not in self.wave_plan.routes]
+            if unrouted:
+                self.start_wave_route_builder(min(unrouted))
+        elif self.pending_vehicles:
+            self.start_route_builder(scenario.route_jobs(self.depot_coords, self.pending_vehicles))
+        
+        random.setstate(rng_state)
+        
+        self.vehicle_control.status_list.clear()
+        for name, v in self.vehicles.items():
+            self.vehicle_control.update_vehicle_status(
+                VehicleData(name, v["type"], v["pos"][0], v["pos"][1], "Stopped", 0, v["soc"])
+            )
+        if self.map_ready:
+            self.map_view.page().runJavaScript("clearVehicles();")
+        self.send_vehicles_to_js()
+        
+        # Show the speed the snapshot was running at
+        index = self.speed_selector.findData(self.engine.clock.speed)
+        if index >= 0:
+            self.speed_selector.setCurrentIndex(index)
+        
+        self.start_stop_action.setChecked(False)
+        self.start_stop_action.setText("▶ Resume Vehicles")
+        self.restart_action.setVisible(True)
+        
+        print(f"Snapshot {path} restored in {elapsed_ms:.1f} ms at {format_clock(self.engine.clock.sim_time)}")
+        self.statusBar().showMessage(f"Snapshot restored at {format_clock(self.engine.clock.sim_time)} - "
+                                     f"press Resume to continue from there")
+    
     def closeEvent(self, event):
         """Clean up on close"""
+        self.stop_recording()
         if hasattr(self, 'timer'):
             self.timer.stop()
+        if hasattr(self, 'render_timer'):
+            self.render_timer.stop()
+        self.stop_plan_worker()
+        self.stop_order_stream()
+        self.stop_route_builder(wait=True)
+        if self.multi_depot_worker is not None:
+            self.multi_depot_worker.wait()
         if hasattr(self, 'data_simulator'):
             self.data_simulator.stop()
             self.data_simulator.wait()
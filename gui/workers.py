@@ -0,0 +1,142 @@
+"""
+Qt worker threads used by the GUI
+
+These wrap the Qt-free core so the simulation engine itself never imports Qt.
+"""
+import time
+import random
+from PyQt5.QtCore import QThread, pyqtSignal
+from config.app_config import ORDER_STREAM_CONFIG
+from core.api_handler import RouteManager
+from core.data_manager import VehicleData
+from core.sim import scenario
+from core.sim.depots import run_multi_depot
+from core.sim.orders import open_order_source
+
+class DataSimulator(QThread):
+    """Simulates real-time vehicle and sensor data"""
+    vehicle_updated = pyqtSignal(VehicleData)
+    sound_data_updated = pyqtSignal(float, list)
+    
+    def __init__(self):
+        super().__init__()
+        self.running = True
+        
+    def run(self):
+        while self.running:
+            # Simulate drone sound data
+            sound_level = random.uniform(30, 60)  # dB levels
+            time_series = [random.uniform(-1, 1) for _ in range(50)]  # Audio waveform
+            self.sound_data_updated.emit(sound_level, time_series)
+            
+            time.sleep(1)  # Update every second
+    
+    def stop(self):
+        self.running = False
+
+class RouteBuildWorker(QThread):
+    """Builds fleet routes in parallel off the GUI thread and reports each one as it arrives"""
+    route_ready = pyqtSignal(str, object)
+    all_routes_ready = pyqtSignal(int)
+
+    def __init__(self, jobs, max_workers=None, depart_s=None):
+        super().__init__()
+        self.jobs = jobs
+        self.max_workers = max_workers
+        self.depart_s = depart_s    # Simulated time the vehicles leave (traffic routing)
+        self.running = True
+
+    def run(self):
+        routes = RouteManager.build_routes_parallel(
+            self.jobs,
+            max_workers=self.max_workers,
+            on_route=self.route_ready.emit,
+            should_stop=lambda: not self.running,
+            depart_s=self.depart_s
+        )
+
+        if self.running:
+            self.all_routes_ready.emit(len(routes))
+
+    def stop(self):
+        self.running = False
+
+class MultiStopPlanWorker(QThread):
+    """Plans and improves multi-stop tours off the GUI thread, streaming each better set of tours"""
+    improved = pyqtSignal(object, float)
+    planned = pyqtSignal(object)
+
+    def __init__(self, depot, deliveries, fleet_mix):
+        super().__init__()
+        self.depot = depot
+        self.deliveries = deliveries
+        self.fleet_mix = fleet_mix
+        self.running = True
+
+    def run(self):
+        specs = scenario.plan_multi_stop(
+            self.depot, self.deliveries, self.fleet_mix,
+            on_improvement=self.improved.emit,
+            should_stop=lambda: not self.running
+        )
+        if self.running:
+            self.planned.emit(specs)
+
+    def stop(self):
+        self.running = False
+
+class MultiDepotWorker(QThread):
+    """Runs the hub shards of a multi-depot simulation off the GUI thread"""
+    finished_run = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, depots=None, mode=None, waves=None, record_dir=None):
+        super().__init__()
+        self.depots = depots
+        self.mode = mode
+        self.waves = waves
+        self.record_dir = record_dir
+
+    def run(self):
+        try:
+            result = run_multi_depot(self.depots, mode=self.mode, waves=self.waves, record_dir=self.record_dir)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.finished_run.emit(result)
+
+class OrderStreamWorker(QThread):
+    """Reads live orders off the GUI thread and emits them in batches of up to batch_ms"""
+    orders_arrived = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, source, depot):
+        super().__init__()
+        self.source = source
+        self.depot = depot
+        self.running = True
+
+    def run(self):
+        window = ORDER_STREAM_CONFIG["batch_ms"] / 1000.0
+        batch = []
+        deadline = None
+        try:
+            for order in open_order_source(self.source, self.depot, should_stop=lambda: not self.running):
+                if not self.running:
+                    break
+                if order is not None:
+                    batch.append(order)
+                    if deadline is None:
+                        deadline = time.perf_counter() + window
+                # Idle sources yield None, so a part batch still goes out on time
+                if batch and time.perf_counter() >= deadline:
+                    self.orders_arrived.emit(batch)
+                    batch, deadline = [], None
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        if batch and self.running:
+            self.orders_arrived.emit(batch)
+
+    def stop(self):
+        self.running = False
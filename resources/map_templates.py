@@ -81,7 +81,10 @@ HTML_TEMPLATE = """<!DOCTYPE html>
   let routeLines = {};
   let trailLines = {};
   let depotMarker;
+  let hubMarkers = [];
+  let planTourLines = [];
   let deliveryMarkers = [];
+  let orderMarkers = [];
   let showVehicles = true;
   let showNFZ = true;
   let nfzLayers = [];
@@ -315,6 +318,51 @@ HTML_TEMPLATE = """<!DOCTYPE html>
     setTimeout(ensureLegendVisibility, 100);
   }
 
+  function addVehicle(v) {
+    if (!showVehicles) return;
+
+    // Replace any previous marker for this vehicle
+    [vehicleMarkers, routeLines, trailLines].forEach(layers => {
+      if (layers[v.name]) {
+        try { map.removeLayer(layers[v.name]); } catch(e){}
+        delete layers[v.name];
+      }
+    });
+
+    const icon = getVehicleIcon(v.name, v.type);
+    const color = v.type === 'Drone' ? '#3b82f6' : v.type === 'Electric Truck' ? '#22c55e' : '#ef4444';
+
+    const marker = L.marker([v.pos[0], v.pos[1]], { icon: icon }).addTo(map);
+    const tooltipText = `${v.name}\\nType: ${v.type}\\nWeight: ${v.weight} kg\\nSpeed: ${v.speed} km/h`;
+    marker.bindTooltip(tooltipText).bindPopup(tooltipText);
+    vehicleMarkers[v.name] = marker;
+
+    let routeStyle = {color: color, weight: 2, opacity: 0.7};
+    if(v.type === 'Drone'){
+      routeStyle.dashArray = '4,8';
+    }
+    routeLines[v.name] = L.polyline(v.route, routeStyle).addTo(map);
+
+    const trail = L.polyline([v.pos], {color: color, weight: 3, opacity: 1});
+    if(v.type === 'Drone'){
+      trail.setStyle({dashArray: '6,6'});
+    }
+    trailLines[v.name] = trail.addTo(map);
+  }
+
+  function setRouteGeometries(routes) {
+    // Swap route lines to the resolution picked for the current zoom
+    Object.entries(routes).forEach(([name, coords]) => {
+      if (routeLines[name]) {
+        routeLines[name].setLatLngs(coords);
+      }
+    });
+  }
+
+  function getMapZoom() {
+    return map ? map.getZoom() : null;
+  }
+
   function updateVehiclePositions(vehicleData) {
     if (!showVehicles) return;
     
@@ -361,6 +409,68 @@ HTML_TEMPLATE = """<!DOCTYPE html>
     trailLines = {};
   }
 
+  function addOrderMarkers(orders) {
+    // Live orders arrive by the hundred, so they are light circle markers rather than icons
+    orders.forEach(o => {
+      const marker = L.circleMarker([o.coords[0], o.coords[1]], {
+        radius: 4, color: '#ffffff', weight: 1, fillColor: '#ec4899', fillOpacity: 0.9
+      }).addTo(map).bindTooltip('Order ' + o.id);
+      orderMarkers.push(marker);
+    });
+  }
+
+  function clearOrderMarkers() {
+    orderMarkers.forEach(m => { try { map.removeLayer(m); } catch(e){} });
+    orderMarkers = [];
+  }
+
+  function showDepots(depots) {
+    // Markers for every hub of a multi-depot run, framed together
+    clearDepots();
+    depots.forEach(d => {
+      const marker = L.marker([d.coords[0], d.coords[1]], {
+        icon: L.divIcon({
+          className: 'custom-div-icon',
+          html: '<div style="background-color: #f59e0b; color: white; border-radius: 50%; width: 20px; height: 20px; display: flex; align-items: center; justify-content: center; border: 2px solid white;"><i class="fa fa-home"></i></div>',
+          iconSize: [20, 20],
+          iconAnchor: [10, 10]
+        })
+      }).addTo(map).bindTooltip(`${d.name} depot<br>Customers: ${d.customers}`);
+      hubMarkers.push(marker);
+    });
+    if (depots.length) {
+      map.fitBounds(L.latLngBounds(depots.map(d => d.coords)).pad(0.2));
+    }
+  }
+
+  function clearDepots() {
+    hubMarkers.forEach(m => {
+      try { map.removeLayer(m); } catch(e){}
+    });
+    hubMarkers = [];
+  }
+
+  function showPlanTours(depot, tours) {
+    // Straight-line preview of multi-stop tours while they are being improved
+    clearPlanTours();
+    tours.forEach((tour, i) => {
+      const line = L.polyline([depot].concat(tour, [depot]), {
+        color: `hsl(${(i * 47) % 360}, 70%, 45%)`,
+        weight: 2,
+        opacity: 0.7,
+        dashArray: '4, 6'
+      }).addTo(map);
+      planTourLines.push(line);
+    });
+  }
+
+  function clearPlanTours() {
+    planTourLines.forEach(l => {
+      try { map.removeLayer(l); } catch(e){}
+    });
+    planTourLines = [];
+  }
+
   function toggleVehicles(show) {
     showVehicles = show;
     if (!show) {
@@ -399,9 +509,14 @@ HTML_TEMPLATE = """<!DOCTYPE html>
   // Expose functions to Python
   window.initializeMap = initializeMap;
   window.setVehicles = setVehicles;
+  window.addVehicle = addVehicle;
+  window.setRouteGeometries = setRouteGeometries;
+  window.getMapZoom = getMapZoom;
   window.updateVehiclePositions = updateVehiclePositions;
   window.toggleVehicles = toggleVehicles;
   window.toggleNoFlyZones = toggleNoFlyZones;
+  window.addOrderMarkers = addOrderMarkers;
+  window.clearOrderMarkers = clearOrderMarkers;
 </script>
 </body>
 </html>
@@ -0,0 +1,66 @@
+"""
+Optimal one-delivery-per-vehicle assignment
+
+Run with: python -m unittest discover tests
+"""
+import itertools
+import unittest
+
+import numpy as np
+
+from core.assignment import assign, bottleneck_threshold
+
+INF = np.inf
+
+
+def brute_force(cost, key):
+    """Best full assignment of a square matrix by enumeration, ranked by key(pair costs)"""
+    n = len(cost)
+    return min((key([cost[r][c] for r, c in enumerate(perm)]), perm) for perm in itertools.permutations(range(n)))
+
+
+class AssignTest(unittest.TestCase):
+
+    def test_total_minimises_sum(self):
+        rows, cols = assign([[1, 5], [4, 6]], "total")
+        self.assertEqual(list(zip(rows, cols)), [(0, 0), (1, 1)])
+
+    def test_makespan_minimises_longest_trip(self):
+        rows, cols = assign([[1, 5], [4, 6]], "makespan")
+        self.assertEqual(list(zip(rows, cols)), [(0, 1), (1, 0)])
+
+    def test_infeasible_pairs_are_never_assigned(self):
+        rows, cols = assign([[INF, 1.0], [INF, 2.0]], "makespan")
+        self.assertEqual(list(zip(rows, cols)), [(0, 1)])
+        rows, _ = assign([[INF, INF]], "total")
+        self.assertEqual(len(rows), 0)
+
+    def test_more_deliveries_than_vehicles(self):
+        rows, cols = assign([[3, 1, 2], [1, 3, 2]], "total")
+        self.assertEqual(list(zip(rows, cols)), [(0, 1), (1, 0)])
+
+    def test_grouped_vehicles_match_brute_force(self):
+        # Two vehicle types, three identical vehicles each: the grouped solver is used
+        rng = np.random.default_rng(4)
+        types = rng.uniform(1, 10, size=(2, 6)).round(1)
+        cost = np.repeat(types, 3, axis=0)
+        for objective, key in (("total", sum), ("makespan", lambda trips: (max(trips), sum(trips)))):
+            rows, cols = assign(cost, objective)
+            self.assertEqual(sorted(cols), list(range(6)))
+            self.assertEqual(sorted(rows), list(range(6)))
+            expected, _ = brute_force(cost, key)
+            trips = cost[rows, cols]
+            self.assertAlmostEqual(sum(trips) if objective == "total" else max(trips),
+                                   expected if objective == "total" else expected[0])
+
+    def test_bottleneck_threshold(self):
+        self.assertEqual(bottleneck_threshold(np.array([[1.0, 5.0], [4.0, 6.0]])), 5.0)
+        self.assertEqual(bottleneck_threshold(np.array([[INF, INF]])), INF)
+
+    def test_unknown_objective(self):
+        with self.assertRaises(ValueError):
+            assign([[1.0]], "fastest")
+
+
+if __name__ == "__main__":
+    unittest.main()
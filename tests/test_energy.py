@@ -0,0 +1,83 @@
+"""
+Battery draw, range and stranding
+
+Run with: python -m unittest discover tests
+"""
+import unittest
+
+import numpy as np
+
+from config.app_config import ENERGY_CONFIG, TRAFFIC_CONFIG
+from core.energy import battery_profile, path_kwh, range_km
+from core.feasibility import vehicle_range_km
+from core.fleet_state import FleetState, RoundTripRoute, ScheduledRoute
+from core.polyline import RouteIndex
+from core.sim.events import create_engine
+
+DEPOT = [12.85, 74.92]
+TRUCK = {"type": "Electric Truck", "speed": 40.0, "weight": 300.0}
+
+
+def truck(route):
+    """One electric truck with an empty load on route"""
+    fleet = FleetState()
+    fleet.add("Electric Truck 1", dict(TRUCK, route=route, **battery_profile(TRUCK)))
+    return fleet
+
+
+class EnergyModelTest(unittest.TestCase):
+
+    def test_draw_at_cruise_speed(self):
+        kwh = path_kwh("Electric Truck", 0.25, 40.0, [0.0, 10.0, 30.0])
+        np.testing.assert_allclose(kwh, [0.0, 2.5, 7.5])
+
+    def test_draw_follows_actual_speed(self):
+        base = ENERGY_CONFIG["vehicles"]["Drone"]["kwh_per_km"]
+        profile = battery_profile({"type": "Drone", "speed": 60.0, "load_kg": 2.0})
+        payload = profile["kwh_per_km"] - base
+        kwh = path_kwh("Drone", profile["kwh_per_km"], 60.0, [0.0, 10.0], pace=0.5)
+        self.assertAlmostEqual(kwh[-1], 10.0 * (base * 0.25 + payload))
+
+    def test_feasibility_range_comes_from_battery(self):
+        params = ENERGY_CONFIG["vehicles"]["Drone"]
+        self.assertAlmostEqual(float(range_km("Drone")), params["battery_kwh"] / params["kwh_per_km"])
+        self.assertAlmostEqual(float(vehicle_range_km("Drone", 20.0)), float(range_km("Drone", 20.0)))
+        self.assertGreater(vehicle_range_km("Drone", 0.0), vehicle_range_km("Drone", 20.0))
+
+
+class FleetEnergyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.traffic = TRAFFIC_CONFIG["enabled"]
+
+    def tearDown(self):
+        TRAFFIC_CONFIG["enabled"] = self.traffic
+
+    def test_slow_timetable_draws_less(self):
+        coords = np.linspace(DEPOT, [12.95, 74.98], 10)
+        road = RouteIndex(coords).cumulative_km
+        cruise = truck(ScheduledRoute(coords, road, [9], road[-1]))
+        crawl = truck(ScheduledRoute(coords, 2 * road, [9], road[-1]))
+        self.assertAlmostEqual(cruise.drain_kwh[0] * cruise.total_km[0], 0.25 * road[-1])
+        self.assertLess(crawl.drain_kwh[0] * crawl.total_km[0], cruise.drain_kwh[0] * cruise.total_km[0])
+
+    def test_trip_beyond_battery_strands(self):
+        # About 220 km each way: more than one 100 kWh pack at 0.25 kWh/km
+        fleet = truck(RoundTripRoute(np.linspace(DEPOT, [14.8, 74.92], 50)))
+        reach = ENERGY_CONFIG["vehicles"]["Electric Truck"]["battery_kwh"] / 0.25
+        self.assertAlmostEqual(fleet.strand_km[0], reach)
+
+    def energy_used(self, traffic):
+        TRAFFIC_CONFIG["enabled"] = traffic
+        engine = create_engine("event")
+        customer = [12.95, 74.98]
+        engine.add_vehicle("Electric Truck 1", dict(TRUCK, assigned_delivery=customer),
+                           RoundTripRoute(np.linspace(DEPOT, customer, 20)))
+        return engine.run_to_completion()["energy_kwh"]
+
+    def test_traffic_changes_energy(self):
+        self.assertNotAlmostEqual(self.energy_used(True), self.energy_used(False), places=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
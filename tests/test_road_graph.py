@@ -0,0 +1,69 @@
+"""
+Offline road graph search
+
+Run with: python -m unittest discover tests
+"""
+import math
+import unittest
+
+import numpy as np
+
+from core.road_graph import RoadGraph
+
+# A -> B directly on a local road, or A -> C -> B over a longer motorway detour;
+# D is cut off from the rest
+LAT = [12.90, 12.90, 12.95, 13.20]
+LON = [74.90, 75.00, 74.95, 75.20]
+A, B, C, D = range(4)
+MOTORWAY, LOCAL = 0, 3
+# Speed factor per class (motorway, primary, secondary, local) plus the unclassified default
+NIGHT = [2.0, 1.0, 1.0, 0.5, 1.0]
+
+
+def graph():
+    edges = [(A, B, 10000.0, LOCAL), (A, C, 8000.0, MOTORWAY), (C, B, 8000.0, MOTORWAY)]
+    edges += [(v, u, length, road_class) for u, v, length, road_class in edges]
+    u, v, length, road_class = zip(*edges)
+    return RoadGraph.from_edges(LAT, LON, u, v, length, road_class)
+
+
+class ShortestPathTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = graph()
+
+    def test_shortest_by_length(self):
+        nodes, cost = self.graph.shortest_path(A, B)
+        self.assertEqual(nodes, [A, B])
+        self.assertAlmostEqual(cost, 10000.0, places=2)
+
+    def test_fastest_for_speed_factors(self):
+        nodes, cost = self.graph.shortest_path(A, B, NIGHT)
+        self.assertEqual(nodes, [A, C, B])
+        self.assertAlmostEqual(cost, 8000.0, places=2)
+
+    def test_both_directions(self):
+        nodes, _ = self.graph.shortest_path(B, A, NIGHT)
+        self.assertEqual(nodes, [B, C, A])
+
+    def test_unreachable(self):
+        nodes, cost = self.graph.shortest_path(A, D)
+        self.assertIsNone(nodes)
+        self.assertEqual(cost, math.inf)
+        self.assertIsNone(self.graph.route(LAT[A], LON[A], LAT[D], LON[D], max_snap_m=100.0))
+
+    def test_distances_agree_with_paths(self):
+        distances = self.graph.distances_from(A, [B, C, D], NIGHT)
+        self.assertAlmostEqual(distances[0], self.graph.shortest_path(A, B, NIGHT)[1], places=2)
+        self.assertAlmostEqual(distances[1], 4000.0, places=2)
+        self.assertEqual(distances[2], math.inf)
+
+    def test_route_snaps_endpoints(self):
+        route = self.graph.route(12.9001, 74.9001, 12.9001, 74.9999, max_snap_m=100.0)
+        self.assertEqual(route[0], [12.9001, 74.9001])
+        self.assertEqual(route[-1], [12.9001, 74.9999])
+        np.testing.assert_allclose(route[1:-1], [[LAT[A], LON[A]], [LAT[B], LON[B]]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Clarke-Wright savings tours and their local search
+
+Run with: python -m unittest discover tests
+"""
+import itertools
+import random
+import unittest
+
+import numpy as np
+
+from core.local_search import LocalSearch
+from core.savings import assign_tours, clarke_wright, tour_km
+
+
+def distance_matrix(points):
+    points = np.asarray(points, dtype=np.float64)
+    return np.linalg.norm(points[:, None] - points[None, :], axis=2)
+
+
+def best_single_tour_km(distance, customers):
+    return min(tour_km(distance, list(order)) for order in itertools.permutations(customers))
+
+
+class ClarkeWrightTest(unittest.TestCase):
+
+    def setUp(self):
+        # Depot at the origin, two customers each way along a line
+        self.distance = distance_matrix([[0, 0], [1, 0], [2, 0], [-1, 0], [-2, 0]])
+
+    def test_merges_customers_on_the_same_side(self):
+        tours = clarke_wright(self.distance, [1, 1, 1, 1], capacity=2)
+        self.assertEqual(sorted(sorted(tour) for tour in tours), [[0, 1], [2, 3]])
+
+    def test_respects_capacity(self):
+        tours = clarke_wright(self.distance, [2, 2, 2, 2], capacity=3)
+        self.assertEqual(sorted(tours), [[0], [1], [2], [3]])
+
+    def test_oversized_customer_is_left_out(self):
+        tours = clarke_wright(self.distance, [1, 5, 1, 1], capacity=4)
+        self.assertEqual(sorted(c for tour in tours for c in tour), [0, 2, 3])
+
+    def test_assign_tours_balances_vehicles(self):
+        assigned = assign_tours([5.0, 4.0, 3.0, 2.0], [1, 1, 1, 1], [2, 3])
+        self.assertEqual(assigned, [[0, 3], [1, 2]])
+
+    def test_assign_tours_respects_capacity(self):
+        # Only the second vehicle carries tour 3; tour 4 fits neither
+        assigned = assign_tours([5.0, 4.0, 3.0, 2.0, 1.0], [1, 1, 1, 3, 9], [2, 3])
+        self.assertEqual(assigned, [[0], [1, 2, 3]])
+
+
+class LocalSearchTest(unittest.TestCase):
+
+    def test_finds_optimal_single_tour(self):
+        rng = np.random.default_rng(7)
+        distance = distance_matrix(rng.uniform(-5, 5, size=(8, 2)))
+        customers = list(range(7))
+        search = LocalSearch(distance, [1] * 7, capacity=10, tours=[customers], rng=random.Random(1))
+        tours = search.improve(0.3)
+        self.assertEqual(sorted(c for tour in tours for c in tour), customers)
+        self.assertAlmostEqual(sum(tour_km(distance, tour) for tour in tours),
+                               best_single_tour_km(distance, customers), places=6)
+
+    def test_never_worse_and_within_capacity(self):
+        rng = np.random.default_rng(3)
+        distance = distance_matrix(rng.uniform(-5, 5, size=(21, 2)))
+        demands = rng.integers(1, 4, size=20)
+        start = clarke_wright(distance, demands, capacity=8)
+        tours = LocalSearch(distance, demands, 8, start, rng=random.Random(2)).improve(0.2)
+        self.assertEqual(sorted(c for tour in tours for c in tour), list(range(20)))
+        self.assertTrue(all(demands[tour].sum() <= 8 for tour in tours))
+        self.assertLessEqual(sum(tour_km(distance, tour) for tour in tours),
+                             sum(tour_km(distance, tour) for tour in start) + 1e-9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Truck-and-drone tandem timetables and sortie splitting
+
+Run with: python -m unittest discover tests
+"""
+import unittest
+
+import numpy as np
+
+from config.app_config import ROUTING_CONFIG
+from core.api_handler import RouteManager
+from core.sim.runner import run_scenario
+from core.tandem import schedule, split_tour
+
+DEPOT = [12.85, 74.92]
+CUSTOMER = [12.95, 74.98]
+HANDLING = 1 / 60.0
+
+
+class ScheduleTest(unittest.TestCase):
+
+    def test_truck_waits_at_depot_for_last_drone(self):
+        # The truck never leaves; the drone's hour-long sortie ends back at the depot
+        arrive, depart, launched, landed = schedule([0.0], [(0, 1)], [(0.5, 0.5)], HANDLING, HANDLING)
+        self.assertAlmostEqual(launched[0], HANDLING)
+        self.assertAlmostEqual(landed[0], HANDLING + 1.0)
+        self.assertAlmostEqual(arrive[-1], HANDLING)
+        self.assertAlmostEqual(depart[-1], 1.0 + 2 * HANDLING)
+
+    def test_drone_early_at_stop_hovers_for_truck(self):
+        arrive, depart, _, landed = schedule([2.0, 1.0], [(0, 1)], [(0.25, 0.25)])
+        self.assertEqual(landed[0], 2.0)
+        self.assertEqual(depart[1], 2.0)
+        self.assertEqual(depart[-1], 3.0)
+
+
+class SplitTourTest(unittest.TestCase):
+
+    def test_single_customer_sortie_includes_recovery(self):
+        tour, sorties, hours = split_tour([[0, 1], [1, 0]], [[0, .5], [.5, 0]], [0], [[True]], 2.0,
+                                          HANDLING, HANDLING)
+        self.assertEqual(tour, [])
+        self.assertEqual(sorties, [(0, 0, 1, 0)])
+        self.assertAlmostEqual(hours, 1.0 + 2 * HANDLING)
+
+    def test_slower_sortie_stays_on_truck(self):
+        tour, sorties, hours = split_tour([[0, 1], [1, 0]], [[0, 1.5], [1.5, 0]], [0], [[True]], 4.0,
+                                          HANDLING, HANDLING)
+        self.assertEqual(tour, [0])
+        self.assertEqual(sorties, [])
+        self.assertAlmostEqual(hours, 2.0)
+
+    def test_sortie_beyond_endurance_stays_on_truck(self):
+        tour, sorties, _ = split_tour([[0, 1], [1, 0]], [[0, .5], [.5, 0]], [0], [[True]], 0.5)
+        self.assertEqual(tour, [0])
+        self.assertEqual(sorties, [])
+
+    def test_parcel_too_heavy_for_drone_stays_on_truck(self):
+        tour, sorties, hours = split_tour([[0, 1], [1, 0]], [[0, .5], [.5, 0]], [0], [[False]], 2.0)
+        self.assertEqual(tour, [0])
+        self.assertEqual(sorties, [])
+        self.assertEqual(hours, 2.0)
+
+
+class TandemRouteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = ROUTING_CONFIG["backend"]
+        ROUTING_CONFIG["backend"] = "local"
+
+    def tearDown(self):
+        ROUTING_CONFIG["backend"] = self.backend
+
+    def test_drone_timetable_runs_forward(self):
+        plan = {"truck": "Electric Truck 1", "speed": 40.0, "drones": [["Drone 1", 60.0]],
+                "launch_hours": HANDLING, "recover_hours": HANDLING,
+                "tours": [{"stops": [], "sorties": [[0, CUSTOMER, 1, "Drone 1"]]}]}
+        routes = RouteManager.build_tandem_routes(DEPOT, plan)
+        for route in routes.values():
+            self.assertTrue((np.diff(route.index.cumulative_km) >= 0).all())
+        # The truck waits at the depot until the drone is back on board
+        self.assertAlmostEqual(routes["Electric Truck 1"].index.cumulative_km[-1] / 40.0,
+                               routes["Drone 1"].index.cumulative_km[-1] / 60.0)
+
+    def test_single_customer_drone_trip_is_delivered(self):
+        kpis, _ = run_scenario(DEPOT, 1, seed=2, mode="event")
+        self.assertEqual(kpis["deliveries"], 1)
+        self.assertEqual(kpis["unserved_customers"], 0)
+        self.assertEqual(kpis["drone_share"], 1.0)
+        self.assertGreater(kpis["makespan_hours"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Time-of-day traffic in the simulation engines
+
+Run with: python -m unittest discover tests
+"""
+import unittest
+
+import numpy as np
+
+from config.app_config import TRAFFIC_CONFIG
+from core.fleet_state import RoundTripRoute, TimedRoute
+from core.sim.events import create_engine
+
+DEPOT = [12.85, 74.92]
+CUSTOMERS = [[12.95, 74.98], [12.75, 74.85]]
+
+
+def run(mode):
+    """Two electric trucks on single-stop round trips, run to completion"""
+    engine = create_engine(mode)
+    for k, customer in enumerate(CUSTOMERS):
+        outbound = np.linspace(DEPOT, customer, 20)
+        spec = {"type": "Electric Truck", "speed": 40.0, "weight": 300.0, "assigned_delivery": customer}
+        engine.add_vehicle(f"Electric Truck {k + 1}", spec, RoundTripRoute(outbound))
+    return engine, engine.run_to_completion()
+
+
+class TrafficTest(unittest.TestCase):
+
+    def setUp(self):
+        self.enabled = TRAFFIC_CONFIG["enabled"]
+        TRAFFIC_CONFIG["enabled"] = True
+
+    def tearDown(self):
+        TRAFFIC_CONFIG["enabled"] = self.enabled
+
+    def test_event_mode_delivers_timed_round_trips(self):
+        engine, kpis = run("event")
+        self.assertTrue(all(isinstance(route, TimedRoute) for route in engine.fleet.routes))
+        self.assertEqual(kpis["deliveries"], len(CUSTOMERS))
+        self.assertEqual(sorted(trip["customer"] for trip in engine.trips), sorted(CUSTOMERS))
+
+    def test_step_and_event_modes_agree(self):
+        _, step = run("step")
+        _, event = run("event")
+        self.assertEqual(step["deliveries"], event["deliveries"])
+        self.assertAlmostEqual(step["makespan_hours"], event["makespan_hours"], places=6)
+
+    def test_traffic_changes_travel_time(self):
+        _, timed = run("event")
+        TRAFFIC_CONFIG["enabled"] = False
+        _, flat = run("event")
+        self.assertEqual(timed["deliveries"], flat["deliveries"])
+        self.assertNotAlmostEqual(timed["makespan_hours"], flat["makespan_hours"], places=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,12 @@
 """
 Delivery information widget
 """
-import math
 import random
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QGroupBox, QLabel, 
                            QListWidget, QGridLayout)
 from PyQt5.QtCore import Qt
 from core.data_manager import DeliveryPoint
+from core import geodesy
 
 class DeliveryInfoWidget(QWidget):
     """Display delivery points information - now with custom customer count"""
@@ -55,7 +55,7 @@ class DeliveryInfoWidget(QWidget):
         summary_layout.addWidget(QLabel("Total Distance:"), 2, 0)
         summary_layout.addWidget(self.total_distance, 2, 1)
         
-        
+        layout.addWidget(depot_group)
         layout.addWidget(info_group)
         layout.addWidget(summary_group)
     
@@ -85,12 +85,9 @@ class DeliveryInfoWidget(QWidget):
             angle = random.uniform(0, 360)
             distance_km = random.uniform(10, 50)  # 10-50 km from depot
             
-            # Convert to lat/lon offset
-            lat_offset = (distance_km / 111.32) * math.cos(math.radians(angle))
-            lon_offset = (distance_km / (111.32 * math.cos(math.radians(depot_lat)))) * math.sin(math.radians(angle))
-            
-            point_lat = depot_lat + lat_offset
-            point_lon = depot_lon + lon_offset
+            # Project bearing/distance onto the sphere
+            point_lat, point_lon = geodesy.destination_point(depot_lat, depot_lon, angle, distance_km)
+            point_lat, point_lon = float(point_lat), float(point_lon)
             
             point = DeliveryPoint(
                 name=f"Customer {i+1}",
@@ -116,6 +116,12 @@ class NoiseStatisticsWidget(QWidget):
     def reset_stats(self):
         self.levels_history = []
         
+    def set_history(self, levels):
+        """Replace the reading history (e.g. from a snapshot) and refresh the display"""
+        self.levels_history = list(levels)[-100:]
+        if self.levels_history:
+            self.update_statistics(self.levels_history.pop())
+        
     def update_statistics(self, current_level):
         """Update noise statistics"""
         self.levels_history.append(current_level)
@@ -5,6 +5,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QGroupBox, QPushButton,
                            QListWidget, QScrollArea, QListWidgetItem)
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QFont
+from config.app_config import ENERGY_CONFIG
 
 class VehicleControlPanel(QWidget):
     """Control panel for vehicle tracking"""
@@ -117,10 +118,16 @@ class VehicleControlPanel(QWidget):
         status_text += f"Type: {vehicle_data.vehicle_type}\n"
         
         # Status with color indicators
-        status_icon = "🟢" if vehicle_data.status == "Moving" else "🔴" if vehicle_data.status == "Stopped" else "🟡"
+        status_icon = {"Moving": "🟢", "Stopped": "🔴", "Stranded": "⚫"}.get(vehicle_data.status, "🟡")
         status_text += f"Status: {status_icon} {vehicle_data.status}\n"
         
         status_text += f"Speed: {vehicle_data.speed:.1f} km/h\n"
+        
+        # Battery charge for drones and electric trucks (NaN != NaN marks a vehicle without one)
+        soc = vehicle_data.soc
+        if soc is not None and soc == soc:
+            battery_icon = "🪫" if soc < ENERGY_CONFIG["low_soc"] else "🔋"
+            status_text += f"Battery: {battery_icon} {soc * 100:.0f}%\n"
         status_text += f"Position:\n  Lat: {vehicle_data.lat:.6f}\n  Lon: {vehicle_data.lon:.6f}"
         
         # Find existing item or create new
@@ -135,7 +142,7 @@ class VehicleControlPanel(QWidget):
         if not found:
             # Add new item with custom sizing
             item = QListWidgetItem(status_text)
-            item.setSizeHint(QSize(280, 120))  # Set adequate size for multi-line text
+            item.setSizeHint(QSize(280, 135))  # Set adequate size for multi-line text
             self.status_list.addItem(item)
         
         # UPDATED: Auto-resize to content